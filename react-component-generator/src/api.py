@@ -0,0 +1,393 @@
+"""
+Headless HTTP API for the component generator.
+
+Endpoints (JSON request and response bodies unless noted):
+
+    POST /v1/components             Generate a component from a spec. With ``?stream=1``
+                                    (or ``Accept: application/x-ndjson``) each file is sent
+                                    as an NDJSON event as soon as it is complete.
+    POST /v1/components/svg         SVG preview of ``files`` (``image/svg+xml`` if accepted).
+    POST /v1/components/validate    Validation errors and the CSS class report of ``files``.
+    POST /v1/archives               Store a zip of ``files`` in the artifact directory
+                                    (``compression``: auto, deflated or stored); returns its URL.
+    GET  /v1/archives/{id}.zip      The zip, immutable and cacheable (ETag, If-None-Match).
+    GET  /healthz                   Liveness, region health and coalescing counters.
+    GET  /metrics                   Model call metrics in the Prometheus text format.
+
+Usage (from the ``src`` directory):
+
+    python api.py --port 8080
+    python api.py --fake --time-scale 0.05      # fake model backend, no credentials
+    python api.py --replay recording.jsonl      # serve recorded model traffic
+"""
+import os
+import re
+import json
+import math
+import asyncio
+import logging
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+
+from utils.artifacts import COMPRESSIONS, ArtifactStore
+from utils.component_generator import ComponentGenerator
+from utils.fake_backend import FakeBackend
+from utils.gemini_client import GeminiRegionClient
+from utils.generation_cache import GenerationCache
+from utils.prompt_budget import PromptBudgetExceeded
+from utils.rate_limiter import RateLimited
+from utils.retry_policy import RetryExhausted
+from utils.traffic import ReplayBackend
+
+logger = logging.getLogger(__name__)
+
+_COMPONENT_NAME = re.compile(r"^[A-Z][A-Za-z0-9]*$")
+_SPEC_DEFAULTS = {
+    "component_type": "Custom",
+    "variants": ["primary", "secondary"],
+    "sizes": ["small", "medium", "large"],
+    "features": [],
+    "custom_requirements": "",
+}
+
+
+class ApiError(Exception):
+    """A client error reported with its HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamWorkers:
+    """
+    Threads reserved for streaming generations.
+
+    A stream occupies its thread for the whole generation, so streams get their
+    own bounded pool instead of the loop's default executor that request
+    parsing and archives rely on. Beyond ``max_streams`` new streams are refused.
+    """
+
+    def __init__(self, max_streams: int = 16):
+        self.max_streams = max(1, max_streams)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_streams, thread_name_prefix="api-stream")
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, function: Callable[..., Any], *args) -> bool:
+        """Run ``function(*args)`` on a stream thread; False if all of them are busy."""
+        with self._lock:
+            if self._active >= self.max_streams:
+                return False
+            self._active += 1
+        self._executor.submit(function, *args).add_done_callback(self._finished)
+        return True
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+GENERATOR = web.AppKey("generator", ComponentGenerator)
+ARTIFACTS = web.AppKey("artifacts", ArtifactStore)
+STREAMS = web.AppKey("streams", StreamWorkers)
+
+
+def _error(status: int, message: str, headers: Dict[str, str] = None) -> web.Response:
+    return web.json_response({"error": message}, status=status, headers=headers)
+
+
+@web.middleware
+async def error_middleware(request: web.Request, handler):
+    """Map generator errors to HTTP statuses with a JSON body."""
+    try:
+        return await handler(request)
+    except web.HTTPException:
+        raise
+    except ApiError as e:
+        return _error(e.status, str(e))
+    except RateLimited as e:
+        return _error(429, str(e), headers={"Retry-After": str(max(1, math.ceil(e.wait)))})
+    except RetryExhausted as e:
+        if isinstance(e.last_error, RateLimited):
+            # Gave up waiting for local quota: the client should come back later
+            return _error(429, str(e), headers={"Retry-After": str(max(1, math.ceil(e.last_error.wait)))})
+        return _error(503, str(e))
+    except PromptBudgetExceeded as e:
+        # The spec itself makes the prompt too large
+        return _error(422, str(e))
+    except ValueError as e:
+        # Model output that could not be parsed or repaired: an upstream failure, not a bad request
+        return _error(502, f"Unusable model response: {str(e)}")
+    except Exception as e:
+        logger.exception(f"Unhandled error in {request.method} {request.path}")
+        return _error(500, f"Internal error: {str(e)}")
+
+
+async def _read_json(request: web.Request) -> Dict[str, Any]:
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise ApiError(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise ApiError(400, "Request body must be a JSON object")
+    return body
+
+
+def _component_name(body: Dict[str, Any]) -> str:
+    name = body.get("component_name")
+    if not isinstance(name, str) or not _COMPONENT_NAME.match(name):
+        raise ApiError(400, "component_name must be a PascalCase identifier")
+    return name
+
+
+def _files(body: Dict[str, Any]) -> Dict[str, str]:
+    files = body.get("files")
+    if not isinstance(files, dict) or not files or not all(
+        isinstance(name, str) and isinstance(content, str) for name, content in files.items()
+    ):
+        raise ApiError(400, "files must be a non-empty object mapping file names to contents")
+    if any("/" in name or "\\" in name or name.startswith(".") for name in files):
+        raise ApiError(400, "file names must not contain paths")
+    return files
+
+
+def parse_spec(body: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split a request body into the component spec and the generation options.
+
+    ``incremental`` builds on the client's own previous generations, so it needs a
+    ``session`` chosen by the client to identify them.
+    """
+    spec = {"component_name": _component_name(body)}
+    for field, default in _SPEC_DEFAULTS.items():
+        value = body.get(field, default)
+        if isinstance(default, list):
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise ApiError(400, f"{field} must be a list of strings")
+        elif not isinstance(value, str):
+            raise ApiError(400, f"{field} must be a string")
+        spec[field] = value
+    options = {option: bool(body.get(option, False)) for option in ("bypass_cache", "incremental")}
+    session = body.get("session")
+    if session is not None and (not isinstance(session, str) or not session or len(session) > 128):
+        raise ApiError(400, "session must be a non-empty string of at most 128 characters")
+    if options["incremental"] and session is None:
+        raise ApiError(400, "incremental requires a session identifying the client")
+    options["session"] = session
+    return spec, options
+
+
+def _wants_stream(request: web.Request) -> bool:
+    return request.query.get("stream") in ("1", "true") or "application/x-ndjson" in request.headers.get("Accept", "")
+
+
+def _pump(generator: ComponentGenerator, spec: Dict[str, Any], options: Dict[str, Any],
+          loop: asyncio.AbstractEventLoop, events: asyncio.Queue, stop: threading.Event) -> None:
+    """Run a streaming generation on a worker thread, handing each file to the event loop."""
+    stream = generator.generate_component_stream(**spec, **options)
+    try:
+        for file_name, content in stream:
+            loop.call_soon_threadsafe(events.put_nowait, ("file", (file_name, content)))
+            if stop.is_set():
+                return
+        loop.call_soon_threadsafe(events.put_nowait, ("done", None))
+    except Exception as e:
+        loop.call_soon_threadsafe(events.put_nowait, ("error", e))
+    finally:
+        # Closing here, on the generating thread, releases an in-flight generation we abandon
+        stream.close()
+
+
+async def _stream_generation(request: web.Request, spec: Dict[str, Any], options: Dict[str, Any]) -> web.StreamResponse:
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    if not request.app[STREAMS].submit(_pump, request.app[GENERATOR], spec, options, loop, events, stop):
+        raise ApiError(503, "Too many streaming generations in progress; retry shortly")
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson", "Cache-Control": "no-store"})
+    await response.prepare(request)
+
+    async def send(event: Dict[str, Any]):
+        await response.write((json.dumps(event) + "\n").encode("utf-8"))
+
+    files: Dict[str, str] = {}
+    try:
+        while True:
+            kind, value = await events.get()
+            if kind == "file":
+                file_name, content = value
+                await send({"event": "file", "file": file_name, "content": content, "repaired": file_name in files})
+                files[file_name] = content
+            elif kind == "done":
+                await send({"event": "done", "component_name": spec["component_name"], "files": sorted(files)})
+                break
+            else:
+                await send({"event": "error", "error": str(value)})
+                break
+    finally:
+        # Also reached when the client disconnects mid-stream
+        stop.set()
+    await response.write_eof()
+    return response
+
+
+async def generate(request: web.Request) -> web.StreamResponse:
+    spec, options = parse_spec(await _read_json(request))
+    if _wants_stream(request):
+        return await _stream_generation(request, spec, options)
+    generator = request.app[GENERATOR]
+    files = await generator.agenerate_component(**spec, **options)
+    return web.json_response({
+        "component_name": spec["component_name"],
+        "files": files,
+        "report": generator.component_report(files),
+    })
+
+
+async def svg_preview(request: web.Request) -> web.Response:
+    body = await _read_json(request)
+    component_name, files = _component_name(body), _files(body)
+    svg = await request.app[GENERATOR].agenerate_component_svg(component_name, files, fancy=bool(body.get("fancy", False)))
+    if "image/svg+xml" in request.headers.get("Accept", ""):
+        return web.Response(text=svg, content_type="image/svg+xml")
+    return web.json_response({"component_name": component_name, "svg": svg})
+
+
+async def validate(request: web.Request) -> web.Response:
+    body = await _read_json(request)
+    component_name, files = _component_name(body), _files(body)
+    return web.json_response(request.app[GENERATOR].validation_report(files, component_name))
+
+
+async def create_archive(request: web.Request) -> web.Response:
+    body = await _read_json(request)
+    component_name, files = _component_name(body), _files(body)
+    compression = body.get("compression")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ApiError(400, f"compression must be one of {', '.join(COMPRESSIONS)}")
+    artifact = await asyncio.get_running_loop().run_in_executor(
+        None, request.app[ARTIFACTS].archive, files, component_name, compression
+    )
+    url = f"/v1/archives/{artifact.id}.zip?name={component_name}"
+    return web.json_response({"id": artifact.id, "url": url, "size": artifact.size}, status=201, headers={"Location": url})
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header (a list of ETags, weak or strong, or "*") matches."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+async def get_archive(request: web.Request) -> web.StreamResponse:
+    component_name = request.query.get("name", "component")
+    if not _COMPONENT_NAME.match(component_name):
+        component_name = "component"
+    store = request.app[ARTIFACTS]
+    artifact = store.get(request.match_info["archive_id"], component_name)
+    if artifact is None:
+        raise ApiError(404, "Unknown or expired archive")
+    # The id is a content hash, so the archive never changes
+    headers = {"ETag": f'"{artifact.id}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if _etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+        return web.Response(status=304, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{artifact.filename}"'
+    response = web.StreamResponse(headers={**headers, "Content-Type": "application/zip"})
+    response.content_length = artifact.size
+    await response.prepare(request)
+    # Sent from disk chunk by chunk; the archive is never loaded whole
+    loop = asyncio.get_running_loop()
+    chunks = store.iter_chunks(artifact)
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            await response.write(chunk)
+    finally:
+        chunks.close()
+    await response.write_eof()
+    return response
+
+
+async def healthz(request: web.Request) -> web.Response:
+    generator = request.app[GENERATOR]
+    return web.json_response({
+        "status": "ok",
+        "regions": generator.gemini_client.region_health(),
+        "coalescing": generator.coalescing_stats(),
+    })
+
+
+async def metrics(request: web.Request) -> web.Response:
+    text = request.app[GENERATOR].gemini_client.metrics.prometheus()
+    return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+
+async def _shutdown_streams(app: web.Application) -> None:
+    app[STREAMS].shutdown()
+
+
+def create_app(component_generator: ComponentGenerator, artifact_store: ArtifactStore = None,
+               max_streams: int = 16) -> web.Application:
+    """The aiohttp application serving ``component_generator`` and the archives in ``artifact_store``."""
+    app = web.Application(middlewares=[error_middleware], client_max_size=8 * 1024 * 1024)
+    app[GENERATOR] = component_generator
+    app[ARTIFACTS] = artifact_store or ArtifactStore(logger=logger)
+    app[STREAMS] = StreamWorkers(max_streams)
+    app.on_cleanup.append(_shutdown_streams)
+    app.router.add_post("/v1/components", generate)
+    app.router.add_post("/v1/components/svg", svg_preview)
+    app.router.add_post("/v1/components/validate", validate)
+    app.router.add_post("/v1/archives", create_archive)
+    app.router.add_get("/v1/archives/{archive_id}.zip", get_archive)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+def build_generator(fake: bool = False, replay: str = None, time_scale: float = 1.0,
+                    cache: bool = True) -> ComponentGenerator:
+    """A generator backed by Vertex AI, a fake backend or a traffic recording."""
+    model_pool = None
+    if replay:
+        fallback = FakeBackend(time_scale=time_scale) if fake else None
+        model_pool = ReplayBackend(replay, time_scale=time_scale, fallback=fallback)
+    elif fake:
+        model_pool = FakeBackend(time_scale=time_scale)
+    project_id = os.environ.get("GCP_PROJECT", "offline") if model_pool is not None else None
+    gemini_client = GeminiRegionClient(project_id=project_id, logger=logger, model_pool=model_pool)
+    return ComponentGenerator(gemini_client, cache=GenerationCache(logger=logger) if cache else None)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the component generator over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fake", action="store_true", help="Use the fake model backend (no credentials needed)")
+    parser.add_argument("--replay", help="Serve model calls from a traffic recording")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Factor applied to fake or replayed delays")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the on-disk generation cache")
+    parser.add_argument("--max-streams", type=int, default=16, help="Streaming generations served at once")
+    parser.add_argument("--artifact-dir", help="Directory for download archives (default: COMPONENT_ARTIFACT_DIR)")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="auto",
+                        help="Default archive compression; 'stored' skips deflate entirely")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    generator = build_generator(args.fake, args.replay, args.time_scale, cache=not args.no_cache)
+    artifact_store = ArtifactStore(args.artifact_dir, compression=args.compression, logger=logger)
+    web.run_app(create_app(generator, artifact_store, args.max_streams), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,24 +4,81 @@ import tempfile
 import json
 import logging
 from pathlib import Path
-import zipfile
 import io
+import time
+import uuid
 from datetime import datetime
 import streamlit.components.v1 as components
 
 from utils.gemini_client import GeminiRegionClient
 from utils.component_generator import ComponentGenerator
+from utils.generation_cache import GenerationCache
+from utils.prompt_cache import PrefixCache
 from utils.file_utils import save_component_files
+from utils.call_metrics import CallMetrics, generation_scope, serve_metrics, summarize_records
+from utils.traffic import ReplayBackend, TrafficRecorder
+from utils.jobs import FAILED, FINISHED, SUCCEEDED, Job, JobQueue, QueueFull
+from utils.artifacts import ArtifactStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create a StringIO object to capture logs
-log_stream = io.StringIO()
-stream_handler = logging.StreamHandler(log_stream)
-stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logger.addHandler(stream_handler)
+@st.cache_resource(show_spinner=False)
+def get_log_stream() -> io.StringIO:
+    """Create a StringIO object to capture logs (attached once per process, not on every rerun)"""
+    log_stream = io.StringIO()
+    stream_handler = logging.StreamHandler(log_stream)
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(stream_handler)
+    return log_stream
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server():
+    """Serve /metrics (Prometheus) and /metrics.json once per process when METRICS_PORT is set"""
+    port = os.environ.get("METRICS_PORT")
+    if not port:
+        return None
+    server = serve_metrics(int(port), CallMetrics.shared())
+    logger.info(f"Serving model call metrics on port {port}")
+    return server
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Create the background generation queue once per process (GENERATION_WORKERS sets its size)"""
+    return JobQueue.from_env(logger=logger)
+
+@st.cache_resource
+def get_artifact_store() -> ArtifactStore:
+    """Create the download archive store once per process (COMPONENT_ARTIFACT_DIR sets its directory)"""
+    return ArtifactStore(logger=logger)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_artifact(artifact_id: str) -> bytes:
+    """Read a stored archive once; reruns reuse the bytes instead of rebuilding the zip"""
+    with open(get_artifact_store().get(artifact_id).path, 'rb') as f:
+        return f.read()
+
+@st.cache_resource
+def get_component_generator() -> ComponentGenerator:
+    """Create the Gemini client, generation cache and component generator once per process.
+    
+    Streamlit reruns the script on every widget interaction; the shared instance
+    keeps those reruns free of template reads and client construction. To force a
+    rebuild, stop the template watcher and call get_component_generator.clear().
+    """
+    prefix_cache = PrefixCache(logger=logger) if os.environ.get("GEMINI_PREFIX_CACHE") else None
+    recorder = TrafficRecorder(os.environ["GEMINI_RECORD_FILE"], logger=logger) if os.environ.get("GEMINI_RECORD_FILE") else None
+    if os.environ.get("GEMINI_REPLAY_FILE"):
+        # Serve recorded traffic instead of calling Vertex AI (load tests, demos)
+        replay = ReplayBackend(os.environ["GEMINI_REPLAY_FILE"], time_scale=float(os.environ.get("GEMINI_REPLAY_TIME_SCALE", "1")))
+        gemini_client = GeminiRegionClient(project_id=os.environ.get("GCP_PROJECT", "replay"), logger=logger, model_pool=replay, recorder=recorder)
+    else:
+        gemini_client = GeminiRegionClient(logger=logger, prefix_cache=prefix_cache, recorder=recorder)
+    component_generator = ComponentGenerator(gemini_client, cache=GenerationCache(logger=logger))
+    # Pick up template edits as soon as they are saved
+    component_generator.template_registry.watch()
+    return component_generator
 
 # Page configuration
 st.set_page_config(
@@ -31,6 +88,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Only after set_page_config, which must be the first Streamlit command of a run
+log_stream = get_log_stream()
+start_metrics_server()
+
 # Custom CSS for better UI
 st.markdown("""
 <style>
@@ -113,6 +174,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def component_type_options(template_types: list) -> list:
+    """Built-in component types plus any template type found on disk, with Custom last"""
+    options = ["Button", "List", "Dialog", "Card", "Input", "Form"]
+    options += [t for t in template_types if t not in options]
+    return options + ["Custom"]
+
 def init_session_state():
     """Initialize session state variables"""
     if 'generated_component' not in st.session_state:
@@ -121,61 +188,196 @@ def init_session_state():
         st.session_state.logs = []
     if 'error' not in st.session_state:
         st.session_state.error = None
-    if 'templates' not in st.session_state:
-        st.session_state.templates = None
     if 'active_tab' not in st.session_state:
         st.session_state.active_tab = "generator"
     if 'component_svg' not in st.session_state:
         st.session_state.component_svg = None
+    if 'generation_id' not in st.session_state:
+        st.session_state.generation_id = None
+    if 'session_id' not in st.session_state:
+        # Scopes incremental regeneration to this browser session's own components
+        st.session_state.session_id = uuid.uuid4().hex
+    if 'job_id' not in st.session_state:
+        st.session_state.job_id = st.query_params.get("job")
 
-def add_log(message: str):
-    """Add a timestamped log message"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    st.session_state.logs.append(f"[{timestamp}] {message}")
-    logger.info(message)
-
-def save_generation_logs(component_name: str, logs: list):
-    """Save generation logs to file"""
+def save_generation_logs(component_name: str, logs: list) -> str:
+    """Save generation logs to file and return its path"""
     output_dir = os.path.join('generated_components', component_name.lower())
     os.makedirs(output_dir, exist_ok=True)
     
     log_file = os.path.join(output_dir, f"{component_name}_generation.log")
     with open(log_file, 'w') as f:
         f.write('\n'.join(logs))
-    add_log(f"Saved generation logs to {log_file}")
+    return log_file
+
+def run_generation_job(job: Job, component_generator: ComponentGenerator, artifact_store: ArtifactStore,
+                       spec: dict, generation_id: str, fancy_preview: bool, bypass_cache: bool, incremental: bool,
+                       session_id: str) -> dict:
+    """Generate, save and preview a component on a job worker, reporting progress to the job"""
+    component_name = spec['component_name']
+    expected_files = len(component_file_tabs(component_name))
+    
+    def log(message: str):
+        job.log(message)
+        logger.info(message)
+    
+    with generation_scope(generation_id):
+        log(f"Generating component: {component_name}")
+        log(f"Type: {spec['component_type']}")
+        log(f"Variants: {spec['variants']}")
+        log(f"Sizes: {spec['sizes']}")
+        log(f"Features: {spec['features']}")
+        prompt_report = component_generator.prompt_report(**spec)
+        log(f"Prompt tokens (estimated): {prompt_report}")
+        job.update(0.05, "Generating component", component_name=component_name, files={})
+        
+        # Partial files are published as each one completes
+        component_files = {}
+        for file_name, content in component_generator.generate_component_stream(
+            **spec, bypass_cache=bypass_cache, incremental=incremental, session=session_id
+        ):
+            job.check_cancelled()
+            log(f"{'Repaired' if file_name in component_files else 'Received'} {file_name}")
+            component_files[file_name] = content
+            job.update(0.1 + 0.6 * min(len(component_files), expected_files) / expected_files,
+                       f"Received {file_name}", files=dict(component_files))
+        class_report = component_generator.component_report(component_files)
+        for issue, class_names in class_report.items():
+            if class_names:
+                log(f"{issue.replace('_', ' ').capitalize()}: {', '.join(class_names)}")
+        cache_stats = component_generator.cache.stats()
+        log(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+        coalescing = component_generator.coalescing_stats()
+        if coalescing['coalesced']:
+            log(f"Coalescing: {coalescing['coalesced']} generations served from identical in-flight requests")
+        
+        # Save files
+        job.update(0.75, "Saving files")
+        output_dir = os.path.join('generated_components', component_name.lower())
+        save_component_files(component_files, output_dir)
+        archive = artifact_store.archive(component_files, component_name)
+        log(f"Download archive: {archive.id} ({archive.size} bytes)")
+        job.check_cancelled()
+        
+        # Generate SVG preview
+        job.update(0.8, "Generating visual preview")
+        svg_content = None
+        try:
+            svg_content = component_generator.generate_component_svg(
+                component_name=component_name,
+                files=component_files,
+                fancy=fancy_preview
+            )
+            log("Generated SVG preview")
+        except Exception as e:
+            log(f"SVG generation failed: {str(e)}")
+        
+        call_summary = summarize_records(component_generator.gemini_client.metrics.records(generation=generation_id))
+        log(f"Model calls: {call_summary['calls']} ({call_summary['errors']} failed), "
+            f"{call_summary['input_tokens']} input / {call_summary['output_tokens']} output tokens")
+        
+        # Save logs
+        log_file = save_generation_logs(component_name, job.logs)
+        log(f"Saved generation logs to {log_file}")
+    
+    return {
+        'name': component_name,
+        'files': component_files,
+        'directory': output_dir,
+        'svg': svg_content,
+        'archive': archive.id,
+        'generation_id': generation_id
+    }
+
+def forget_job():
+    """Stop following the current job, in the session and in the page URL"""
+    st.session_state.job_id = None
+    st.query_params.pop("job", None)
+
+def adopt_job_result(state: dict):
+    """Copy a finished generation job into the session"""
+    forget_job()
+    st.session_state.logs = state['logs']
+    if state['status'] == SUCCEEDED:
+        result = state['result']
+        st.session_state.generated_component = {
+            'name': result['name'],
+            'files': result['files'],
+            'directory': result['directory'],
+            'archive': result['archive']
+        }
+        st.session_state.component_svg = result['svg']
+        st.session_state.generation_id = result['generation_id']
+        st.session_state.error = None
+    elif state['status'] == FAILED:
+        st.session_state.error = f"Failed to generate component: {state['error']}"
+        st.session_state.logs.append(f"[{datetime.now():%H:%M:%S}] Error: {state['error']}")
+    else:
+        st.session_state.logs.append(f"[{datetime.now():%H:%M:%S}] Generation cancelled")
+
+@st.fragment(run_every=1.0)
+def show_job_progress(job_id: str):
+    """Render a generation job's progress; reruns on its own every second, leaving the rest of the page alone"""
+    job_queue = get_job_queue()
+    job = job_queue.get(job_id)
+    if job is None:
+        forget_job()
+        st.warning("This generation is no longer available (its result expired).")
+        return
+    state = job.snapshot()
+    if state['status'] in FINISHED:
+        adopt_job_result(state)
+        st.rerun()
+    
+    st.markdown("## ⏳ Generating Component")
+    position = job_queue.position(job_id)
+    message = state['message'] if position is None else f"Waiting for a worker ({position} jobs ahead)"
+    st.progress(state['progress'], text=message)
+    component_name = state['partial'].get('component_name')
+    if component_name:
+        display_component_files(state['partial'].get('files', {}), component_name)
+    if st.button("✖️ Cancel generation", key=f"cancel-{job_id}"):
+        job_queue.cancel(job_id)
+        forget_job()
+        st.session_state.logs.append(f"[{datetime.now():%H:%M:%S}] Generation cancelled")
+        st.rerun()
+    if state['logs']:
+        st.text("\n".join(state['logs'][-5:]))
 
 def create_component_preview(component_files: dict, component_name: str) -> str:
     """Create an HTML preview of the component"""
     # Implementation of preview generation
     pass
 
-def display_component_files(files: dict, component_name: str):
-    """Display component files in tabs"""
-    tabs = st.tabs(["Component", "CSS", "Props", "Example", "Package"])
-    
-    with tabs[0]:
-        st.markdown("### Component Code")
-        st.code(files.get(f"{component_name}.tsx", ""), language="typescript")
-    with tabs[1]:
-        st.markdown("### Styles")
-        st.code(files.get(f"{component_name}.css", ""), language="css")
-    with tabs[2]:
-        st.markdown("### Props Interface")
-        st.code(files.get(f"{component_name}Props.ts", ""), language="typescript")
-    with tabs[3]:
-        st.markdown("### Usage Example")
-        st.code(files.get(f"{component_name}Example.tsx", ""), language="typescript")
-    with tabs[4]:
-        st.markdown("### Package Configuration")
-        st.code(files.get("package.json", ""), language="json")
-
-def create_download_zip(files: dict, component_name: str) -> bytes:
-    """Create a zip file containing all component files"""
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for file_name, content in files.items():
-            zip_file.writestr(f"{component_name}/{file_name}", content)
-    return zip_buffer.getvalue()
+def component_file_tabs(component_name: str) -> list:
+    """(tab label, heading, file name, language) for each generated file"""
+    return [
+        ("Component", "Component Code", f"{component_name}.tsx", "typescript"),
+        ("CSS", "Styles", f"{component_name}.css", "css"),
+        ("Props", "Props Interface", f"{component_name}Props.ts", "typescript"),
+        ("Example", "Usage Example", f"{component_name}Example.tsx", "typescript"),
+        ("Package", "Package Configuration", "package.json", "json"),
+    ]
+
+def create_file_placeholders(component_name: str) -> dict:
+    """Create the file tabs and return an empty placeholder per file name"""
+    file_tabs = component_file_tabs(component_name)
+    tabs = st.tabs([label for label, _, _, _ in file_tabs])
+    placeholders = {}
+    for tab, (_, heading, file_name, _) in zip(tabs, file_tabs):
+        with tab:
+            st.markdown(f"### {heading}")
+            placeholders[file_name] = st.empty()
+    return placeholders
+
+def display_component_files(files: dict, component_name: str, placeholders: dict = None):
+    """Display component files in tabs, filling only the files that are available so far"""
+    placeholders = placeholders or create_file_placeholders(component_name)
+    for _, _, file_name, language in component_file_tabs(component_name):
+        if file_name in files:
+            placeholders[file_name].code(files[file_name], language=language)
+        else:
+            placeholders[file_name].info("⏳ Waiting for the model...")
 
 def display_template_files(templates: dict, component_type: str):
     """Display template files in tabs"""
@@ -209,6 +411,7 @@ def display_template_files(templates: dict, component_type: str):
                 st.code(template.get("package", ""), language="json")
 
 def main():
+    rerun_started = time.perf_counter()
     init_session_state()
     
     # Header section
@@ -219,13 +422,10 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
-    # Initialize clients
+    # Shared clients (built on the first run of the process)
     try:
-        gemini_client = GeminiRegionClient(logger=logger)
-        component_generator = ComponentGenerator(gemini_client)
-        # Store templates in session state for reuse
-        if st.session_state.templates is None:
-            st.session_state.templates = component_generator.templates
+        component_generator = get_component_generator()
+        gemini_client = component_generator.gemini_client
     except Exception as e:
         st.error(f"Failed to initialize AI client: {str(e)}")
         return
@@ -241,7 +441,7 @@ def main():
             
             component_type = st.selectbox(
                 "Component Type",
-                ["Button", "List", "Dialog", "Card", "Input", "Form", "Custom"],
+                component_type_options(component_generator.template_registry.types()),
                 help="Select the type of component you want to generate"
             )
 
@@ -283,75 +483,58 @@ def main():
                 help="Add any additional requirements or specifications for your component"
             )
 
+            fancy_preview = st.checkbox(
+                "AI-rendered preview (slower)",
+                value=False,
+                help="Ask Gemini to draw the preview instead of rendering the variant/size grid locally from the CSS"
+            )
+
+            bypass_cache = st.checkbox(
+                "Bypass generation cache",
+                value=False,
+                help="Always call the model, even if an identical component was generated before"
+            )
+
+            incremental = st.checkbox(
+                "Only regenerate changed files",
+                value=True,
+                help="When regenerating the same component, only ask for the files affected by the changed options"
+            )
+
             st.markdown("---")
             
             if st.button("🚀 Generate Component", type="primary", use_container_width=True):
+                # Tag every model call of this generation so its metrics can be shown with the logs
+                generation_id = f"{component_name}-{datetime.now():%Y%m%d%H%M%S%f}"
+                spec = dict(
+                    component_name=component_name,
+                    component_type=component_type,
+                    variants=variants,
+                    sizes=sizes,
+                    features=features,
+                    custom_requirements=custom_requirements
+                )
                 try:
-                    with st.spinner("🔄 Generating component..."):
-                        # Clear previous logs
-                        st.session_state.logs = []
-                        st.session_state.error = None
-                        st.session_state.component_svg = None
-                        
-                        # Log generation start
-                        add_log(f"Generating component: {component_name}")
-                        add_log(f"Type: {component_type}")
-                        add_log(f"Variants: {variants}")
-                        add_log(f"Sizes: {sizes}")
-                        add_log(f"Features: {features}")
-                        
-                        # Generate component
-                        component_files = component_generator.generate_component(
-                            component_name=component_name,
-                            component_type=component_type,
-                            variants=variants,
-                            sizes=sizes,
-                            features=features,
-                            custom_requirements=custom_requirements
-                        )
-                        
-                        # Save files
-                        output_dir = os.path.join('generated_components', component_name.lower())
-                        save_component_files(component_files, output_dir)
-                        
-                        # Generate SVG preview
-                        with st.spinner("🎨 Generating visual preview..."):
-                            try:
-                                svg_content = component_generator.generate_component_svg(
-                                    component_name=component_name,
-                                    files=component_files
-                                )
-                                st.session_state.component_svg = svg_content
-                                add_log("Generated SVG preview")
-                            except Exception as e:
-                                st.warning(f"Could not generate SVG preview: {str(e)}")
-                                add_log(f"SVG generation failed: {str(e)}")
-                        
-                        # Save logs
-                        save_generation_logs(component_name, st.session_state.logs)
-                        
-                        # Store in session state
-                        st.session_state.generated_component = {
-                            'name': component_name,
-                            'files': component_files,
-                            'directory': output_dir
-                        }
-                        
-                        st.markdown("""
-                        <div class="success-message">
-                            ✨ Component generated successfully!
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                except Exception as e:
+                    # Generation runs on a worker; this script run only submits it
+                    job = get_job_queue().submit(
+                        "generate", run_generation_job, component_generator, get_artifact_store(), spec, generation_id,
+                        fancy_preview, bypass_cache, incremental, st.session_state.session_id
+                    )
+                except QueueFull as e:
                     st.session_state.error = str(e)
-                    st.markdown(f"""
-                    <div class="error-message">
-                        ❌ Failed to generate component: {str(e)}
-                    </div>
-                    """, unsafe_allow_html=True)
-                    add_log(f"Error: {str(e)}")
+                else:
+                    st.session_state.logs = []
+                    st.session_state.error = None
+                    st.session_state.component_svg = None
+                    st.session_state.generation_id = generation_id
+                    st.session_state.job_id = job.id
+                    # Keep the job in the URL so a refresh picks it up again
+                    st.query_params["job"] = job.id
 
+        # Progress of a running generation, polled without rerunning the page
+        if st.session_state.job_id:
+            show_job_progress(st.session_state.job_id)
+        
         # Display generated component
         if st.session_state.generated_component:
             st.markdown("## 📦 Generated Component")
@@ -368,14 +551,21 @@ def main():
             
             # Download section
             st.markdown("### 📥 Download")
-            zip_data = create_download_zip(
-                st.session_state.generated_component['files'],
-                st.session_state.generated_component['name']
-            )
+            # The archive was built once by the generation job; only its ID lives in the session
+            artifact_store = get_artifact_store()
+            archive = artifact_store.get(st.session_state.generated_component.get('archive'),
+                                         st.session_state.generated_component['name'])
+            if archive is None:
+                # Removed by the store's size limit: rebuild it once
+                archive = artifact_store.archive(
+                    st.session_state.generated_component['files'],
+                    st.session_state.generated_component['name']
+                )
+                st.session_state.generated_component['archive'] = archive.id
             st.download_button(
                 label="📦 Download Component",
-                data=zip_data,
-                file_name=f"{st.session_state.generated_component['name']}_component.zip",
+                data=load_artifact(archive.id),
+                file_name=archive.filename,
                 mime="application/zip",
                 use_container_width=True
             )
@@ -389,10 +579,17 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        if st.session_state.templates:
+        if st.button("🔄 Reload templates and clients"):
+            # The cached generator is dropped, not closed; stop its template watcher thread first
+            component_generator.template_registry.stop_watching()
+            get_component_generator.clear()
+            component_generator = get_component_generator()
+            st.success("Templates and clients reloaded.")
+        
+        if component_generator.templates:
             template_type = st.selectbox(
                 "Select a component template",
-                list(st.session_state.templates.keys()),
+                list(component_generator.templates.keys()),
                 key="template_explorer"
             )
             
@@ -403,7 +600,7 @@ def main():
                     This is an example implementation of a {template_type} component following best practices.
                 </div>
                 """, unsafe_allow_html=True)
-                display_template_files(st.session_state.templates, template_type)
+                display_template_files(component_generator.templates, template_type)
 
     # Logs Tab
     with tabs[2]:
@@ -413,6 +610,49 @@ def main():
                 st.text(log)
         else:
             st.info("No generation logs available. Generate a component to see the logs.")
+        
+        call_records = (
+            gemini_client.metrics.records(generation=st.session_state.generation_id)
+            if st.session_state.generation_id else []
+        )
+        if call_records:
+            st.markdown("### 📡 Model calls")
+            st.dataframe(
+                [
+                    {
+                        "operation": record["operation"],
+                        "region": record["region"],
+                        "attempt": record["attempt"],
+                        "queue wait (s)": round(record["queue_wait"], 3),
+                        "TTFB (s)": None if record["ttfb"] is None else round(record["ttfb"], 3),
+                        "latency (s)": round(record["latency"], 3),
+                        "input tokens": record["input_tokens"],
+                        "output tokens": record["output_tokens"],
+                        "finish reason": record["finish_reason"],
+                        "error": record["error_class"],
+                    }
+                    for record in call_records
+                ],
+                use_container_width=True
+            )
+        
+        with st.expander("📈 Call metrics (all generations)"):
+            st.json(gemini_client.metrics.snapshot())
+            st.download_button(
+                label="📥 Download Prometheus metrics",
+                data=gemini_client.metrics.prometheus(),
+                file_name="metrics.prom",
+                mime="text/plain"
+            )
+        
+        with st.expander("🧵 Background jobs"):
+            st.json(get_job_queue().stats())
+        
+        with st.expander("🌍 Region health"):
+            st.json(gemini_client.region_health())
+            if gemini_client.rate_limiter.enabled:
+                st.markdown("**Local rate limiter**")
+                st.json(gemini_client.rate_limiter.stats())
 
     # Visualization Tab
     with tabs[3]:
@@ -421,7 +661,7 @@ def main():
         if st.session_state.component_svg:
             st.markdown("""
             <div class="info-message">
-                Below is an AI-generated visualization of your component. This is a simplified representation showing the component's structure and states.
+                Below is a visualization of your component. This is a simplified representation showing the component's variants, sizes and states.
             </div>
             """, unsafe_allow_html=True)
             
@@ -450,5 +690,7 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
+    logger.debug(f"Script rerun took {(time.perf_counter() - rerun_started) * 1000:.1f} ms")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""
+Zip artifacts of generated components.
+
+Archives are built once per content hash into an artifact directory
+(``COMPONENT_ARTIFACT_DIR``, default ``.cache/artifacts``) and referred to by
+that hash afterwards, so the app, the HTTP API and batch exports serve the
+stored file instead of rebuilding and re-deflating it. Archives are written
+entry by entry to a temporary file and moved into place when complete: a
+large export never has to fit in memory, and readers never see a partial zip.
+"""
+import os
+import re
+import uuid
+import hashlib
+import logging
+import zipfile
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+DEFAULT_ARTIFACT_DIR = os.environ.get("COMPONENT_ARTIFACT_DIR", os.path.join(".cache", "artifacts"))
+
+AUTO = "auto"
+DEFLATED = "deflated"
+STORED = "stored"
+COMPRESSIONS = (AUTO, DEFLATED, STORED)
+
+# Formats that are compressed already; deflating them again costs CPU and saves nothing
+COMPRESSED_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".woff", ".woff2", ".gz", ".br", ".zip", ".mp4")
+
+# Fixed timestamp for in-memory entries, so identical content gives an identical zip
+_EPOCH = (1980, 1, 1, 0, 0, 0)
+_ARTIFACT_ID = re.compile(r"^[0-9a-f]{32}$")
+_CHUNK_SIZE = 64 * 1024
+
+
+def compress_type(filename: str, compression: str = AUTO) -> int:
+    """Zip compression method for an entry under the given mode."""
+    if compression == STORED or (compression == AUTO and filename.lower().endswith(COMPRESSED_SUFFIXES)):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class Artifact(NamedTuple):
+    id: str
+    path: str
+    size: int
+    filename: str
+
+
+class ArchiveWriter:
+    """
+    A zip written incrementally to disk.
+
+    Entries go to a temporary file next to ``path``; ``close`` moves it into
+    place, ``abort`` (or leaving the ``with`` block with an error) discards it.
+    """
+
+    def __init__(self, path: str, compression: str = AUTO, compresslevel: int = 6):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression!r}; expected one of {', '.join(COMPRESSIONS)}")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.compression = compression
+        self.entries = 0
+        self._tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+        self._zip = zipfile.ZipFile(self._tmp_path, "w", compresslevel=compresslevel, allowZip64=True)
+
+    def add_files(self, files: Dict[str, str], folder: str) -> None:
+        """Add in-memory files under ``folder/``."""
+        for filename in sorted(files):
+            info = zipfile.ZipInfo(f"{folder}/{filename}", date_time=_EPOCH)
+            info.compress_type = compress_type(filename, self.compression)
+            info.external_attr = 0o644 << 16
+            self._zip.writestr(info, files[filename])
+            self.entries += 1
+
+    def add_directory(self, directory: str, folder: str) -> None:
+        """Add every file below ``directory`` under ``folder/``, streamed from disk."""
+        for path, relative in _walk(directory):
+            self._zip.write(path, f"{folder}/{relative}", compress_type=compress_type(relative, self.compression))
+            self.entries += 1
+
+    def close(self) -> str:
+        self._zip.close()
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._zip.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _walk(directory: str) -> List[Tuple[str, str]]:
+    """(path, relative path with forward slashes) of the files below ``directory``, sorted."""
+    entries = []
+    for root, dirs, filenames in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            entries.append((path, os.path.relpath(path, directory).replace(os.sep, "/")))
+    return entries
+
+
+def _read_chunks(path: str, chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class ArtifactStore:
+    """
+    Content-addressed zip archives in a directory.
+
+    The artifact ID is a hash of the component name, the compression mode and
+    every file name and content, so an archive is only ever built once and can
+    be cached forever by clients. The least recently used archives are removed
+    once the directory grows beyond ``max_bytes``.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self,
+                 artifact_dir: str = None,
+                 compression: str = AUTO,
+                 max_bytes: int = 500 * 1024 * 1024,
+                 logger: logging.Logger = None):
+        """
+        Initialize the ArtifactStore.
+
+        Args:
+            artifact_dir (str, optional): Directory holding the archives. Defaults to the
+                COMPONENT_ARTIFACT_DIR environment variable or ``.cache/artifacts``.
+            compression (str): Default mode: ``auto`` (deflate text, store already-compressed
+                formats as they are), ``deflated`` or ``stored`` (no compression at all).
+            max_bytes (int): Size of the directory above which old archives are removed.
+            logger (logging.Logger, optional): Custom logger instance.
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression!r}; expected one of {', '.join(COMPRESSIONS)}")
+        self.artifact_dir = artifact_dir or DEFAULT_ARTIFACT_DIR
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        self._stats = {"built": 0, "reused": 0, "pruned": 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.artifact_dir, exist_ok=True)
+
+    @classmethod
+    def shared(cls) -> "ArtifactStore":
+        """Process-wide store in the default artifact directory."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def _digest(component_name: str, compression: str, entries: Iterable[Tuple[str, Iterable[bytes]]]) -> str:
+        digest = hashlib.sha256(f"{component_name}\0{compression}".encode("utf-8"))
+        for name, chunks in entries:
+            digest.update(b"\0" + name.encode("utf-8") + b"\0")
+            for chunk in chunks:
+                digest.update(chunk)
+        return digest.hexdigest()[:32]
+
+    def content_hash(self, files: Dict[str, str], component_name: str, compression: str = None) -> str:
+        """Artifact ID of the archive ``archive`` would build for these files."""
+        return self._digest(component_name, compression or self.compression,
+                            ((name, [files[name].encode("utf-8")]) for name in sorted(files)))
+
+    def _path(self, artifact_id: str) -> str:
+        return os.path.join(self.artifact_dir, f"{artifact_id}.zip")
+
+    def get(self, artifact_id: str, component_name: str = "component") -> Optional[Artifact]:
+        """A stored archive by ID, or None if it is unknown or was removed."""
+        if not artifact_id or not _ARTIFACT_ID.match(artifact_id):
+            return None
+        path = self._path(artifact_id)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        return Artifact(artifact_id, path, size, f"{component_name}_component.zip")
+
+    def _reuse(self, artifact_id: str, component_name: str) -> Optional[Artifact]:
+        artifact = self.get(artifact_id, component_name)
+        if artifact is not None:
+            # Last access time for the least-recently-used cleanup
+            os.utime(artifact.path)
+            with self._lock:
+                self._stats["reused"] += 1
+        return artifact
+
+    def archive(self, files: Dict[str, str], component_name: str, compression: str = None) -> Artifact:
+        """The archive of a component's files under ``component_name/``, built on first request."""
+        compression = compression or self.compression
+        artifact_id = self.content_hash(files, component_name, compression)
+        artifact = self._reuse(artifact_id, component_name)
+        if artifact is not None:
+            return artifact
+        with ArchiveWriter(self._path(artifact_id), compression) as writer:
+            writer.add_files(files, component_name)
+        return self._built(artifact_id, component_name)
+
+    def archive_directory(self, directory: str, component_name: str = None, compression: str = None) -> Artifact:
+        """The archive of a directory (e.g. saved component files), streamed from disk."""
+        compression = compression or self.compression
+        component_name = component_name or os.path.basename(os.path.normpath(directory))
+        entries = _walk(directory)
+        artifact_id = self._digest(component_name, compression,
+                                   ((relative, _read_chunks(path)) for path, relative in entries))
+        artifact = self._reuse(artifact_id, component_name)
+        if artifact is not None:
+            return artifact
+        with ArchiveWriter(self._path(artifact_id), compression) as writer:
+            writer.add_directory(directory, component_name)
+        return self._built(artifact_id, component_name)
+
+    def _built(self, artifact_id: str, component_name: str) -> Artifact:
+        with self._lock:
+            self._stats["built"] += 1
+        self._prune(keep=artifact_id)
+        return self.get(artifact_id, component_name)
+
+    def iter_chunks(self, artifact: Artifact, chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+        """Read a stored archive in chunks, for streaming responses."""
+        return _read_chunks(artifact.path, chunk_size)
+
+    def _prune(self, keep: str = None) -> None:
+        """Remove the least recently used archives while the directory is over ``max_bytes``."""
+        archives = []
+        for entry in os.scandir(self.artifact_dir):
+            if entry.name.endswith(".zip") and entry.is_file():
+                stat = entry.stat()
+                archives.append((stat.st_mtime, stat.st_size, entry.path, entry.name[:-4]))
+        total = sum(size for _, size, _, _ in archives)
+        for _, size, path, artifact_id in sorted(archives):
+            if total <= self.max_bytes:
+                break
+            if artifact_id == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                self.logger.warning(f"Could not remove artifact {path}: {str(e)}")
+                continue
+            total -= size
+            with self._lock:
+                self._stats["pruned"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,278 @@
+"""
+Headless batch generation of many components from a JSON or YAML manifest.
+
+Usage (from the ``src`` directory):
+
+    python -m utils.batch manifest.yaml --concurrency 8 --output-dir generated_components
+    python -m utils.batch manifest.yaml --archive components.zip   # also export everything as one zip
+"""
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional
+
+from .artifacts import AUTO, COMPRESSIONS, ArchiveWriter
+from .gemini_client import GeminiRegionClient
+from .component_generator import ComponentGenerator
+from .generation_cache import GenerationCache
+from .file_utils import save_component_files
+
+STATE_FILE = ".batch_state.json"
+# Component names become directory and archive folder names
+_COMPONENT_NAME = re.compile(r"^[A-Z][A-Za-z0-9]*$")
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Load a JSON or YAML manifest and return normalized component specs.
+
+    Raises:
+        ValueError: If a component name is not a PascalCase identifier or is used twice.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is required for YAML manifests: pip install pyyaml")
+        manifest = yaml.safe_load(text)
+    else:
+        manifest = json.loads(text)
+
+    if isinstance(manifest, list):
+        manifest = {"components": manifest}
+    defaults = manifest.get("defaults", {})
+    specs = [_normalize_spec({**defaults, **spec}) for spec in manifest.get("components", [])]
+    seen = set()
+    for spec in specs:
+        # Output directories are the lowercased names
+        name = spec["component_name"].lower()
+        if name in seen:
+            raise ValueError(f"Component name {spec['component_name']!r} is used more than once in {path}")
+        seen.add(name)
+    return specs
+
+
+def _normalize_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    component_type = spec.get("type") or spec.get("component_type") or "Custom"
+    component_name = spec.get("name") or spec.get("component_name") or component_type
+    if not isinstance(component_name, str) or not _COMPONENT_NAME.match(component_name):
+        raise ValueError(f"Component name {component_name!r} must be a PascalCase identifier")
+    return {
+        "component_name": component_name,
+        "component_type": component_type,
+        "variants": list(spec.get("variants", [])),
+        "sizes": list(spec.get("sizes", [])),
+        "features": list(spec.get("features", [])),
+        "custom_requirements": spec.get("custom_requirements", ""),
+    }
+
+
+def spec_key(spec: Dict[str, Any]) -> str:
+    """Stable identity of a spec, used to decide whether it already succeeded."""
+    return GenerationCache.make_key(
+        **{**spec, **{field: sorted(spec[field]) for field in ("variants", "sizes", "features")}}
+    )
+
+
+def _percentile(values: List[float], quantile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[int(quantile * (len(ordered) - 1))]
+
+
+class BatchGenerator:
+    """
+    Generate many components with bounded concurrency.
+
+    Results are written through ``save_component_files``. Successful specs are
+    recorded in a state file inside ``output_dir`` so an interrupted run can be
+    resumed without regenerating them. An export archive is appended to one
+    component at a time as results arrive, from the saved files.
+    """
+
+    def __init__(self,
+                 component_generator: ComponentGenerator,
+                 output_dir: str = "generated_components",
+                 concurrency: int = 4,
+                 logger: logging.Logger = None):
+        """
+        Initialize the BatchGenerator.
+
+        Args:
+            component_generator (ComponentGenerator): Generator used for every spec.
+            output_dir (str): Root directory; each component goes to ``<output_dir>/<name lower>``.
+            concurrency (int): Maximum number of generations in flight.
+            logger (logging.Logger, optional): Custom logger instance.
+        """
+        self.component_generator = component_generator
+        self.output_dir = output_dir
+        self.concurrency = max(1, concurrency)
+        self.logger = logger or logging.getLogger(__name__)
+        self.state_path = os.path.join(output_dir, STATE_FILE)
+        self._state_lock = threading.Lock()
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"succeeded": {}}
+
+    def _mark_succeeded(self, state: Dict[str, Any], key: str, spec: Dict[str, Any]) -> None:
+        with self._state_lock:
+            state["succeeded"][key] = spec["component_name"]
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    def _component_dir(self, spec: Dict[str, Any]) -> str:
+        return os.path.join(self.output_dir, spec["component_name"].lower())
+
+    def _export(self, writer: Optional[ArchiveWriter], spec: Dict[str, Any]) -> None:
+        component_dir = self._component_dir(spec)
+        if writer is not None and os.path.isdir(component_dir):
+            writer.add_directory(component_dir, spec["component_name"])
+
+    def _generate_one(self, spec: Dict[str, Any], bypass_cache: bool) -> float:
+        started = time.monotonic()
+        files = self.component_generator.generate_component(bypass_cache=bypass_cache, **spec)
+        save_component_files(files, self._component_dir(spec))
+        return time.monotonic() - started
+
+    def run(self, specs: List[Dict[str, Any]], resume: bool = True, bypass_cache: bool = False,
+            archive_path: str = None, compression: str = AUTO) -> Dict[str, Any]:
+        """
+        Generate all specs and return a summary.
+
+        Args:
+            specs: Normalized component specs (see ``load_manifest``).
+            resume: Skip specs recorded as succeeded by a previous run.
+            bypass_cache: Force fresh model calls instead of serving cached results.
+            archive_path: Also export every generated (or skipped) component into this zip.
+            compression: Compression of the export, see ``ArchiveWriter``.
+
+        Returns:
+            dict: Counts, failures, wall time, throughput and latency percentiles.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        state = self._load_state() if resume else {"succeeded": {}}
+        pending = []
+        skipped = 0
+        latencies = []
+        failures = {}
+        started = time.monotonic()
+
+        # Written incrementally and only moved into place once complete
+        writer = ArchiveWriter(archive_path, compression) if archive_path else None
+        try:
+            for spec in specs:
+                key = spec_key(spec)
+                if key in state["succeeded"]:
+                    skipped += 1
+                    self._export(writer, spec)
+                else:
+                    pending.append((key, spec))
+
+            self.logger.info(f"Batch: {len(pending)} to generate, {skipped} already done, concurrency {self.concurrency}")
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+                futures = {
+                    executor.submit(self._generate_one, spec, bypass_cache): (key, spec)
+                    for key, spec in pending
+                }
+                for future in as_completed(futures):
+                    key, spec = futures[future]
+                    name = spec["component_name"]
+                    try:
+                        latency = future.result()
+                    except Exception as e:
+                        failures[name] = str(e)
+                        self.logger.error(f"Batch: {name} failed: {str(e)}")
+                        continue
+                    latencies.append(latency)
+                    self._mark_succeeded(state, key, spec)
+                    self._export(writer, spec)
+                    self.logger.info(f"Batch: {name} generated in {latency:.1f}s")
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        if writer is not None:
+            writer.close()
+            self.logger.info(f"Batch: exported {writer.entries} files to {archive_path}")
+
+        wall_time = time.monotonic() - started
+        return {
+            "total": len(specs),
+            "succeeded": len(latencies),
+            "skipped": skipped,
+            "failed": len(failures),
+            "failures": failures,
+            "archive": archive_path,
+            "wall_time_s": round(wall_time, 3),
+            "throughput_per_min": round(len(latencies) / wall_time * 60, 2) if wall_time > 0 else 0.0,
+            "latency_s": {
+                "p50": round(_percentile(latencies, 0.5), 3),
+                "p95": round(_percentile(latencies, 0.95), 3),
+                "max": round(max(latencies), 3) if latencies else 0.0,
+            },
+        }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Human-readable throughput/latency summary."""
+    lines = [
+        f"Components: {summary['total']} total, {summary['succeeded']} generated, "
+        f"{summary['skipped']} skipped, {summary['failed']} failed",
+        f"Wall time: {summary['wall_time_s']:.1f}s, throughput: {summary['throughput_per_min']:.2f} components/min",
+        f"Latency: p50 {summary['latency_s']['p50']:.1f}s, p95 {summary['latency_s']['p95']:.1f}s, "
+        f"max {summary['latency_s']['max']:.1f}s",
+    ]
+    if summary.get("archive"):
+        lines.append(f"Archive: {summary['archive']}")
+    for name, error in summary["failures"].items():
+        lines.append(f"  FAILED {name}: {error}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate React components in batch from a manifest")
+    parser.add_argument("manifest", help="Path to a JSON or YAML manifest")
+    parser.add_argument("--output-dir", default="generated_components", help="Root output directory")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum generations in flight")
+    parser.add_argument("--no-resume", action="store_true", help="Regenerate specs that already succeeded")
+    parser.add_argument("--bypass-cache", action="store_true", help="Do not serve results from the generation cache")
+    parser.add_argument("--archive", help="Also export all components into this zip, written as they complete")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default=AUTO,
+                        help="Compression of the export; 'stored' skips deflate entirely")
+    parser.add_argument("--project-id", default=None, help="Google Cloud project (defaults to GCP_PROJECT)")
+    args = parser.parse_args(argv)
+
+    try:
+        specs = load_manifest(args.manifest)
+    except ValueError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=logging.INFO)
+    component_generator = ComponentGenerator(
+        GeminiRegionClient(project_id=args.project_id),
+        cache=GenerationCache()
+    )
+    batch = BatchGenerator(component_generator, output_dir=args.output_dir, concurrency=args.concurrency)
+    summary = batch.run(specs, resume=not args.no_resume, bypass_cache=args.bypass_cache,
+                        archive_path=args.archive, compression=args.compression)
+    print(format_summary(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,204 @@
+"""
+Offline benchmark suite for the generation pipeline.
+
+Model calls go to a ``FakeBackend`` (simulated per-region latency and
+faults), so no credentials or network are needed and results are
+repeatable for a given seed. Every case reports throughput and p50/p95/p99
+latency; ``--json`` prints the results for regression tracking.
+
+Simulated delays are multiplied by ``--time-scale``; latencies of the model
+cases are reported in real (scaled) milliseconds.
+
+Usage (from the ``src`` directory):
+
+    python -m utils.benchmark --requests 40 --concurrency 8 --time-scale 0.01
+    python -m utils.benchmark --cases postprocess validate zip --json
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from .artifacts import DEFLATED, STORED, ArtifactStore
+from .call_metrics import CallMetrics, summarize_records
+from .component_generator import ComponentGenerator
+from .fake_backend import FakeBackend, RegionProfile, canned_payload
+from .file_utils import save_component_files
+from .gemini_client import GeminiRegionClient
+from .rate_limiter import RateLimiter
+from .region_health import RegionHealthTracker
+from .retry_policy import RetryPolicy
+
+MODEL_CASES = ("generate_component", "failover", "faults")
+LOCAL_CASES = ("postprocess", "validate", "save", "zip", "zip_stored", "zip_cached")
+CASES = MODEL_CASES + LOCAL_CASES
+
+_SPEC = dict(component_type="Button", variants=["primary", "secondary"], sizes=["small", "medium", "large"],
+             features=["Hover effects"], custom_requirements="")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linearly interpolated ``q``-th percentile (0-100) of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(case: str, latencies: List[float], elapsed: float, errors: int = 0, **extra) -> Dict[str, object]:
+    """Throughput and latency percentiles (in ms) of one case."""
+    return {
+        "case": case,
+        "count": len(latencies) + errors,
+        "errors": errors,
+        "throughput_per_s": round((len(latencies) + errors) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        **extra,
+    }
+
+
+def _scaled_policy(time_scale: float) -> RetryPolicy:
+    """GENERATION_POLICY with its deadline and backoff on the simulated clock."""
+    return RetryPolicy(deadline=240.0 * time_scale, max_attempts=6,
+                       backoff_base=1.0 * time_scale, backoff_max=10.0 * time_scale)
+
+
+def make_generator(backend: FakeBackend, time_scale: float) -> ComponentGenerator:
+    """A generator with private health, metrics and (disabled) rate limiting, backed by ``backend``."""
+    client = GeminiRegionClient(
+        project_id="benchmark",
+        model_pool=backend,
+        health_tracker=RegionHealthTracker(default_latency=30.0 * time_scale, open_seconds=30.0 * time_scale),
+        metrics=CallMetrics(),
+        retry_policy=_scaled_policy(time_scale),
+        rate_limiter=RateLimiter(),
+    )
+    return ComponentGenerator(client)
+
+
+def bench_generation(case: str, backend: FakeBackend, requests: int, concurrency: int,
+                     time_scale: float) -> Dict[str, object]:
+    """Concurrent ``generate_component`` calls with distinct specs (nothing is cached or coalesced)."""
+    generator = make_generator(backend, time_scale)
+
+    def run(index: int):
+        started = time.perf_counter()
+        try:
+            generator.generate_component(f"Bench{index}", **_SPEC)
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [result for result in results if result is not None]
+    calls = summarize_records(generator.gemini_client.metrics.records())
+    return summarize(case, latencies, elapsed, errors=len(results) - len(latencies),
+                     concurrency=concurrency, time_scale=time_scale,
+                     model_calls=calls["calls"], failed_calls=calls["errors"], backend=backend.stats())
+
+
+def _time_each(case: str, function: Callable[[int], object], iterations: int, **extra) -> Dict[str, object]:
+    latencies = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        call_started = time.perf_counter()
+        function(index)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(case, latencies, time.perf_counter() - started, **extra)
+
+
+def bench_local(case: str, iterations: int) -> Dict[str, object]:
+    """Post-processing, validation, saving and archiving of canned components (no model calls)."""
+    generator = ComponentGenerator(gemini_client=None)
+    # Distinct names per iteration so the memoized file index does not flatter validation
+    names = [f"Bench{index}" for index in range(iterations)]
+    payloads = [canned_payload(f"Component Name: {name}") for name in names]
+    components = [generator._process_response(payload) for payload in payloads]
+
+    if case == "postprocess":
+        return _time_each(case, lambda i: generator._process_response(payloads[i]), iterations,
+                          bytes=len(payloads[0]))
+    if case == "validate":
+        return _time_each(case, lambda i: generator._validation_errors(components[i], names[i]), iterations)
+    with tempfile.TemporaryDirectory() as directory:
+        if case.startswith("zip"):
+            # zip builds every archive (deflated), zip_stored skips deflate, zip_cached serves built ones
+            store = ArtifactStore(directory, compression=STORED if case == "zip_stored" else DEFLATED)
+            if case == "zip_cached":
+                for index in range(iterations):
+                    store.archive(components[index], names[index])
+            return _time_each(case, lambda i: store.archive(components[i], names[i]), iterations,
+                              bytes=store.archive(components[0], names[0]).size)
+        return _time_each(case, lambda i: save_component_files(components[i], os.path.join(directory, names[i])),
+                          iterations)
+
+
+def run_benchmarks(cases: List[str], requests: int = 40, concurrency: int = 8, iterations: int = 200,
+                   time_scale: float = 0.01, seed: int = 7) -> List[Dict[str, object]]:
+    """Run the selected cases in a fixed order."""
+    backends = {
+        "generate_component": lambda: FakeBackend(time_scale=time_scale, seed=seed),
+        # The primary region is out of quota; every request has to move on
+        "failover": lambda: FakeBackend(profiles={"us-central1": RegionProfile(throttle_rate=1.0)},
+                                        time_scale=time_scale, seed=seed),
+        "faults": lambda: FakeBackend(default_profile=RegionProfile(throttle_rate=0.05, unavailable_rate=0.05,
+                                                                    truncation_rate=0.05, malformed_rate=0.05),
+                                      time_scale=time_scale, seed=seed),
+    }
+    results = []
+    for case in CASES:
+        if case not in cases:
+            continue
+        if case in backends:
+            results.append(bench_generation(case, backends[case](), requests, concurrency, time_scale))
+        else:
+            results.append(bench_local(case, iterations))
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the generation pipeline against a fake Gemini backend")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES), help="Cases to run")
+    parser.add_argument("--requests", type=int, default=40, help="generate_component calls per model case")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent generate_component calls")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed runs per local case")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Factor applied to simulated delays")
+    parser.add_argument("--seed", type=int, default=7, help="Seed of the simulated faults and latencies")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    # Simulated failures are expected; keep the client's warnings out of the report
+    logging.basicConfig(level=logging.CRITICAL)
+
+    results = run_benchmarks(args.cases, args.requests, args.concurrency, args.iterations,
+                             args.time_scale, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'case':<20}{'count':>7}{'errors':>8}{'ops/s':>10}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+    for result in results:
+        print(f"{result['case']:<20}{result['count']:>7}{result['errors']:>8}{result['throughput_per_s']:>10.2f}"
+              f"{result['p50_ms']:>11.3f}{result['p95_ms']:>11.3f}{result['p99_ms']:>11.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
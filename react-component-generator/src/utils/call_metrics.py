@@ -0,0 +1,424 @@
+"""
+Per-call instrumentation of model requests.
+
+Every attempt sent to a region is recorded with its queue wait, time to
+first byte, total latency, token usage, finish reason and error class. The
+records are aggregated into fixed-bucket histograms that can be exported in
+the Prometheus text format or as a JSON snapshot, and served over HTTP with
+``serve_metrics`` (the app does so when ``METRICS_PORT`` is set).
+"""
+import time
+import json
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+QUEUE_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+# Generation the current calls belong to (see ``generation_scope``)
+_current_generation: contextvars.ContextVar = contextvars.ContextVar("generation", default=None)
+
+
+@contextmanager
+def generation_scope(generation: str) -> Iterator[str]:
+    """Tag every model call started inside the block with ``generation``."""
+    token = _current_generation.set(generation)
+    try:
+        yield generation
+    finally:
+        _current_generation.reset(token)
+
+
+def current_generation() -> Optional[str]:
+    """The generation set by the innermost ``generation_scope``, if any."""
+    return _current_generation.get()
+
+
+# error_class of a streamed call whose consumer stopped reading before it finished
+ABANDONED = "GeneratorExit"
+
+
+class CallRecord(NamedTuple):
+    """One attempt against one region."""
+    operation: str
+    region: str
+    attempt: int
+    generation: Optional[str]
+    started_at: float
+    queue_wait: float
+    ttfb: Optional[float]
+    latency: float
+    input_tokens: Optional[int]
+    output_tokens: Optional[int]
+    cached_tokens: Optional[int]
+    finish_reason: Optional[str]
+    error_class: Optional[str]
+
+    @property
+    def outcome(self) -> str:
+        if self.error_class == ABANDONED:
+            return "abandoned"
+        return "error" if self.error_class else "success"
+
+
+class Histogram:
+    """Cumulative fixed-bucket histogram (not thread-safe; guarded by ``CallMetrics``)."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(upper bound, cumulative count) pairs including ``+Inf``."""
+        pairs, total = [], 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            pairs.append(("+Inf" if bound == float("inf") else _format_number(bound), total))
+        return pairs
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "p50": _round(self.quantile(0.5)),
+            "p95": _round(self.quantile(0.95)),
+            "p99": _round(self.quantile(0.99)),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 4)
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def response_usage(response) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """(prompt, candidates, cached) token counts from a response's usage metadata."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None, None
+    counts = [getattr(usage, field, None) for field in
+              ("prompt_token_count", "candidates_token_count", "cached_content_token_count")]
+    return tuple(count if isinstance(count, int) else None for count in counts)
+
+
+def response_finish_reason(response) -> Optional[str]:
+    """Name of the first candidate's finish reason (e.g. ``STOP`` or ``MAX_TOKENS``)."""
+    try:
+        reason = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return None
+    if reason is None:
+        return None
+    return getattr(reason, "name", None) or str(reason)
+
+
+class CallSample:
+    """Timing of one attempt; finished with ``success`` or ``failure``."""
+
+    def __init__(self, tracker: "RequestTracker", region: str, attempt: int, queued_at: float = None):
+        self.tracker = tracker
+        self.region = region
+        self.attempt = attempt
+        self.started = time.monotonic()
+        self.queue_wait = max(0.0, self.started - queued_at) if queued_at is not None else 0.0
+        self.first_byte_at = None
+        self.last_response = None
+
+    def first_byte(self) -> None:
+        """Mark the arrival of the first streamed chunk."""
+        if self.first_byte_at is None:
+            self.first_byte_at = time.monotonic()
+
+    def chunk(self, response) -> None:
+        """Keep the latest streamed chunk; the last one carries the usage metadata."""
+        self.last_response = response
+
+    def success(self, response=None) -> CallRecord:
+        return self._finish(response if response is not None else self.last_response, None)
+
+    def failure(self, error: BaseException) -> CallRecord:
+        return self._finish(self.last_response, type(error).__name__)
+
+    def abandoned(self) -> CallRecord:
+        """The consumer closed the stream; neither a success nor a region failure."""
+        return self._finish(self.last_response, ABANDONED)
+
+    def _finish(self, response, error_class: Optional[str]) -> CallRecord:
+        finished = time.monotonic()
+        input_tokens, output_tokens, cached_tokens = response_usage(response)
+        latency = finished - self.started
+        record = CallRecord(
+            operation=self.tracker.operation,
+            region=self.region,
+            attempt=self.attempt,
+            generation=self.tracker.generation,
+            started_at=time.time() - latency,
+            queue_wait=self.queue_wait,
+            # Unary calls deliver everything at once
+            ttfb=(self.first_byte_at - self.started) if self.first_byte_at is not None
+            else (None if error_class else latency),
+            latency=latency,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens,
+            finish_reason=response_finish_reason(response),
+            error_class=error_class,
+        )
+        self.tracker.metrics.record(record)
+        return record
+
+
+class RequestTracker:
+    """
+    Numbers the attempts of one logical request (region failover and hedges
+    included) and tags them with the generation active when it was created.
+    """
+
+    def __init__(self, metrics: "CallMetrics", operation: str, generation: str = None):
+        self.metrics = metrics
+        self.operation = operation
+        self.generation = generation if generation is not None else _current_generation.get()
+        self._attempts = 0
+        self._lock = threading.Lock()
+
+    def attempt(self, region: str, queued_at: float = None) -> CallSample:
+        with self._lock:
+            self._attempts += 1
+            attempt = self._attempts
+        return CallSample(self, region, attempt, queued_at)
+
+
+class CallMetrics:
+    """
+    Thread-safe aggregation of model call records.
+
+    Histograms are kept per (operation, region, outcome) for latency, time to
+    first byte and queue wait, and per (operation, region) for token counts.
+    The most recent records are kept verbatim so a single generation's calls
+    can be shown next to its logs.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_records: int = 2000, prefix: str = "gemini"):
+        """
+        Initialize the CallMetrics.
+
+        Args:
+            max_records (int): Number of recent call records kept for ``records``.
+            prefix (str): Prefix of the exported metric names.
+        """
+        self.prefix = prefix
+        self._records = deque(maxlen=max_records)
+        self._histograms: Dict[str, Dict[Tuple[str, ...], Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple[str, ...], float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "CallMetrics":
+        """Process-wide metrics shared by every client that does not bring its own."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def tracker(self, operation: str, generation: str = None) -> RequestTracker:
+        return RequestTracker(self, operation, generation)
+
+    # Metric name -> (help text, label names, buckets); counters have no buckets
+    _HISTOGRAMS = {
+        "call_latency_seconds": ("Total latency of a model call", ("operation", "region", "outcome"), LATENCY_BUCKETS),
+        "call_ttfb_seconds": ("Time to the first byte of a successful model call", ("operation", "region"), LATENCY_BUCKETS),
+        "call_queue_wait_seconds": ("Time a model call waited before it was sent", ("operation", "region"), QUEUE_BUCKETS),
+        "call_input_tokens": ("Prompt tokens per model call", ("operation", "region"), TOKEN_BUCKETS),
+        "call_output_tokens": ("Output tokens per model call", ("operation", "region"), TOKEN_BUCKETS),
+    }
+    _COUNTERS = {
+        "calls_total": ("Model calls by outcome and error class", ("operation", "region", "outcome", "error_class")),
+        "call_retries_total": ("Model calls that were not the first attempt of their request", ("operation", "region")),
+        "finish_reasons_total": ("Finish reasons of successful model calls", ("operation", "finish_reason")),
+        "tokens_total": ("Tokens sent and received", ("operation", "region", "direction")),
+    }
+
+    def _observe(self, name: str, labels: Tuple[str, ...], value: Optional[float]) -> None:
+        if value is None:
+            return
+        series = self._histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self._HISTOGRAMS[name][2])
+        histogram.observe(value)
+
+    def _increment(self, name: str, labels: Tuple[str, ...], amount: float = 1) -> None:
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + amount
+
+    def record(self, record: CallRecord) -> None:
+        """Add a finished call to the records and aggregates."""
+        operation, region = record.operation, record.region
+        with self._lock:
+            self._records.append(record)
+            self._observe("call_latency_seconds", (operation, region, record.outcome), record.latency)
+            self._observe("call_queue_wait_seconds", (operation, region), record.queue_wait)
+            self._increment("calls_total", (operation, region, record.outcome, record.error_class or ""))
+            if record.attempt > 1:
+                self._increment("call_retries_total", (operation, region))
+            if record.error_class is None:
+                self._observe("call_ttfb_seconds", (operation, region), record.ttfb)
+                self._increment("finish_reasons_total", (operation, record.finish_reason or "UNKNOWN"))
+            for name, direction, tokens in (("call_input_tokens", "input", record.input_tokens),
+                                            ("call_output_tokens", "output", record.output_tokens)):
+                if tokens is not None:
+                    self._observe(name, (operation, region), tokens)
+                    self._increment("tokens_total", (operation, region, direction), tokens)
+
+    def records(self, generation: str = None, limit: int = None) -> List[Dict[str, Any]]:
+        """Recent call records as dicts, oldest first, optionally for one generation."""
+        with self._lock:
+            records = [r for r in self._records if generation is None or r.generation == generation]
+        if limit is not None:
+            records = records[-limit:]
+        return [{**r._asdict(), "outcome": r.outcome} for r in records]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable aggregates: counters and histogram summaries per label set."""
+        with self._lock:
+            histograms = {
+                name: [
+                    {**dict(zip(self._HISTOGRAMS[name][1], labels)), **histogram.summary()}
+                    for labels, histogram in sorted(series.items())
+                ]
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: [
+                    {**dict(zip(self._COUNTERS[name][1], labels)), "value": value}
+                    for labels, value in sorted(series.items())
+                ]
+                for name, series in self._counters.items()
+            }
+        return {"histograms": histograms, "counters": counters}
+
+    def prometheus(self) -> str:
+        """Aggregates in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (help_text, label_names, _) in self._HISTOGRAMS.items():
+                series = self._histograms.get(name)
+                if not series:
+                    continue
+                metric = f"{self.prefix}_{name}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for labels, histogram in sorted(series.items()):
+                    for bound, count in histogram.cumulative():
+                        le = f'le="{bound}"'
+                        lines.append(f"{metric}_bucket{_labels(label_names, labels, le)} {count}")
+                    lines.append(f"{metric}_sum{_labels(label_names, labels)} {_format_number(histogram.sum)}")
+                    lines.append(f"{metric}_count{_labels(label_names, labels)} {histogram.count}")
+            for name, (help_text, label_names) in self._COUNTERS.items():
+                series = self._counters.get(name)
+                if not series:
+                    continue
+                metric = f"{self.prefix}_{name}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_labels(label_names, labels)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def summarize_records(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals for a list of call records, e.g. the calls of one generation."""
+    latencies = [r["latency"] for r in records]
+    return {
+        "calls": len(records),
+        "errors": sum(1 for r in records if r["error_class"] and r["error_class"] != ABANDONED),
+        "regions": sorted({r["region"] for r in records}),
+        "input_tokens": sum(r["input_tokens"] or 0 for r in records),
+        "output_tokens": sum(r["output_tokens"] or 0 for r in records),
+        "total_latency": round(sum(latencies), 3),
+        "max_latency": round(max(latencies), 3) if latencies else None,
+    }
+
+
+def _handler(metrics: CallMetrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body, content_type = metrics.prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.split("?")[0] == "/metrics.json":
+                body, content_type = json.dumps(metrics.snapshot()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def serve_metrics(port: int, metrics: CallMetrics = None, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call ``shutdown()`` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _handler(metrics or CallMetrics.shared()))
+    threading.Thread(target=server.serve_forever, name="call-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,277 @@
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, NamedTuple, Tuple
+
+_IDENTIFIER = r"[A-Za-z_$][\w$]*"
+_STRING = r"""'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*\""""
+# Template literal with up to two levels of ${ } nesting (enough for nested class templates)
+_TEMPLATE = r"`(?:\\.|[^`\\$]|\$(?!\{)|\$\{(?:[^{}`]|`(?:\\.|[^`\\$]|\$(?!\{)|\$\{[^{}`]*\})*`|\{[^{}]*\})*\})*`"
+# Balanced braces, three levels deep, for className={...} expressions
+_BRACED = r"[^{}]*"
+for _ in range(3):
+    _BRACED = rf"(?:[^{{}}]|\{{{_BRACED}\}})*"
+
+# Leftmost-first alternatives: comments and literals are consumed whole so
+# nothing inside them is mistaken for an import, export or declaration
+_SCRIPT_TOKENS = re.compile(rf"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+    |(?P<import>\bimport\s+(?P<import_type>type\s+)?(?P<clause>[\w$*{{}}\s,]+?)\s*\bfrom\s*['"](?P<module>[^'"\n]+)['"])
+    |(?P<side_import>\bimport\s*['"](?P<side_module>[^'"\n]+)['"])
+    |(?P<export_list>\bexport\s+(?:type\s+)?\{{(?P<export_names>[^}}]*)\}})
+    |(?P<export>\bexport\s+(?P<export_default>default\s+)?(?:(?:declare|abstract|async)\s+)*
+        (?:(?P<export_kind>const|let|var|function\*?|class|interface|type|enum)\s+)?(?P<export_name>{_IDENTIFIER})?)
+    |(?P<declaration>\b(?P<declaration_kind>interface|type)\s+(?P<declaration_name>{_IDENTIFIER})(?=\s*(?:<[^>]*>)?\s*(?:=|\{{|extends\b)))
+    |(?P<class_name>\bclassName\s*=\s*(?:(?P<class_literal>{_STRING})|\{{(?P<class_expression>{_BRACED})\}}))
+    |(?P<literal>{_STRING}|{_TEMPLATE})
+""", re.DOTALL | re.VERBOSE)
+
+_STYLE_TOKENS = re.compile(r"""
+    (?P<comment>/\*.*?\*/)
+    |(?P<import>@import\s+(?:url\()?\s*['"]?(?P<module>[^'")\s;]+))
+    |(?P<at_rule>@[\w-]+[^{;]*[{;])
+    |(?P<selector>[^{}@;/"'\s][^{}@;/"']*)\{
+""", re.DOTALL | re.VERBOSE)
+
+_LITERALS = re.compile(rf"{_STRING}|{_TEMPLATE}", re.DOTALL)
+_CSS_CLASS = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+_CLASS_TOKEN = re.compile(r"^-?[_a-zA-Z][\w-]*$")
+_MODULE_CLASS = re.compile(rf"\b({_IDENTIFIER})\s*(?:\.\s*([\w$]+)|\[\s*['\"]([\w-]+)['\"]\s*\])")
+_IMPORT_NAMES = re.compile(rf"(?:type\s+)?({_IDENTIFIER})(?:\s+as\s+({_IDENTIFIER}))?")
+
+
+class Import(NamedTuple):
+    module: str
+    default: str
+    names: FrozenSet[str]
+    namespace: str
+    type_only: bool
+
+
+class FileIndex(NamedTuple):
+    """
+    Structural summary of a TSX/TS or CSS file built in one tokenizing pass.
+
+    class_names/class_prefixes come from className attributes only (prefixes
+    are static parts glued to a ``${}`` expression, e.g. ``button--``);
+    literal_words/literal_prefixes cover every string and template literal in
+    the file, so class names built in variables still count as used.
+    """
+    filename: str
+    imports: Tuple[Import, ...] = ()
+    exports: FrozenSet[str] = frozenset()
+    # Read-only: indexes are memoized and shared between callers
+    declarations: Mapping[str, str] = MappingProxyType({})
+    class_names: FrozenSet[str] = frozenset()
+    class_prefixes: FrozenSet[str] = frozenset()
+    dynamic_class_names: bool = False
+    module_classes: FrozenSet[str] = frozenset()
+    literal_words: FrozenSet[str] = frozenset()
+    literal_prefixes: FrozenSet[str] = frozenset()
+    selectors: Tuple[str, ...] = ()
+    css_classes: FrozenSet[str] = frozenset()
+
+    def imports_from(self, *modules: str) -> List[Import]:
+        """
+        Imports of any of the given modules. A module matches the whole import path
+        or its trailing path segments (``ButtonProps`` matches ``./ButtonProps``, but
+        ``react`` does not match ``preact``); one starting with a dot matches the
+        file extension (``.css``).
+        """
+        def matches(path: str, module: str) -> bool:
+            if module.startswith("."):
+                return path.endswith(module)
+            return path == module or path.endswith("/" + module)
+
+        return [imp for imp in self.imports if any(matches(imp.module, module) for module in modules)]
+
+    def imports_name(self, name: str) -> bool:
+        return any(name in imp.names or name in (imp.default, imp.namespace) for imp in self.imports)
+
+    @property
+    def uses_class_names(self) -> bool:
+        return bool(self.class_names or self.class_prefixes or self.dynamic_class_names or self.module_classes)
+
+
+def _split_template(body: str) -> Tuple[List[str], List[str]]:
+    """Static parts and ${ } expressions of a template literal body."""
+    statics, expressions = [], []
+    position = 0
+    while True:
+        start = body.find("${", position)
+        if start < 0:
+            statics.append(body[position:])
+            return statics, expressions
+        statics.append(body[position:start])
+        depth, index = 1, start + 2
+        while index < len(body) and depth:
+            if body[index] == "{":
+                depth += 1
+            elif body[index] == "}":
+                depth -= 1
+            index += 1
+        expressions.append(body[start + 2:index - 1])
+        position = index
+
+
+def literal_classes(code: str) -> Tuple[set, set]:
+    """
+    Class-like words and dynamic prefixes in the string and template literals of ``code``.
+
+    ``'button button--primary'`` gives two words; `` `button--${size}` `` gives the
+    prefix ``button--``. Expressions inside templates are searched recursively.
+    """
+    words, prefixes = set(), set()
+    for match in _LITERALS.finditer(code):
+        literal = match.group()
+        if literal[0] != "`":
+            words.update(word for word in literal[1:-1].split() if _CLASS_TOKEN.match(word))
+            continue
+        statics, expressions = _split_template(literal[1:-1])
+        for index, static in enumerate(statics):
+            tokens = static.split()
+            if index and tokens and not static[0].isspace():
+                tokens.pop(0)  # suffix glued to the previous expression
+            if index < len(statics) - 1 and tokens and not static[-1].isspace():
+                prefix = tokens.pop()
+                if _CLASS_TOKEN.match(prefix):
+                    prefixes.add(prefix)
+            words.update(word for word in tokens if _CLASS_TOKEN.match(word))
+        for expression in expressions:
+            inner_words, inner_prefixes = literal_classes(expression)
+            words |= inner_words
+            prefixes |= inner_prefixes
+    return words, prefixes
+
+
+def _parse_import(match: "re.Match") -> Import:
+    clause = match.group("clause").strip()
+    default = namespace = None
+    names = set()
+    braces = re.search(r"\{([^}]*)\}", clause)
+    if braces:
+        names = {alias or name for name, alias in _IMPORT_NAMES.findall(braces.group(1))}
+        clause = clause[:braces.start()] + clause[braces.end():]
+    star = re.search(rf"\*\s*as\s+({_IDENTIFIER})", clause)
+    if star:
+        namespace = star.group(1)
+        clause = clause[:star.start()] + clause[star.end():]
+    default_match = re.match(rf"\s*({_IDENTIFIER})", clause)
+    if default_match:
+        default = default_match.group(1)
+    return Import(match.group("module"), default, frozenset(names), namespace, bool(match.group("import_type")))
+
+
+def _index_script(filename: str, content: str) -> FileIndex:
+    imports, exports, declarations = [], set(), {}
+    class_names, class_prefixes, module_classes = set(), set(), set()
+    literal_words, literal_prefixes = set(), set()
+    dynamic = False
+
+    for match in _SCRIPT_TOKENS.finditer(content):
+        kind = match.lastgroup
+        if kind == "import":
+            imports.append(_parse_import(match))
+        elif kind == "side_import":
+            imports.append(Import(match.group("side_module"), None, frozenset(), None, False))
+        elif kind == "export_list":
+            for name, alias in _IMPORT_NAMES.findall(match.group("export_names")):
+                exports.add(alias or name)
+        elif kind == "export":
+            if match.group("export_default"):
+                exports.add("default")
+            name = match.group("export_name")
+            if name and (match.group("export_kind") or not match.group("export_default")):
+                exports.add(name)
+            if match.group("export_kind") in ("interface", "type") and name:
+                declarations[name] = match.group("export_kind")
+        elif kind == "declaration":
+            declarations[match.group("declaration_name")] = match.group("declaration_kind")
+        elif kind == "class_name":
+            code = match.group("class_literal") or match.group("class_expression")
+            words, prefixes = literal_classes(code)
+            class_names |= words
+            class_prefixes |= prefixes
+            literal_words |= words
+            literal_prefixes |= prefixes
+            if match.group("class_expression") is not None:
+                # CSS modules: styles.button / styles['button--primary'] with styles imported from a .css file
+                style_objects = {imp.default or imp.namespace for imp in imports if imp.module.endswith(".css")}
+                modules = {
+                    attribute or key
+                    for obj, attribute, key in _MODULE_CLASS.findall(match.group("class_expression"))
+                    if obj in style_objects
+                }
+                module_classes |= modules
+                dynamic = dynamic or not (words or prefixes or modules)
+        elif kind == "literal":
+            words, prefixes = literal_classes(match.group())
+            literal_words |= words
+            literal_prefixes |= prefixes
+
+    return FileIndex(
+        filename=filename,
+        imports=tuple(imports),
+        exports=frozenset(exports),
+        declarations=MappingProxyType(declarations),
+        class_names=frozenset(class_names),
+        class_prefixes=frozenset(class_prefixes),
+        dynamic_class_names=dynamic,
+        module_classes=frozenset(module_classes),
+        literal_words=frozenset(literal_words),
+        literal_prefixes=frozenset(literal_prefixes),
+    )
+
+
+def _index_style(filename: str, content: str) -> FileIndex:
+    imports, selectors, classes = [], [], set()
+    for match in _STYLE_TOKENS.finditer(content):
+        kind = match.lastgroup
+        if kind == "import":
+            imports.append(Import(match.group("module"), None, frozenset(), None, False))
+        elif kind == "selector":
+            for selector in match.group("selector").split(","):
+                selector = " ".join(selector.split())
+                if selector:
+                    selectors.append(selector)
+                    classes.update(_CSS_CLASS.findall(selector))
+    return FileIndex(filename=filename, imports=tuple(imports), selectors=tuple(selectors), css_classes=frozenset(classes))
+
+
+@lru_cache(maxsize=256)
+def index_file(filename: str, content: str) -> FileIndex:
+    """
+    Index a generated file; results are memoized so every validator shares one pass.
+
+    CSS files get selectors and classes, TS/TSX files get imports, exports,
+    interface/type declarations and className usages. Other files get an
+    empty index.
+    """
+    if filename.endswith(".css"):
+        return _index_style(filename, content)
+    if filename.endswith((".ts", ".tsx", ".js", ".jsx")):
+        return _index_script(filename, content)
+    return FileIndex(filename=filename)
+
+
+def class_report(files: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Cross-file className/CSS consistency report for a component.
+
+    Returns:
+        dict: ``unused_css_classes`` (defined in a CSS file but never referenced
+        by any literal or dynamic prefix) and ``undefined_class_names`` (static
+        classNames with no CSS rule), both sorted.
+    """
+    indexes = [index_file(filename, content) for filename, content in files.items()]
+    css_classes = set().union(*(index.css_classes for index in indexes))
+    words = set().union(*(index.literal_words | index.module_classes for index in indexes))
+    prefixes = set().union(*(index.literal_prefixes for index in indexes))
+    class_names = set().union(*(index.class_names | index.module_classes for index in indexes))
+
+    unused = sorted(
+        cls for cls in css_classes
+        if cls not in words and not any(cls.startswith(prefix) for prefix in prefixes)
+    )
+    undefined = sorted(class_names - css_classes) if css_classes else []
+    return {"unused_css_classes": unused, "undefined_class_names": undefined}
@@ -0,0 +1,293 @@
+"""
+Offline stand-in for the Vertex AI models used by ``GeminiRegionClient``.
+
+A ``FakeBackend`` has the same ``get(project_id, region, model_name)`` method
+as ``RegionModelPool``, so it can be passed as a client's ``model_pool``:
+
+    client = GeminiRegionClient(project_id="offline", model_pool=FakeBackend())
+
+Its models answer generation, repair and SVG prompts with canned, valid
+components after a simulated latency, and fail in the ways the real service
+does (429s, 503s, truncated and malformed output) at configurable per-region
+rates. No credentials or network access are needed.
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+
+# Generation prompts name the component in their spec, repair prompts in their first line
+_COMPONENT_NAMES = (re.compile(r"Component Name:\s*(\w+)"), re.compile(r"files of the React component (\w+)"))
+
+
+class RegionProfile(NamedTuple):
+    """
+    Simulated behaviour of one region.
+
+    Latencies are lognormal with the given median and ``sigma`` spread; the
+    first byte arrives after ``ttfb_fraction`` of the call. Rates are
+    per-call probabilities.
+    """
+    latency: float = 8.0
+    sigma: float = 0.35
+    ttfb_fraction: float = 0.2
+    throttle_rate: float = 0.0
+    unavailable_rate: float = 0.0
+    truncation_rate: float = 0.0
+    malformed_rate: float = 0.0
+
+
+class _Reason(NamedTuple):
+    name: str
+
+
+class _Candidate(NamedTuple):
+    finish_reason: Optional[_Reason]
+
+
+class _Usage(NamedTuple):
+    prompt_token_count: int
+    candidates_token_count: int
+    cached_content_token_count: int = 0
+
+
+class FakeResponse:
+    """
+    Just enough of ``GenerationResponse`` for the client and its metrics.
+
+    Like the SDK, reading ``text`` raises ValueError when there is none
+    (e.g. a response blocked by the safety filters).
+    """
+
+    def __init__(self, text: Optional[str], prompt_tokens: int = None, finish_reason: str = None,
+                 output_tokens: int = None, cached_tokens: int = 0):
+        self._text = text
+        self.candidates = [_Candidate(_Reason(finish_reason) if finish_reason else None)]
+        if output_tokens is None and text is not None:
+            output_tokens = max(1, len(text) // 4)
+        self.usage_metadata = (
+            _Usage(prompt_tokens, output_tokens or 0, cached_tokens or 0) if prompt_tokens is not None else None
+        )
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("Response has no text")
+        return self._text
+
+
+def canned_component(name: str) -> Dict[str, str]:
+    """A small component that passes the generator's validation."""
+    block = name.lower()
+    return {
+        f"{name}.tsx": (
+            f"import React from 'react';\n"
+            f"import {{ {name}Props }} from './{name}Props';\n"
+            f"import './{name}.css';\n\n"
+            f"export const {name}: React.FC<{name}Props> = ({{ variant = 'primary', size = 'medium', children, ...rest }}) => (\n"
+            f"  <div className={{`{block} {block}--${{variant}} {block}--${{size}}`}} {{...rest}}>{{children}}</div>\n"
+            f");\n\n"
+            f"export default {name};"
+        ),
+        f"{name}.css": (
+            f".{block} {{\n  display: inline-flex;\n  border-radius: 4px;\n  padding: 8px 16px;\n}}\n"
+            f".{block}--primary {{\n  background-color: #1E88E5;\n  color: #FFFFFF;\n}}\n"
+            f".{block}--secondary {{\n  background-color: #EEEEEE;\n  color: #212121;\n}}\n"
+            f".{block}--small {{\n  padding: 4px 8px;\n}}\n"
+            f".{block}--medium {{\n  padding: 8px 16px;\n}}\n"
+            f".{block}--large {{\n  padding: 12px 24px;\n}}"
+        ),
+        f"{name}Props.ts": (
+            f"import React from 'react';\n\n"
+            f"export interface {name}Props extends React.HTMLAttributes<HTMLDivElement> {{\n"
+            f"  variant?: 'primary' | 'secondary';\n"
+            f"  size?: 'small' | 'medium' | 'large';\n"
+            f"}}"
+        ),
+        f"{name}Example.tsx": (
+            f"import React from 'react';\n"
+            f"import {{ {name} }} from './{name}';\n\n"
+            f"export const {name}Example = () => <{name} variant=\"primary\">{name}</{name}>;"
+        ),
+        "package.json": json.dumps(
+            {"name": f"@design-system/{block}", "version": "1.0.0", "dependencies": {"react": "^18.2.0"}},
+            indent=2,
+        ),
+    }
+
+
+def canned_svg(name: str) -> str:
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 240 80">'
+        '<rect x="20" y="20" width="200" height="40" rx="4" fill="#1E88E5"/>'
+        f'<text x="120" y="45" font-size="14" fill="#FFFFFF" text-anchor="middle">{name}</text>'
+        "</svg>"
+    )
+
+
+def canned_payload(prompt: str) -> str:
+    """Answer a generation, repair or SVG prompt the way the model is asked to."""
+    matches = (pattern.search(prompt) for pattern in _COMPONENT_NAMES)
+    name = next((match.group(1) for match in matches if match), "Component")
+    if "SVG visualization" in prompt:
+        return f"```svg\n{canned_svg(name)}\n```"
+    return json.dumps({"files": canned_component(name)})
+
+
+def _prompt_text(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    return "\n".join(part for part in contents if isinstance(part, str))
+
+
+class _Call(NamedTuple):
+    """What the backend decided for one call."""
+    latency: float
+    ttfb: float
+    outcome: str
+    text: str
+    prompt_tokens: int
+
+
+class FakeBackend:
+    """
+    Pluggable model backend that simulates Gemini without calling it.
+
+    ``time_scale`` multiplies every simulated delay (0.01 turns an 8s call into
+    80ms) so benchmarks can run many calls quickly while keeping the shape of
+    the latency distributions. ``seed`` makes the fault sequence repeatable.
+    """
+
+    def __init__(self,
+                 profiles: Dict[str, RegionProfile] = None,
+                 default_profile: RegionProfile = RegionProfile(),
+                 payload: Callable[[str], str] = canned_payload,
+                 time_scale: float = 1.0,
+                 chunk_size: int = 512,
+                 seed: int = None):
+        """
+        Initialize the FakeBackend.
+
+        Args:
+            profiles (dict, optional): Region -> RegionProfile overriding the default.
+            default_profile (RegionProfile): Behaviour of regions without a profile.
+            payload (callable): ``payload(prompt)`` returning the full response text.
+            time_scale (float): Factor applied to every simulated delay.
+            chunk_size (int): Characters per chunk of a streamed response.
+            seed (int, optional): Seed of the random fault and latency sequence.
+        """
+        self.profiles = dict(profiles or {})
+        self.default_profile = default_profile
+        self.payload = payload
+        self.time_scale = time_scale
+        self.chunk_size = max(1, chunk_size)
+        self._random = random.Random(seed)
+        self._stats: Counter = Counter()
+        self._models: Dict[str, "FakeModel"] = {}
+        self._lock = threading.Lock()
+
+    def profile(self, region: str) -> RegionProfile:
+        return self.profiles.get(region, self.default_profile)
+
+    def get(self, project_id: str, region: str, model_name: str) -> "FakeModel":
+        """Model for ``region`` (same signature as ``RegionModelPool.get``)."""
+        with self._lock:
+            model = self._models.get(region)
+            if model is None:
+                model = self._models[region] = FakeModel(self, region)
+            return model
+
+    def invalidate(self, region: str = None) -> None:
+        with self._lock:
+            for key in list(self._models):
+                if region is None or key == region:
+                    del self._models[key]
+
+    def _plan(self, region: str, contents) -> _Call:
+        profile = self.profile(region)
+        prompt = _prompt_text(contents)
+        with self._lock:
+            latency = self._random.lognormvariate(0.0, profile.sigma) * profile.latency * self.time_scale
+            draw = self._random.random()
+            cut = self._random.uniform(0.3, 0.9)
+            outcome = "ok"
+            for name, rate in (("throttled", profile.throttle_rate), ("unavailable", profile.unavailable_rate),
+                               ("truncated", profile.truncation_rate), ("malformed", profile.malformed_rate)):
+                if draw < rate:
+                    outcome = name
+                    break
+                draw -= rate
+            self._stats[(region, outcome)] += 1
+        text = ""
+        if outcome in ("ok", "truncated", "malformed"):
+            text = self.payload(prompt)
+            if outcome == "truncated":
+                text = text[:int(len(text) * cut)]
+            elif outcome == "malformed":
+                # A trailing comma before the closing brace, as models sometimes emit
+                text = text[:-1] + ",}"
+        ttfb = latency * profile.ttfb_fraction
+        return _Call(latency, ttfb, outcome, text, max(1, len(prompt) // 4))
+
+    @staticmethod
+    def _raise(region: str, call: _Call) -> None:
+        if call.outcome == "throttled":
+            raise ResourceExhausted(f"Quota exceeded for aiplatform in {region} (simulated)")
+        if call.outcome == "unavailable":
+            raise ServiceUnavailable(f"Service unavailable in {region} (simulated)")
+
+    @staticmethod
+    def _response(call: _Call) -> FakeResponse:
+        return FakeResponse(call.text, call.prompt_tokens, "MAX_TOKENS" if call.outcome == "truncated" else "STOP")
+
+    def _chunks(self, call: _Call) -> List[FakeResponse]:
+        pieces = [call.text[i:i + self.chunk_size] for i in range(0, len(call.text), self.chunk_size)] or [""]
+        chunks = [FakeResponse(piece) for piece in pieces[:-1]]
+        chunks.append(self._response(call._replace(text=pieces[-1])))
+        return chunks
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Calls per region and simulated outcome."""
+        with self._lock:
+            result: Dict[str, Dict[str, int]] = {}
+            for (region, outcome), count in sorted(self._stats.items()):
+                result.setdefault(region, {})[outcome] = count
+            return result
+
+
+class FakeModel:
+    """A simulated ``GenerativeModel`` bound to one region."""
+
+    def __init__(self, backend: FakeBackend, region: str):
+        self.backend = backend
+        self.region = region
+
+    def generate_content(self, contents, generation_config=None, safety_settings=None, stream: bool = False, **kwargs):
+        call = self.backend._plan(self.region, contents)
+        if stream:
+            return self._stream(call)
+        time.sleep(call.latency)
+        self.backend._raise(self.region, call)
+        return self.backend._response(call)
+
+    def _stream(self, call: _Call) -> Iterator[FakeResponse]:
+        time.sleep(call.ttfb)
+        self.backend._raise(self.region, call)
+        chunks = self.backend._chunks(call)
+        gap = (call.latency - call.ttfb) / len(chunks)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(gap)
+            yield chunk
+
+    async def generate_content_async(self, contents, generation_config=None, safety_settings=None, **kwargs):
+        call = self.backend._plan(self.region, contents)
+        await asyncio.sleep(call.latency)
+        self.backend._raise(self.region, call)
+        return self.backend._response(call)
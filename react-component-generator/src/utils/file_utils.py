@@ -1,9 +1,10 @@
 import os
-import shutil
 from typing import Dict
 import json
 from pathlib import Path
 
+from .artifacts import ArtifactStore
+
 def save_component_files(files: Dict[str, str], output_dir: str) -> None:
     """Save component files to the specified directory."""
     Path(output_dir).mkdir(parents=True, exist_ok=True)
@@ -51,8 +52,7 @@ def cleanup_old_files(directory: str, max_age_days: int = 7) -> None:
     # TODO: Implement cleanup logic for old generated components
     pass
 
-def create_component_archive(output_dir: str) -> str:
-    """Create a zip archive of the component"""
-    archive_name = os.path.basename(output_dir)
-    shutil.make_archive(archive_name, 'zip', output_dir)
-    return f"{archive_name}.zip" 
\ No newline at end of file
+def create_component_archive(output_dir: str, artifact_dir: str = None) -> str:
+    """Create (or reuse) a zip archive of the component in the artifact directory and return its path"""
+    store = ArtifactStore(artifact_dir) if artifact_dir else ArtifactStore.shared()
+    return store.archive_directory(output_dir).path
@@ -1,9 +1,12 @@
 import os
+import time
+import asyncio
 import logging
-from typing import Union, List, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Union, List, Any, Optional, Iterator, Tuple
 from google.api_core.exceptions import ResourceExhausted
 
-import vertexai
 from vertexai.generative_models import (
     GenerationConfig,
     GenerativeModel,
@@ -16,21 +19,60 @@ from vertexai.preview.vision_models import (
     MultiModalEmbeddingModel,
 )
 
-# Import tenacity for retry logic
-from tenacity import retry, stop_after_attempt, wait_exponential
+from .region_health import RegionHealthTracker
+from .model_pool import RegionModelPool
+from .prompt_cache import PrefixCache
+from .call_metrics import CallMetrics, RequestTracker
+from .retry_policy import FATAL, GENERATION_POLICY, RetryPolicy, RetryState
+from .rate_limiter import RateLimited, RateLimiter
+from .prompt_budget import estimate_tokens
+from .traffic import TrafficRecorder
 
 class GeminiRegionClient:
     """
     A client for interacting with Gemini API with region fallback capabilities.
     """
     
-    def __init__(self, project_id: str = None, logger: logging.Logger = None):
+    def __init__(self,
+                 project_id: str = None,
+                 logger: logging.Logger = None,
+                 hedge: bool = False,
+                 hedge_delay: float = None,
+                 max_hedges_in_flight: int = 4,
+                 max_parallel_regions: int = 2,
+                 health_tracker: RegionHealthTracker = None,
+                 model_pool: RegionModelPool = None,
+                 prefix_cache: PrefixCache = None,
+                 metrics: CallMetrics = None,
+                 retry_policy: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None,
+                 recorder: TrafficRecorder = None):
         """
         Initialize the GeminiRegionClient.
         
         Args:
             project_id (str, optional): Google Cloud Project ID. If None, will try to get from environment.
             logger (logging.Logger, optional): Custom logger instance. If None, will create a new one.
+            hedge (bool): Enable hedged requests by default. Can be overridden per call.
+            hedge_delay (float, optional): Seconds to wait before firing a backup request. If None,
+                the primary region's observed p90 latency is used (or a default until enough samples exist).
+            max_hedges_in_flight (int): Maximum number of backup requests in flight across all calls.
+            max_parallel_regions (int): Maximum number of regions a single hedged call may use at once.
+            health_tracker (RegionHealthTracker, optional): Region scoreboard used to order regions.
+                Defaults to the process-wide shared tracker.
+            model_pool (RegionModelPool, optional): Pool of per-region models. Defaults to the
+                process-wide shared pool so connections stay warm across clients. Any backend with
+                ``get(project_id, region, model_name)``, such as ``FakeBackend``, can be passed instead.
+            prefix_cache (PrefixCache, optional): Cache for stable prompt prefixes. If None, prefixes
+                are sent in full with every request.
+            metrics (CallMetrics, optional): Per-call instrumentation. Defaults to the
+                process-wide shared metrics.
+            retry_policy (RetryPolicy, optional): Deadline, attempt budget and backoff used
+                when a call does not pass its own. Defaults to GENERATION_POLICY.
+            rate_limiter (RateLimiter, optional): Client-side RPM/TPM limits per region and
+                project. Defaults to the process-wide limiter configured from the environment.
+            recorder (TrafficRecorder, optional): Appends every model call (prompt, response,
+                timings, error) to a recording that a ReplayBackend can serve back later.
         """
         self.project_id = project_id or os.environ.get("GCP_PROJECT")
         if not self.project_id:
@@ -38,6 +80,9 @@ class GeminiRegionClient:
             
         self.logger = logger or logging.getLogger(__name__)
         
+        # Gemini model used for all generations
+        self.model_name = "gemini-1.5-pro-002"
+        
         # List of regions to try
         self.regions = [
             "us-central1",
@@ -62,89 +107,572 @@ class GeminiRegionClient:
             temperature=0.2,
             top_p=0.95,
         )
+        
+        # Hedging configuration
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.default_hedge_delay = 30.0
+        self.max_hedges_in_flight = max_hedges_in_flight
+        self.max_parallel_regions = max(1, max_parallel_regions)
+        self._hedges_in_flight = 0
+        self._hedge_lock = threading.Lock()
+        
+        # Region health scoreboard, shared across clients by default
+        self.health = health_tracker or RegionHealthTracker.shared()
+        
+        # Per-region models are created lazily and reused across calls
+        self.model_pool = model_pool or RegionModelPool.shared()
+        
+        # Optional server-side caching of stable prompt prefixes
+        self.prefix_cache = prefix_cache
+        
+        # Latency, token and error metrics for every attempt
+        self.metrics = metrics or CallMetrics.shared()
+        
+        # Deadline and attempt budget of every request (region failover included)
+        self.retry_policy = retry_policy or GENERATION_POLICY
+        
+        # Local quota: callers queue here instead of bursting into 429s
+        self.rate_limiter = rate_limiter or RateLimiter.shared()
+        
+        # Optional capture of all model traffic for replay
+        self.recorder = recorder
+
+    def _get_model(self, region: str) -> GenerativeModel:
+        """Get the pooled Gemini model instance for the given region."""
+        return self.model_pool.get(self.project_id, region, self.model_name)
+
+    def _get_hedge_delay(self, region: str) -> float:
+        """Seconds to wait on ``region`` before firing a backup request."""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        p90 = self.health.latency_quantile(region, 0.9)
+        return self.default_hedge_delay if p90 is None else p90
+
+    def _ordered_regions(self) -> List[str]:
+        """Regions ordered by current health, healthiest first."""
+        regions = self.health.order_regions(self.regions)
+        if regions[:1] != self.regions[:1]:
+            self.logger.info(f"Region order adjusted by health scores: {regions}")
+        return regions
+
+    def region_health(self) -> dict:
+        """Dump the health scoreboard for this client's regions."""
+        snapshot = self.health.snapshot()
+        return {region: snapshot[region] for region in self.regions if region in snapshot}
+
+    def _try_acquire_hedge(self) -> bool:
+        """Reserve a slot for a backup request, respecting the global in-flight cap."""
+        with self._hedge_lock:
+            if self._hedges_in_flight >= self.max_hedges_in_flight:
+                return False
+            self._hedges_in_flight += 1
+            return True
+
+    def _release_hedge(self) -> None:
+        with self._hedge_lock:
+            self._hedges_in_flight -= 1
+
+    def _resolve_request(self, region: str, prompt, prefix: str = None):
+        """
+        Pick the model and contents for a call.
+        
+        Returns (model, contents, uses_cached_prefix). With a cacheable prefix only the
+        variable part of the prompt is sent; otherwise the prefix is prepended to it.
+        """
+        model, contents, uses_cached_prefix = None, prompt, False
+        if prefix is not None and self.prefix_cache is not None and isinstance(prompt, str):
+            try:
+                model = self.prefix_cache.get_model(self.project_id, region, self.model_name, prefix)
+            except Exception as e:
+                self.logger.warning(f"Could not cache prompt prefix in {region}: {str(e)}")
+            uses_cached_prefix = model is not None
+        if model is None:
+            model = self._get_model(region)
+            if prefix is not None:
+                contents = f"{prefix}\n\n{prompt}" if isinstance(prompt, str) else [prefix, *prompt]
+        if self.recorder is not None:
+            model = self.recorder.wrap(model, region, prefix if uses_cached_prefix else None)
+        return model, contents, uses_cached_prefix
+
+    # Prompt token cost of an image part in Gemini 1.5
+    IMAGE_TOKENS = 258
+
+    def _estimate_prompt_tokens(self, prompt, prefix: str = None) -> int:
+        """Prompt tokens charged against the TPM quota, estimated before sending."""
+        parts = [prompt] if isinstance(prompt, str) else list(prompt)
+        if prefix:
+            parts.append(prefix)
+        return sum(estimate_tokens(part) if isinstance(part, str) else self.IMAGE_TOKENS for part in parts)
+
+    def _record_call_failure(self, region: str, error: Exception, prefix: str, uses_cached_prefix: bool) -> None:
+        throttled = isinstance(error, ResourceExhausted)
+        self.health.record_failure(region, error, throttled=throttled)
+        if throttled:
+            self.rate_limiter.throttled(self.project_id, region)
+        if uses_cached_prefix:
+            # The handle may have expired server-side; recreate it on the next call
+            self.prefix_cache.invalidate(self.project_id, region, self.model_name, prefix)
+
+    def _call_region(self, region: str, prompt, gen_config: GenerationConfig, prefix: str = None,
+                     tracker: RequestTracker = None, queued_at: float = None, max_wait: float = None,
+                     **kwargs) -> str:
+        """Send a single request to one region, after waiting for local quota."""
+        queued_at = time.monotonic() if queued_at is None else queued_at
+        reservation = self.rate_limiter.acquire(
+            self.project_id, region, self._estimate_prompt_tokens(prompt, prefix), max_wait
+        )
+        sample = (tracker or self.metrics.tracker("generate")).attempt(region, queued_at)
+        model, uses_cached_prefix = None, False
+        started = time.monotonic()
+        try:
+            model, contents, uses_cached_prefix = self._resolve_request(region, prompt, prefix)
+            response = model.generate_content(
+                contents,
+                generation_config=gen_config,
+                safety_settings=self.safety_settings,
+                **kwargs
+            )
+            text = response.text
+        except Exception as e:
+            if model is None:
+                # Failed before sending (model or context cache creation): the quota was not used
+                self.rate_limiter.release(reservation)
+            sample.failure(e)
+            self._record_call_failure(region, e, prefix, uses_cached_prefix)
+            raise
+        self.rate_limiter.settle(reservation, sample.success(response).input_tokens)
+        self.health.record_success(region, time.monotonic() - started)
+        
+        # Log the response for debugging
+        self.logger.debug(f"Raw response from region {region}: {text}")
+        return text
+
+    async def _acall_region(self, region: str, prompt, gen_config: GenerationConfig, prefix: str = None,
+                            tracker: RequestTracker = None, queued_at: float = None, max_wait: float = None,
+                            **kwargs) -> str:
+        """Send a single asynchronous request to one region, after waiting for local quota."""
+        queued_at = time.monotonic() if queued_at is None else queued_at
+        reservation = await self.rate_limiter.aacquire(
+            self.project_id, region, self._estimate_prompt_tokens(prompt, prefix), max_wait
+        )
+        sample = (tracker or self.metrics.tracker("generate")).attempt(region, queued_at)
+        model, uses_cached_prefix = None, False
+        started = time.monotonic()
+        try:
+            # Building a model (vertexai.init under the process-wide lock) or a context cache
+            # blocks on locks and network round trips, so it runs off the event loop
+            model, contents, uses_cached_prefix = await asyncio.to_thread(self._resolve_request, region, prompt, prefix)
+            response = await model.generate_content_async(
+                contents,
+                generation_config=gen_config,
+                safety_settings=self.safety_settings,
+                **kwargs
+            )
+            text = response.text
+        except asyncio.CancelledError as e:
+            # A losing hedge; not a region failure
+            if model is None:
+                self.rate_limiter.release(reservation)
+            sample.failure(e)
+            raise
+        except Exception as e:
+            if model is None:
+                # Failed before sending (model or context cache creation): the quota was not used
+                self.rate_limiter.release(reservation)
+            sample.failure(e)
+            if uses_cached_prefix:
+                # Invalidating deletes the context cache, another network round trip
+                await asyncio.to_thread(self._record_call_failure, region, e, prefix, uses_cached_prefix)
+            else:
+                self._record_call_failure(region, e, prefix, uses_cached_prefix)
+            raise
+        self.rate_limiter.settle(reservation, sample.success(response).input_tokens)
+        self.health.record_success(region, time.monotonic() - started)
+        
+        # Log the response for debugging
+        self.logger.debug(f"Raw response from region {region}: {text}")
+        return text
+
+    def _log_region_error(self, region: str, error: Exception, kind: str = None) -> None:
+        if isinstance(error, ResourceExhausted):
+            self.logger.warning(f"Region {region} exhausted. Trying next region...")
+        elif isinstance(error, RateLimited):
+            self.logger.info(f"Not sending to region {region}: {str(error)}")
+        elif kind == FATAL:
+            self.logger.error(f"Non-retryable error with region {region}: {str(error)}")
+        else:
+            self.logger.warning(f"Unexpected error with region {region}: {str(error)}")
+
+    def _handle_failure(self, state: RetryState, region: str, error: Exception) -> str:
+        """Classify and log a failed attempt; returns the error class."""
+        kind = state.record_failure(region, error)
+        self._log_region_error(region, error, kind)
+        return kind
+
+    def _next_attempt(self, state: RetryState) -> Tuple[str, float]:
+        """Region of the next attempt; raises once the retry budget or deadline is used up."""
+        attempt = state.next_attempt()
+        if attempt is None:
+            raise state.exhausted() from state.last_error
+        region, delay = attempt
+        if delay:
+            self.logger.info(f"Backing off {delay:.1f}s before retrying region {region}")
+        return region, delay
+
+    def _generate_sequential(self, state: RetryState, prompt, gen_config: GenerationConfig, **kwargs) -> str:
+        """Try regions in order until one succeeds, within the request's retry policy."""
+        while True:
+            region, delay = self._next_attempt(state)
+            if delay:
+                time.sleep(delay)
+            try:
+                return self._call_region(region, prompt, gen_config, max_wait=state.remaining(), **kwargs)
+            except Exception as e:
+                if self._handle_failure(state, region, e) == FATAL:
+                    raise
+
+    def _generate_hedged(self, state: RetryState, prompt, gen_config: GenerationConfig, **kwargs) -> str:
+        """
+        Send to the first region and fire backups to the next regions whenever the
+        in-flight requests exceed their hedge delay. The first valid response wins.
+        
+        Worker threads cannot be interrupted, so losing requests (and requests still
+        running at the deadline) are abandoned and their results discarded once they
+        complete.
+        """
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_parallel_regions, thread_name_prefix="gemini-hedge")
+        
+        def launch(region: str, is_hedge: bool) -> None:
+            future = executor.submit(
+                self._call_region, region, prompt, gen_config,
+                queued_at=time.monotonic(), max_wait=state.remaining(), **kwargs
+            )
+            if is_hedge:
+                self.logger.info(f"Hedging request to region {region}")
+                future.add_done_callback(lambda _: self._release_hedge())
+            pending[future] = region
+        
+        try:
+            while True:
+                if not pending:
+                    # Nothing in flight: next region, backing off if every region was tried
+                    region, delay = self._next_attempt(state)
+                    if delay:
+                        time.sleep(delay)
+                    launch(region, is_hedge=False)
+                
+                can_hedge = state.can_take() and len(pending) < self.max_parallel_regions
+                timeout = state.remaining()
+                if can_hedge:
+                    timeout = min(timeout, self._get_hedge_delay(next(iter(pending.values()))))
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                if not done:
+                    if state.remaining() <= 0:
+                        raise state.exhausted() from state.last_error
+                    # Slow response: fire a backup if the global cap allows it
+                    if can_hedge and self._try_acquire_hedge():
+                        launch(state.take_region(), is_hedge=True)
+                    else:
+                        done, _ = wait(pending, timeout=state.remaining(), return_when=FIRST_COMPLETED)
+                        if not done:
+                            raise state.exhausted() from state.last_error
+                
+                failed = False
+                for future in done:
+                    region = pending.pop(future)
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        if self._handle_failure(state, region, e) == FATAL:
+                            raise
+                        failed = True
+                
+                # Fail over immediately into the slot freed by a failed request
+                if failed and pending and state.can_take():
+                    launch(state.take_region(), is_hedge=False)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _agenerate_sequential(self, state: RetryState, prompt, gen_config: GenerationConfig, **kwargs) -> str:
+        """Try regions in order until one succeeds; the attempt in flight at the deadline is cancelled."""
+        while True:
+            region, delay = self._next_attempt(state)
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                return await asyncio.wait_for(
+                    self._acall_region(region, prompt, gen_config, max_wait=state.remaining(), **kwargs),
+                    timeout=state.remaining()
+                )
+            except Exception as e:
+                if self._handle_failure(state, region, e) == FATAL:
+                    raise
 
-    def _initialize_region(self, region: str) -> None:
-        """Initialize Vertex AI with the specified region."""
-        vertexai.init(project=self.project_id, location=region)
+    async def _agenerate_hedged(self, state: RetryState, prompt, gen_config: GenerationConfig, **kwargs) -> str:
+        """Asynchronous hedging; losing requests are cancelled as soon as a winner returns or the deadline passes."""
+        pending = {}
         
-    def _get_model(self) -> GenerativeModel:
-        """Get the Gemini model instance."""
-        return GenerativeModel("gemini-1.5-pro-002")
+        def launch(region: str, is_hedge: bool) -> None:
+            task = asyncio.ensure_future(
+                self._acall_region(region, prompt, gen_config, queued_at=time.monotonic(),
+                                   max_wait=state.remaining(), **kwargs)
+            )
+            if is_hedge:
+                self.logger.info(f"Hedging request to region {region}")
+                task.add_done_callback(lambda _: self._release_hedge())
+            pending[task] = region
+        
+        try:
+            while True:
+                if not pending:
+                    region, delay = self._next_attempt(state)
+                    if delay:
+                        await asyncio.sleep(delay)
+                    launch(region, is_hedge=False)
+                
+                can_hedge = state.can_take() and len(pending) < self.max_parallel_regions
+                timeout = state.remaining()
+                if can_hedge:
+                    timeout = min(timeout, self._get_hedge_delay(next(iter(pending.values()))))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    if state.remaining() <= 0:
+                        raise state.exhausted() from state.last_error
+                    if can_hedge and self._try_acquire_hedge():
+                        launch(state.take_region(), is_hedge=True)
+                    else:
+                        done, _ = await asyncio.wait(pending, timeout=state.remaining(), return_when=asyncio.FIRST_COMPLETED)
+                        if not done:
+                            raise state.exhausted() from state.last_error
+                
+                failed = False
+                for task in done:
+                    region = pending.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        if self._handle_failure(state, region, e) == FATAL:
+                            raise
+                        failed = True
+                
+                if failed and pending and state.can_take():
+                    launch(state.take_region(), is_hedge=False)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _prepare_generation_config(self, response_mime_type: str = None, generation_config: GenerationConfig = None) -> GenerationConfig:
+        """Build the generation config for a call, applying the requested response MIME type."""
+        gen_config = generation_config or self.default_generation_config
+        
+        # If a specific response format is requested, ensure proper configuration
+        if response_mime_type:
+            gen_config = GenerationConfig(
+                **gen_config.to_dict(),
+                response_mime_type=response_mime_type
+            )
+        return gen_config
+
+    def _prepare_prompt(self, prompt: Union[str, List[Union[str, Part]]], response_mime_type: str = None, json_reminder: bool = True) -> Union[str, List[Union[str, Part]]]:
+        """Normalize multimodal input and add the JSON format reminder where needed."""
+        # Process multimodal input if needed
+        if isinstance(prompt, list) and len(prompt) == 2:
+            image_content, text_prompt = prompt
+            if not isinstance(image_content, Part):
+                image_content = Part.from_data(image_content, mime_type="image/jpeg")
+            prompt = [image_content, text_prompt]
+        
+        # Add JSON format reminder for JSON responses
+        if json_reminder and response_mime_type == "application/json" and isinstance(prompt, str):
+            prompt = f"{prompt}\n\nIMPORTANT: Respond with a valid JSON object only, no markdown or code blocks."
+        return prompt
 
-    @retry(wait=wait_exponential(multiplier=1, min=2, max=10), stop=stop_after_attempt(3))
     def generate_content(self, 
                         prompt: Union[str, List[Union[str, Part]]], 
                         response_mime_type: str = None,
+                        hedge: Optional[bool] = None,
+                        json_reminder: bool = True,
+                        prefix: str = None,
+                        retry_policy: RetryPolicy = None,
+                        generation_config: GenerationConfig = None,
                         **kwargs) -> str:
         """
         Generate content using Gemini model with region fallback.
         
+        Regions are tried in health order under the retry policy: fatal errors
+        (invalid request, auth, safety block) are raised at once, failover-only
+        errors (429, model not in region) move on to the next region, and
+        retryable errors may revisit a region after a jittered backoff, until
+        the attempt budget or the deadline is used up.
+        
         Args:
             prompt: The input prompt (string or list of string/Part for multimodal)
             response_mime_type: Optional MIME type for the response
+            hedge: Override the client's hedging mode for this call
+            json_reminder: Append a "JSON only" reminder to JSON prompts (redundant for compact prompts)
+            prefix: Stable leading part of the prompt (instructions, templates). Sent from the
+                prefix cache when one is configured, otherwise prepended to the prompt.
+            retry_policy: Override the client's retry policy for this call
+            generation_config: Override the default generation config for this call
             **kwargs: Additional arguments to pass to generate_content
             
         Returns:
             str: Generated content
             
         Raises:
-            Exception: If all regions fail
+            RetryExhausted: If every allowed attempt failed or the deadline passed
+            Exception: The original error if it is not retryable
+        """
+        gen_config = self._prepare_generation_config(response_mime_type, generation_config)
+        prompt = self._prepare_prompt(prompt, response_mime_type, json_reminder)
+        tracker = self.metrics.tracker("generate")
+        state = (retry_policy or self.retry_policy).start(self._ordered_regions())
+        
+        if (self.hedge if hedge is None else hedge):
+            return self._generate_hedged(state, prompt, gen_config, prefix=prefix, tracker=tracker, **kwargs)
+        return self._generate_sequential(state, prompt, gen_config, prefix=prefix, tracker=tracker, **kwargs)
+
+    async def agenerate_content(self, 
+                               prompt: Union[str, List[Union[str, Part]]], 
+                               response_mime_type: str = None,
+                               hedge: Optional[bool] = None,
+                               json_reminder: bool = True,
+                               prefix: str = None,
+                               retry_policy: RetryPolicy = None,
+                               generation_config: GenerationConfig = None,
+                               **kwargs) -> str:
+        """
+        Asynchronously generate content using Gemini model with region fallback.
+        
+        Uses the SDK's async generate call and backs off with asyncio.sleep, so
+        retries never block the event loop. The attempt in flight when the retry
+        policy's deadline passes is cancelled, as is everything when the
+        awaiting task is cancelled.
+        
+        Args:
+            prompt: The input prompt (string or list of string/Part for multimodal)
+            response_mime_type: Optional MIME type for the response
+            hedge: Override the client's hedging mode for this call
+            json_reminder: Append a "JSON only" reminder to JSON prompts (redundant for compact prompts)
+            prefix: Stable leading part of the prompt (instructions, templates). Sent from the
+                prefix cache when one is configured, otherwise prepended to the prompt.
+            retry_policy: Override the client's retry policy for this call
+            generation_config: Override the default generation config for this call
+            **kwargs: Additional arguments to pass to generate_content_async
+            
+        Returns:
+            str: Generated content
+            
+        Raises:
+            RetryExhausted: If every allowed attempt failed or the deadline passed
+            Exception: The original error if it is not retryable
+        """
+        gen_config = self._prepare_generation_config(response_mime_type, generation_config)
+        prompt = self._prepare_prompt(prompt, response_mime_type, json_reminder)
+        tracker = self.metrics.tracker("generate")
+        state = (retry_policy or self.retry_policy).start(self._ordered_regions())
+        
+        if (self.hedge if hedge is None else hedge):
+            return await self._agenerate_hedged(state, prompt, gen_config, prefix=prefix, tracker=tracker, **kwargs)
+        return await self._agenerate_sequential(state, prompt, gen_config, prefix=prefix, tracker=tracker, **kwargs)
+
+    @staticmethod
+    def _chunk_text(response) -> str:
+        """Text of a streamed chunk; chunks carrying only metadata have none."""
+        try:
+            return response.text
+        except ValueError:
+            return ""
+
+    def generate_content_stream(self,
+                                prompt: Union[str, List[Union[str, Part]]],
+                                response_mime_type: str = None,
+                                json_reminder: bool = True,
+                                prefix: str = None,
+                                retry_policy: RetryPolicy = None,
+                                generation_config: GenerationConfig = None,
+                                **kwargs) -> Iterator[str]:
+        """
+        Stream generated content chunk by chunk with region fallback.
+        
+        Regions are tried in health order, under the retry policy, until one
+        starts producing output. Once text has been yielded the stream is
+        committed to that region, so an error mid-stream is raised to the caller
+        instead of failing over. The deadline only applies before the first chunk.
+        
+        Args:
+            prompt: The input prompt (string or list of string/Part for multimodal)
+            response_mime_type: Optional MIME type for the response
+            json_reminder: Append a "JSON only" reminder to JSON prompts (redundant for compact prompts)
+            prefix: Stable leading part of the prompt (instructions, templates). Sent from the
+                prefix cache when one is configured, otherwise prepended to the prompt.
+            retry_policy: Override the client's retry policy for this call
+            generation_config: Override the default generation config for this call
+            **kwargs: Additional arguments to pass to generate_content
+            
+        Yields:
+            str: Generated text chunks
+            
+        Raises:
+            RetryExhausted: If every allowed attempt failed before producing output
+            Exception: The original error if it is not retryable or happened mid-stream
         """
-        last_error = None
+        gen_config = self._prepare_generation_config(response_mime_type, generation_config)
+        prompt = self._prepare_prompt(prompt, response_mime_type, json_reminder)
+        tracker = self.metrics.tracker("stream")
+        state = (retry_policy or self.retry_policy).start(self._ordered_regions())
         
-        for region in self.regions:
+        while True:
+            region, delay = self._next_attempt(state)
+            if delay:
+                time.sleep(delay)
+            has_output = False
+            uses_cached_prefix = False
+            queued_at = time.monotonic()
             try:
-                self._initialize_region(region)
-                model = self._get_model()
-                
-                # Prepare generation config
-                gen_config = kwargs.pop('generation_config', self.default_generation_config)
-                
-                # If JSON response is requested, ensure proper configuration
-                if response_mime_type == "application/json":
-                    gen_config = GenerationConfig(
-                        **gen_config.to_dict(),
-                        #temperature=0.1,  # Lower temperature for more structured output
-                        #top_p=0.95,
-                        #candidate_count=1,
-                       # stop_sequences=["```"],  # Prevent code block formatting in JSON
-                        response_mime_type=response_mime_type
-                    )
-                elif response_mime_type:
-                    gen_config = GenerationConfig(
-                        **gen_config.to_dict(),
-                        response_mime_type=response_mime_type
-                    )
-                
-                # Process multimodal input if needed
-                if isinstance(prompt, list) and len(prompt) == 2:
-                    image_content, text_prompt = prompt
-                    if not isinstance(image_content, Part):
-                        image_content = Part.from_data(image_content, mime_type="image/jpeg")
-                    prompt = [image_content, text_prompt]
-                
-                # Add JSON format reminder for JSON responses
-                if response_mime_type == "application/json":
-                    if isinstance(prompt, str):
-                        prompt = f"{prompt}\n\nIMPORTANT: Respond with a valid JSON object only, no markdown or code blocks."
-                
-                response = model.generate_content(
-                    prompt,
+                reservation = self.rate_limiter.acquire(
+                    self.project_id, region, self._estimate_prompt_tokens(prompt, prefix), state.remaining()
+                )
+            except RateLimited as e:
+                if self._handle_failure(state, region, e) == FATAL:
+                    raise
+                continue
+            sample = tracker.attempt(region, queued_at)
+            model = None
+            started = time.monotonic()
+            try:
+                model, contents, uses_cached_prefix = self._resolve_request(region, prompt, prefix)
+                responses = model.generate_content(
+                    contents,
                     generation_config=gen_config,
                     safety_settings=self.safety_settings,
+                    stream=True,
                     **kwargs
                 )
-                
-                # Log the response for debugging
-                self.logger.debug(f"Raw response from region {region}: {response.text}")
-                
-                return response.text
-                
-            except ResourceExhausted as e:
-                self.logger.warning(f"Region {region} exhausted. Trying next region...")
-                last_error = e
+                for response in responses:
+                    sample.chunk(response)
+                    text = self._chunk_text(response)
+                    if text:
+                        sample.first_byte()
+                        has_output = True
+                        yield text
+            except GeneratorExit:
+                # The consumer closed the stream: account for the call without blaming the region
+                self.rate_limiter.settle(reservation, sample.abandoned().input_tokens)
+                raise
             except Exception as e:
-                self.logger.warning(f"Unexpected error with region {region}: {str(e)}")
-                last_error = e
-        
-        raise Exception(f"All regions failed. Last error: {str(last_error)}") from last_error
\ No newline at end of file
+                if model is None:
+                    self.rate_limiter.release(reservation)
+                sample.failure(e)
+                self._record_call_failure(region, e, prefix, uses_cached_prefix)
+                if has_output or self._handle_failure(state, region, e) == FATAL:
+                    raise
+                continue
+            
+            self.rate_limiter.settle(reservation, sample.success().input_tokens)
+            self.health.record_success(region, time.monotonic() - started)
+            return
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class GenerationCache:
+    """
+    A persistent, content-addressed cache for validated component files.
+
+    Entries are stored as one JSON file per key inside ``cache_dir``. The file
+    modification time doubles as the "last used" timestamp, so hits refresh an
+    entry and eviction removes the least recently used entries first. Entry
+    count and size are tracked in memory; the directory is only scanned when
+    a limit is exceeded (eviction then trims to 90% of it) or once per
+    ``sweep_interval`` to drop expired entries and pick up other processes' writes.
+    """
+
+    # Eviction trims below the limits, so the next puts do not rescan the directory at once
+    _LOW_WATER = 0.9
+
+    def __init__(self,
+                 cache_dir: str = None,
+                 max_entries: int = 500,
+                 max_bytes: int = 50 * 1024 * 1024,
+                 max_age_seconds: float = 7 * 24 * 3600,
+                 sweep_interval: float = 3600.0,
+                 logger: logging.Logger = None):
+        """
+        Initialize the GenerationCache.
+
+        Args:
+            cache_dir (str, optional): Directory for cache entries. Defaults to the
+                COMPONENT_CACHE_DIR environment variable or ``.cache/components``.
+            max_entries (int): Maximum number of entries kept on disk.
+            max_bytes (int): Maximum total size of all entries in bytes.
+            max_age_seconds (float): Entries unused for longer than this are dropped.
+            sweep_interval (float): Seconds between full scans of the directory while
+                it stays within the limits.
+            logger (logging.Logger, optional): Custom logger instance.
+        """
+        self.cache_dir = cache_dir or os.environ.get(
+            "COMPONENT_CACHE_DIR", os.path.join(".cache", "components")
+        )
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.sweep_interval = sweep_interval
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Entry path -> size in bytes, loaded on first use
+        self._sizes: Optional[Dict[str, int]] = None
+        self._bytes = 0
+        self._last_sweep = 0.0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Build a stable hash from the given key parts (order-insensitive for dict keys)."""
+        payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Return the cached files for ``key`` or None on a miss."""
+        path = self._entry_path(key)
+        with self._lock:
+            try:
+                if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                    os.remove(path)
+                    self._untrack(path)
+                    self.evictions += 1
+                    raise FileNotFoundError(path)
+                with open(path, "r", encoding="utf-8") as f:
+                    files = json.load(f)["files"]
+                # Refresh the LRU timestamp
+                os.utime(path, None)
+                self.hits += 1
+                return files
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.warning(f"Discarding unreadable cache entry {key}: {str(e)}")
+                self._remove(path)
+                self._untrack(path)
+                self.misses += 1
+                return None
+
+    def put(self, key: str, files: Dict[str, str]) -> None:
+        """Store ``files`` under ``key`` and evict entries over the configured limits."""
+        with self._lock:
+            self._load()
+            path = self._entry_path(key)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"created": time.time(), "files": files}, f)
+                size = os.path.getsize(tmp_path)
+                os.replace(tmp_path, path)
+            except Exception:
+                self._remove(tmp_path)
+                raise
+            self._untrack(path)
+            self._sizes[path] = size
+            self._bytes += size
+            if self._over_limits() or time.monotonic() - self._last_sweep > self.sweep_interval:
+                self._evict()
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _untrack(self, path: str) -> None:
+        if self._sizes is not None:
+            self._bytes -= self._sizes.pop(path, 0)
+
+    def _load(self) -> None:
+        """Build the in-memory size index on first use (caller holds the lock)."""
+        if self._sizes is None:
+            self._scan()
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """
+        Rebuild the size index from the directory, dropping expired entries.
+
+        Returns:
+            list: (mtime, size, path) of the remaining entries.
+        """
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                self._remove(path)
+                self.evictions += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        self._sizes = {path: size for _, size, path in entries}
+        self._bytes = sum(self._sizes.values())
+        self._last_sweep = time.monotonic()
+        return entries
+
+    def _over_limits(self, fraction: float = 1.0) -> bool:
+        return len(self._sizes) > self.max_entries * fraction or self._bytes > self.max_bytes * fraction
+
+    def _evict(self) -> None:
+        """Drop expired entries; if still over a limit, the least recently used ones down to the low-water mark."""
+        entries = sorted(self._scan())
+        if not self._over_limits():
+            return
+        while entries and self._over_limits(self._LOW_WATER):
+            _, _, path = entries.pop(0)
+            self._remove(path)
+            self._untrack(path)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    self._remove(os.path.join(self.cache_dir, name))
+            self._sizes = {}
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current on-disk footprint."""
+        with self._lock:
+            self._load()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._sizes),
+                "bytes": self._bytes,
+            }
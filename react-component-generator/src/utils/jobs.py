@@ -0,0 +1,276 @@
+"""
+Background jobs with a bounded worker pool.
+
+Work submitted to a ``JobQueue`` runs on a fixed number of worker threads,
+so throughput is set by the worker count rather than by how many sessions
+are open. Every job gets an ID under which its status, progress, log lines,
+partial output and finally its result or error can be polled from any
+session (or after a browser refresh) until the result expires.
+"""
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while too many jobs are waiting."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function by ``Job.check_cancelled`` after a cancel request."""
+
+
+class Job:
+    """
+    One unit of background work and everything known about it so far.
+
+    The job function receives the job and reports through ``update`` and
+    ``log``; pollers read a consistent copy with ``snapshot``.
+    """
+
+    def __init__(self, kind: str, job_id: str = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.logs: List[str] = []
+        self.partial: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel_requested = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def update(self, progress: float = None, message: str = None, **partial) -> None:
+        """Report progress (0 to 1), a status message and/or partial output."""
+        with self._lock:
+            if progress is not None:
+                self.progress = min(max(progress, 0.0), 1.0)
+            if message is not None:
+                self.message = message
+            self.partial.update(partial)
+
+    def log(self, message: str) -> None:
+        """Append a timestamped log line."""
+        with self._lock:
+            self.logs.append(f"[{datetime.now():%H:%M:%S}] {message}")
+
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if a cancel was requested; call it between steps."""
+        if self._cancel_requested:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the job finished; False on timeout."""
+        return self._done.wait(timeout)
+
+    def _finish(self, status: str, result: Any = None, error: str = None) -> None:
+        with self._lock:
+            self._set_finished(status, result, error)
+        self._done.set()
+
+    def _set_finished(self, status: str, result: Any = None, error: str = None) -> None:
+        """Record the final state (caller holds the lock and sets ``_done`` afterwards)."""
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        if status == SUCCEEDED:
+            self.progress = 1.0
+        self.message = {SUCCEEDED: "Done", FAILED: "Failed", CANCELLED: "Cancelled"}[status]
+
+    def _start(self) -> bool:
+        """Move a queued job to running; False if it was cancelled before a worker took it."""
+        with self._lock:
+            if self.status != QUEUED:
+                return False
+            if self._cancel_requested:
+                self._set_finished(CANCELLED)
+            else:
+                self.status = RUNNING
+                self.started_at = time.time()
+                self.message = "Running"
+                return True
+        self._done.set()
+        return False
+
+    def _cancel(self) -> bool:
+        """Request cancellation, finishing the job at once if it is still queued."""
+        with self._lock:
+            if self.done:
+                return False
+            self._cancel_requested = True
+            if self.status != QUEUED:
+                return True
+            self._set_finished(CANCELLED)
+        self._done.set()
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Consistent copy of the job state for display."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": self.progress,
+                "message": self.message,
+                "logs": list(self.logs),
+                "partial": dict(self.partial),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobQueue:
+    """
+    FIFO job queue served by a fixed pool of worker threads.
+
+    At most ``max_pending`` jobs may wait; further submissions raise
+    QueueFull instead of piling up. Finished jobs are kept for
+    ``result_ttl`` seconds.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers: int = 2, max_pending: int = 50, result_ttl: float = 3600.0,
+                 logger: logging.Logger = None):
+        """
+        Initialize the JobQueue.
+
+        Args:
+            workers (int): Jobs run concurrently.
+            max_pending (int): Jobs allowed to wait for a worker.
+            result_ttl (float): Seconds a finished job stays available for polling.
+            logger (logging.Logger, optional): Logger for job failures.
+        """
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.logger = logger or logging.getLogger(__name__)
+        self._jobs: Dict[str, Job] = {}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, logger: logging.Logger = None) -> "JobQueue":
+        """Build a queue from ``GENERATION_WORKERS``, ``GENERATION_MAX_PENDING`` and ``JOB_RESULT_TTL``."""
+        return cls(
+            workers=int(os.environ.get("GENERATION_WORKERS", "2")),
+            max_pending=int(os.environ.get("GENERATION_MAX_PENDING", "50")),
+            result_ttl=float(os.environ.get("JOB_RESULT_TTL", "3600")),
+            logger=logger,
+        )
+
+    @classmethod
+    def shared(cls) -> "JobQueue":
+        """Process-wide queue, configured from the environment on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls.from_env()
+            return cls._shared
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind: str, function: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Queue ``function(job, *args, **kwargs)``; its return value becomes the job result.
+
+        Raises:
+            QueueFull: If ``max_pending`` jobs are already waiting.
+        """
+        job = Job(kind)
+        with self._lock:
+            self._prune()
+            pending = sum(1 for queued in self._jobs.values() if queued.status == QUEUED)
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} jobs are already waiting; try again shortly")
+            self._jobs[job.id] = job
+            self._start_workers()
+        self._queue.put((job, function, args, kwargs))
+        return job
+
+    def _work(self) -> None:
+        while True:
+            job, function, args, kwargs = self._queue.get()
+            if not job._start():
+                continue
+            try:
+                result = function(job, *args, **kwargs)
+            except JobCancelled:
+                job._finish(CANCELLED)
+            except Exception as e:
+                self.logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+                job._finish(FAILED, error=str(e))
+            else:
+                job._finish(SUCCEEDED, result=result)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job with this ID, or None if it is unknown or its result expired."""
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. A waiting job never starts; a running one stops at its
+        next ``check_cancelled``. Returns False if the job already finished.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return False
+        return job._cancel()
+
+    def position(self, job_id: str) -> Optional[int]:
+        """How many waiting jobs are ahead of a queued job (None if it is not waiting)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return None
+            return sum(1 for other in self._jobs.values()
+                       if other.status == QUEUED and other.created_at < job.created_at)
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the result TTL (caller holds the lock)."""
+        expired = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.done and job.finished_at < expired]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Workers and jobs per status."""
+        with self._lock:
+            self._prune()
+            counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {"workers": self.workers, **counts}
@@ -0,0 +1,74 @@
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+import vertexai
+from vertexai.generative_models import GenerativeModel
+
+# Held by everything that calls vertexai.init and builds objects from the global
+# location it sets (models here, context caches in prompt_cache), so two regions
+# never interleave between the init and the construction
+VERTEX_INIT_LOCK = threading.RLock()
+
+
+def _create_vertex_model(project_id: str, region: str, model_name: str) -> GenerativeModel:
+    """Build a GenerativeModel bound to ``region``.
+
+    The model captures the location from the global config at construction time
+    and creates its (async) prediction clients lazily with that location, so once
+    built it no longer depends on the process-global vertexai state.
+    """
+    with VERTEX_INIT_LOCK:
+        vertexai.init(project=project_id, location=region)
+        return GenerativeModel(model_name)
+
+
+class RegionModelPool:
+    """
+    Lazily created, reusable models keyed by (project, region, model name).
+
+    Reusing a model keeps its prediction clients, and with them the TLS/gRPC
+    connections, warm across calls. ``vertexai.init`` is only called the first
+    time a region is used, under a lock, instead of on every attempt.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, model_factory: Callable[[str, str, str], Any] = None):
+        """
+        Initialize the RegionModelPool.
+
+        Args:
+            model_factory (callable, optional): ``factory(project_id, region, model_name)``
+                returning a model object. Defaults to building a Vertex AI GenerativeModel.
+        """
+        self.model_factory = model_factory or _create_vertex_model
+        self._models: Dict[Tuple[str, str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "RegionModelPool":
+        """Process-wide pool shared by every client that does not bring its own."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, project_id: str, region: str, model_name: str) -> Any:
+        """Return the pooled model for the given region, creating it on first use."""
+        key = (project_id, region, model_name)
+        model = self._models.get(key)
+        if model is None:
+            # Construction mutates global SDK state, so it is serialized
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = self._models[key] = self.model_factory(project_id, region, model_name)
+        return model
+
+    def invalidate(self, region: str = None) -> None:
+        """Drop pooled models (all of them, or only those of one region)."""
+        with self._lock:
+            for key in list(self._models):
+                if region is None or key[1] == region:
+                    del self._models[key]
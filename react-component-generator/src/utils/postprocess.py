@@ -0,0 +1,274 @@
+import re
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+
+class Token(NamedTuple):
+    """A lexical unit other than code and strings: fence, line_comment or block_comment."""
+    kind: str
+    text: str
+
+
+# Token stages return the (possibly rewritten) token text, or None to drop it.
+# Text stages rewrite completed output and must work line by line, since
+# streamed input is passed to them in pieces ending on a line boundary.
+TokenStage = Callable[[Token], Optional[str]]
+TextStage = Callable[[str], str]
+
+_STRINGS = r"""'(?:\\.|[^'\\\n])*'?|"(?:\\.|[^"\\\n])*"?"""
+_CLOSED_STRINGS = r"""'(?:\\.|[^'\\\n])*'|""" r'"(?:\\.|[^"\\\n])*"'
+# Single-line template literals whose ${ } expressions contain no braces, and
+# at most one level of such templates, stay plain code
+_INNER_TEMPLATE = r"""`(?:\\.|[^`\\$\n]|\$(?!\{)|\$\{[^{}`'"\n]*\})*`"""
+_SIMPLE_EXPRESSION = rf"""\$\{{(?:[^{{}}`'"\n]|{_CLOSED_STRINGS}|{_INNER_TEMPLATE})*\}}"""
+_SIMPLE_TEMPLATE = rf"""`(?!``)(?:\\.|[^`\\$\n]|\$(?!\{{)|{_SIMPLE_EXPRESSION})*`"""
+_FLAGS = re.MULTILINE | re.DOTALL | re.VERBOSE
+
+# One step of the lexer: a run of code and string literals, then the next token
+_SCRIPT = re.compile(rf"""
+    (?P<code>(?:[^/`'"]+|/(?![/*])|{_STRINGS}|{_SIMPLE_TEMPLATE})*)
+    (?:(?P<line_comment>//[^\n]*)
+      |(?P<block_comment>/\*.*?\*/)
+      |(?P<open_comment>/\*)
+      |(?P<fence>```[\w+-]*[ \t]*$)
+      |(?P<template>`))?
+""", _FLAGS)
+# Inside a ${ } expression braces are counted to find its end
+_EXPRESSION = re.compile(rf"""
+    (?P<code>(?:[^/`'"{{}}]+|/(?![/*])|{_STRINGS}|{_SIMPLE_TEMPLATE})*)
+    (?:(?P<line_comment>//[^\n]*)
+      |(?P<block_comment>/\*.*?\*/)
+      |(?P<open_comment>/\*)
+      |(?P<template>`)
+      |(?P<brace>[{{}}]))?
+""", _FLAGS)
+# CSS has neither // comments nor template literals
+_STYLE = re.compile(rf"""
+    (?P<code>(?:[^/`'"]+|/(?!\*)|`(?!``)|{_STRINGS})*)
+    (?:(?P<block_comment>/\*.*?\*/)
+      |(?P<open_comment>/\*)
+      |(?P<fence>```[\w+-]*[ \t]*$))?
+""", _FLAGS)
+# Rest of a template literal part, up to the closing backtick or the next ${
+_TEMPLATE_PART = re.compile(r"(?:\\[\s\S]|[^`\\$]|\$(?!\{))*(?:`|\$\{)")
+
+_INSTRUCTION_COMMENT = re.compile(r"(?:/\*\*?|//)[\s*]*(?:Example|Remember)")
+_MASK = re.compile("\x00(\\d+)\x00")
+_WHITESPACE = re.compile(r"\s+")
+
+# Lexer stack entry for "inside a template literal"; other entries count the
+# open braces of a ${ } expression
+_IN_TEMPLATE = -1
+
+
+def drop_markdown_fences(token: Token) -> Optional[str]:
+    """Drop ```lang / ``` fence lines."""
+    return None if token.kind == "fence" else token.text
+
+
+def drop_instruction_comments(token: Token) -> Optional[str]:
+    """Drop comments the model adds for the reader (``// Example ...``, ``/** Remember ... */``)."""
+    if token.kind in ("line_comment", "block_comment") and _INSTRUCTION_COMMENT.match(token.text):
+        return None
+    return token.text
+
+
+def tidy_lines(text: str) -> str:
+    """Strip trailing whitespace and drop blank lines."""
+    return "\n".join(line.rstrip() for line in text.split("\n") if line.strip())
+
+
+DEFAULT_TOKEN_STAGES = (drop_markdown_fences, drop_instruction_comments)
+DEFAULT_TEXT_STAGES = (tidy_lines,)
+
+
+class CodeCleaner:
+    """
+    Single-pass cleanup of generated TSX/TS/CSS/JSON source.
+
+    One compiled pattern per lexer state consumes code and string literals in
+    a single match up to the next comment, fence or template literal, so the
+    input is scanned once and Python only runs per token. Fences and comments
+    go through the token stages; the output then goes through the text stages
+    with multi-line template literal contents masked, so whitespace inside
+    them is preserved and backticks are never touched.
+
+    ``feed`` accepts arbitrary chunks and returns the cleaned text completed so
+    far; ``finish`` flushes the rest. ``clean`` does both at once.
+    """
+
+    def __init__(self,
+                 token_stages: Sequence[TokenStage] = DEFAULT_TOKEN_STAGES,
+                 text_stages: Sequence[TextStage] = DEFAULT_TEXT_STAGES,
+                 style: bool = False):
+        """
+        Initialize the CodeCleaner.
+
+        Args:
+            token_stages: Stages applied to every fence and comment token.
+            text_stages: Line-local stages applied to the output.
+            style (bool): Lex as CSS (no ``//`` comments or template literals).
+        """
+        self.token_stages = list(token_stages)
+        self.text_stages = list(text_stages)
+        self._pattern = _STYLE if style else _SCRIPT
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer = ""
+        self._stack: List[int] = []
+        self._pieces: List[str] = []
+        self._masked: List[str] = []
+        self._emitted = False
+
+    def feed(self, chunk: str) -> str:
+        """Clean a chunk of input; returns the output completed so far."""
+        self._buffer += chunk
+        limit = self._buffer.rfind("\n") + 1
+        if not limit:
+            return ""
+        position = self._lex(limit, final=False)
+        self._buffer = self._buffer[position:]
+        if self._stack or position < limit:
+            # Inside a template literal or an unterminated comment; wait for more input
+            return ""
+        return self._flush()
+
+    def finish(self) -> str:
+        """Flush the remaining input and reset for the next document."""
+        self._lex(len(self._buffer), final=True)
+        text = self._flush()
+        self.reset()
+        return text
+
+    def clean(self, text: str) -> str:
+        self.reset()
+        self._buffer = text
+        return self.finish()
+
+    def _apply_stages(self, token: Token) -> Optional[str]:
+        for stage in self.token_stages:
+            text = stage(token)
+            if text is None:
+                return None
+            if text is not token.text:
+                token = Token(token.kind, text)
+        return token.text
+
+    def _lex(self, limit: int, final: bool) -> int:
+        """Tokenize the buffer up to ``limit``; returns the position reached."""
+        buffer, pieces, stack = self._buffer, self._pieces, self._stack
+        position = 0
+        while position < limit:
+            if stack and stack[-1] == _IN_TEMPLATE:
+                match = _TEMPLATE_PART.match(buffer, position, limit)
+                if match is None:
+                    if not final:
+                        break
+                    # Unterminated template literal: keep the rest as it is
+                    self._add_literal(buffer[position:limit])
+                    position = limit
+                    break
+                part = match.group()
+                self._add_literal(part)
+                position = match.end()
+                if part.endswith("`"):
+                    stack.pop()
+                else:
+                    stack.append(0)
+                continue
+
+            pattern = _EXPRESSION if stack else self._pattern
+            match = pattern.match(buffer, position, limit)
+            code = match.group("code")
+            if code:
+                pieces.append(code)
+            kind = match.lastgroup
+            if kind in (None, "code"):
+                position = match.end()
+                if position < limit:
+                    # Not a token after all (e.g. a stray backtick in CSS); keep it as code
+                    pieces.append(buffer[position])
+                    position += 1
+                continue
+
+            start, position = match.start(kind), match.end()
+            if kind == "open_comment":
+                if not final:
+                    position = start
+                    break
+                pieces.append(buffer[start:limit])
+                position = limit
+                break
+            if kind == "fence" and buffer[buffer.rfind("\n", 0, start) + 1:start].strip():
+                # Three backticks in the middle of a line are no fence
+                kind, position = ("template", start + 1) if pattern is not _STYLE else ("code", start + 1)
+                if kind == "code":
+                    pieces.append("`")
+                    continue
+
+            if kind == "template":
+                pieces.append("`")
+                stack.append(_IN_TEMPLATE)
+            elif kind == "brace":
+                pieces.append(match.group(kind))
+                if match.group(kind) == "{":
+                    stack[-1] += 1
+                elif stack[-1]:
+                    stack[-1] -= 1
+                else:
+                    # End of a ${ } expression: back inside the template literal
+                    stack.pop()
+            else:
+                text = self._apply_stages(Token(kind, match.group(kind)))
+                if text is not None:
+                    pieces.append(text)
+        return position
+
+    def _add_literal(self, text: str) -> None:
+        """Template literal contents spanning lines are masked from the text stages."""
+        if "\n" in text:
+            self._pieces.append(f"\x00{len(self._masked)}\x00")
+            self._masked.append(text)
+        else:
+            self._pieces.append(text)
+
+    def _flush(self) -> str:
+        text = "".join(self._pieces)
+        self._pieces = []
+        for stage in self.text_stages:
+            text = stage(text)
+        if self._masked:
+            masked = self._masked
+            text = _MASK.sub(lambda m: masked[int(m.group(1))], text)
+            self._masked = []
+        if not text:
+            return ""
+        if self._emitted:
+            text = "\n" + text
+        self._emitted = True
+        return text
+
+
+def cleaner_for(filename: str = None) -> CodeCleaner:
+    """A cleaner configured for the file type."""
+    return CodeCleaner(style=bool(filename and filename.endswith(".css")))
+
+
+def clean_code(content: str, filename: str = None) -> str:
+    """Clean one generated file (see ``CodeCleaner``)."""
+    return cleaner_for(filename).clean(content)
+
+
+def extract_svg(content: str) -> str:
+    """
+    Cut the outermost ``<svg>...</svg>`` out of a response and collapse its whitespace.
+
+    Raises:
+        ValueError: If the response contains no SVG element.
+    """
+    start = content.find("<svg")
+    end = content.rfind("</svg>")
+    if start < 0 or end < start:
+        raise ValueError("No valid SVG content found in the response")
+    svg = _WHITESPACE.sub(" ", content[start:end + len("</svg>")])
+    return svg.replace("> <", "><").strip()
@@ -0,0 +1,149 @@
+"""
+Micro-benchmarks for the generated-code post-processing.
+
+Compares the single-pass ``CodeCleaner`` and ``extract_svg`` with the regex
+chains they replaced, on synthetic generated files of increasing size.
+
+Usage (from the ``src`` directory):
+
+    python -m utils.postprocess_bench --sizes 8 64 512 --repeat 20
+"""
+import re
+import json
+import argparse
+import statistics
+import timeit
+from typing import Callable, Dict, List
+
+from .postprocess import CodeCleaner, clean_code, extract_svg
+
+_TSX_BLOCK = '''import React from 'react';
+import {{ Button{index}Props }} from './Button{index}Props';
+import './Button{index}.css';
+
+/**
+ * Example: <Button{index} variant="primary" />
+ */
+export const Button{index}: React.FC<Button{index}Props> = ({{ variant = 'primary', size = 'medium', children }}) => {{
+  // Remember to keep the BEM class names in sync with the CSS
+  const className = `button button--${{variant}} ${{size ? `button--${{size}}` : ''}}`;
+  const url = "https://example.com/docs"; // link to the docs
+
+  return (
+    <button className={{className}} aria-label="Button {index}">
+      {{children}}
+    </button>
+  );
+}};
+
+'''
+
+_SVG_BLOCK = '''  <g transform="translate(0, {offset})">
+    <rect x="0" y="0" width="120" height="40" rx="4" fill="#1E88E5"/>
+    <text x="60" y="25" font-size="14" fill="#FFFFFF" text-anchor="middle">Button {index}</text>
+  </g>
+'''
+
+
+def _legacy_extract_code_content(content: str) -> str:
+    """The original eight-pass regex chain."""
+    content = re.sub(r'```[a-z]*\n', '', content)
+    content = re.sub(r'\n```', '', content)
+    content = content.replace('`', '')
+    content = re.sub(r"\/\*\*?\s*Example.*?\*\/", "", content, flags=re.DOTALL)
+    content = re.sub(r"\/\*\*?\s*Remember.*?\*\/", "", content, flags=re.DOTALL)
+    content = re.sub(r"\/\/\s*Example.*?$", "", content, flags=re.MULTILINE)
+    content = re.sub(r"\/\/\s*Remember.*?$", "", content, flags=re.MULTILINE)
+    lines = [line.rstrip() for line in content.splitlines() if line.strip()]
+    return "\n".join(lines)
+
+
+def _legacy_extract_svg_content(content: str) -> str:
+    """The original three-pass SVG cleanup."""
+    content = re.sub(r'```[a-z]*\n', '', content)
+    content = re.sub(r'\n```', '', content)
+    svg_match = re.search(r'<svg.*</svg>', content, re.DOTALL)
+    svg_content = re.sub(r'\s+', ' ', svg_match.group(0))
+    svg_content = re.sub(r'> <', '><', svg_content)
+    return svg_content.strip()
+
+
+def make_tsx(size_kb: int) -> str:
+    """A fenced TSX response of roughly ``size_kb`` kilobytes."""
+    blocks = []
+    total = 0
+    index = 0
+    while total < size_kb * 1024:
+        block = _TSX_BLOCK.format(index=index)
+        blocks.append(block)
+        total += len(block)
+        index += 1
+    return "```tsx\n" + "".join(blocks) + "```"
+
+
+def make_svg(size_kb: int) -> str:
+    """A fenced SVG response of roughly ``size_kb`` kilobytes."""
+    blocks = []
+    total = 0
+    index = 0
+    while total < size_kb * 1024:
+        block = _SVG_BLOCK.format(index=index, offset=index * 48)
+        blocks.append(block)
+        total += len(block)
+        index += 1
+    return '```svg\n<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 400 400">\n' + "".join(blocks) + "</svg>\n```"
+
+
+def _streamed_clean(content: str, chunk_size: int = 256) -> str:
+    cleaner = CodeCleaner()
+    parts = [cleaner.feed(content[i:i + chunk_size]) for i in range(0, len(content), chunk_size)]
+    parts.append(cleaner.finish())
+    return "".join(parts)
+
+
+def _time(function: Callable[[str], str], content: str, repeat: int) -> Dict[str, float]:
+    timings = timeit.repeat(lambda: function(content), number=1, repeat=repeat)
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "mb_per_s": round(len(content) / 1e6 / statistics.median(timings), 2),
+    }
+
+
+def run_benchmarks(sizes_kb: List[int], repeat: int = 20) -> List[Dict[str, object]]:
+    """Time every implementation on inputs of each size."""
+    results = []
+    for size_kb in sizes_kb:
+        tsx, svg = make_tsx(size_kb), make_svg(size_kb)
+        cases = {
+            "code/legacy": (_legacy_extract_code_content, tsx),
+            "code/single_pass": (clean_code, tsx),
+            "code/streamed": (_streamed_clean, tsx),
+            "svg/legacy": (_legacy_extract_svg_content, svg),
+            "svg/single_pass": (extract_svg, svg),
+        }
+        for name, (function, content) in cases.items():
+            results.append({"case": name, "size_kb": size_kb, **_time(function, content, repeat)})
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark generated-code post-processing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 64, 512], help="Input sizes in KB")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per case")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'case':<20}{'size':>8}{'median ms':>12}{'min ms':>10}{'MB/s':>8}")
+    for result in results:
+        print(f"{result['case']:<20}{result['size_kb']:>6}KB{result['median_ms']:>12.3f}"
+              f"{result['min_ms']:>10.3f}{result['mb_per_s']:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
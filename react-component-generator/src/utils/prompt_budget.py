@@ -0,0 +1,112 @@
+import re
+import json
+from typing import Callable, Dict, List, Tuple
+
+_BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_JSX_COMMENT = re.compile(r"\{\s*/\*.*?\*/\s*\}", re.DOTALL)
+_LINE_COMMENT = re.compile(r"^\s*//.*$", re.MULTILINE)
+_CSS_SPACE = re.compile(r"\s*([{};,>])\s*")
+# A colon that ends its declaration (";" or "}") before any "{": not a pseudo-class in a selector
+_CSS_DECLARATION_COLON = re.compile(r"\s*:\s*(?=[^{};]*[;}])")
+
+
+class PromptBudgetExceeded(ValueError):
+    """Raised when a prompt is over budget even after dropping optional sections."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (Gemini averages roughly four characters per token)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def compact_code(code: str) -> str:
+    """Strip comments, trailing whitespace and blank lines from TSX/TS source."""
+    code = _JSX_COMMENT.sub("", code)
+    code = _BLOCK_COMMENT.sub("", code)
+    code = _LINE_COMMENT.sub("", code)
+    return "\n".join(line.rstrip() for line in code.splitlines() if line.strip())
+
+
+def compact_css(css: str) -> str:
+    """Strip comments and insignificant whitespace from CSS, one rule per line."""
+    css = _BLOCK_COMMENT.sub("", css)
+    css = _CSS_SPACE.sub(r"\1", " ".join(css.split()))
+    # ".a :hover" and ".a:hover" select different elements, so only declarations lose the spaces
+    css = _CSS_DECLARATION_COLON.sub(":", css)
+    return css.replace("}", "}\n").strip()
+
+
+def compact_json(text: str) -> str:
+    """Re-serialize JSON without indentation; returns the input if it is not valid JSON."""
+    try:
+        return json.dumps(json.loads(text), separators=(",", ":"))
+    except (TypeError, ValueError):
+        return text
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt from named sections and account for their token cost.
+
+    Sections marked droppable are removed, last added first, when the prompt
+    exceeds the configured budget. ``report`` returns the size of every
+    section so the cost of each part of a prompt is visible. Sections marked
+    as prefix can be split off as the stable leading part of the prompt (see
+    ``build_parts``); ``build`` keeps every section in the order it was added.
+    """
+
+    def __init__(self, budget: int = None, token_counter: Callable[[str], int] = estimate_tokens):
+        """
+        Initialize the PromptBuilder.
+
+        Args:
+            budget (int, optional): Maximum prompt size in tokens. None disables enforcement.
+            token_counter (callable): Function returning the token count of a string.
+        """
+        self.budget = budget
+        self.token_counter = token_counter
+        self.sections: List[Tuple[str, str, bool, bool]] = []
+        self.dropped: List[str] = []
+
+    def add(self, name: str, text: str, droppable: bool = False, prefix: bool = False) -> "PromptBuilder":
+        """Add a section; empty sections are skipped."""
+        if text and text.strip():
+            self.sections.append((name, text, droppable, prefix))
+        return self
+
+    def report(self) -> Dict[str, int]:
+        """Token count per section plus the total (separators included)."""
+        report = {name: self.token_counter(text) for name, text, _, _ in self.sections}
+        report["total"] = self.token_counter(self._join())
+        if self.dropped:
+            report["dropped"] = len(self.dropped)
+        return report
+
+    def _join(self, prefix: bool = None) -> str:
+        """All sections in insertion order, or only the prefix (or non-prefix) ones."""
+        return "\n\n".join(
+            text for _, text, _, is_prefix in self.sections
+            if prefix is None or is_prefix == prefix
+        )
+
+    def _enforce_budget(self) -> None:
+        if self.budget is None:
+            return
+        while self.token_counter(self._join()) > self.budget:
+            droppable = [index for index, section in enumerate(self.sections) if section[2]]
+            if not droppable:
+                raise PromptBudgetExceeded(
+                    f"Prompt needs {self.token_counter(self._join())} tokens, budget is {self.budget}"
+                )
+            name = self.sections.pop(droppable[-1])[0]
+            self.dropped.append(name)
+
+    def build(self) -> str:
+        """Return the prompt, dropping optional sections if needed to meet the budget."""
+        self._enforce_budget()
+        return self._join()
+
+    def build_parts(self) -> Tuple[str, str]:
+        """Return (stable prefix, variable suffix) after enforcing the budget."""
+        self._enforce_budget()
+        return self._join(prefix=True), self._join(prefix=False)
@@ -0,0 +1,177 @@
+import time
+import hashlib
+import datetime
+import logging
+import threading
+from typing import Any, Dict, Tuple
+
+from .prompt_budget import estimate_tokens
+from .single_flight import SingleFlight
+
+
+class PrefixedModel:
+    """Model wrapper that sends a fixed prefix ahead of every prompt (used by the fake backend)."""
+
+    def __init__(self, model: Any, prefix: str):
+        self.model = model
+        self.prefix = prefix
+
+    def _contents(self, contents):
+        if isinstance(contents, str):
+            return f"{self.prefix}\n\n{contents}"
+        return [self.prefix, *contents]
+
+    def generate_content(self, contents, **kwargs):
+        return self.model.generate_content(self._contents(contents), **kwargs)
+
+    async def generate_content_async(self, contents, **kwargs):
+        return await self.model.generate_content_async(self._contents(contents), **kwargs)
+
+
+class VertexCachedContentBackend:
+    """Creates Vertex AI context caches and models bound to them."""
+
+    # Vertex AI rejects context caches below this size for Gemini 1.5 models
+    min_tokens = 32768
+
+    def create(self, project_id: str, region: str, model_name: str, prefix: str, ttl_seconds: float) -> Tuple[Any, Any]:
+        """Return (cache handle, model bound to the cached prefix)."""
+        import vertexai
+        from vertexai.preview import caching
+        from vertexai.preview.generative_models import GenerativeModel
+        from .model_pool import VERTEX_INIT_LOCK
+
+        # CachedContent is created in the globally configured location; the pool's
+        # lock keeps other regions from re-initializing it until the cache exists
+        with VERTEX_INIT_LOCK:
+            vertexai.init(project=project_id, location=region)
+            cached_content = caching.CachedContent.create(
+                model_name=model_name,
+                contents=[prefix],
+                ttl=datetime.timedelta(seconds=ttl_seconds),
+            )
+            return cached_content, GenerativeModel.from_cached_content(cached_content=cached_content)
+
+    def delete(self, handle: Any) -> None:
+        try:
+            handle.delete()
+        except Exception:
+            pass
+
+
+class FakeCachedContentBackend:
+    """
+    Offline stand-in for context caching.
+
+    Models are fetched from a model pool and wrapped so the prefix is prepended
+    locally; creations and deletions are counted for tests and benchmarks.
+    """
+
+    min_tokens = 0
+
+    def __init__(self, model_pool: Any):
+        self.model_pool = model_pool
+        self.created = 0
+        self.deleted = 0
+
+    def create(self, project_id: str, region: str, model_name: str, prefix: str, ttl_seconds: float) -> Tuple[Any, Any]:
+        self.created += 1
+        handle = {"region": region, "prefix_hash": hashlib.sha256(prefix.encode("utf-8")).hexdigest()}
+        return handle, PrefixedModel(self.model_pool.get(project_id, region, model_name), prefix)
+
+    def delete(self, handle: Any) -> None:
+        self.deleted += 1
+
+
+class PrefixCache:
+    """
+    Per-region handles for cached prompt prefixes.
+
+    The stable part of a prompt (instructions and templates) is cached once per
+    region and reused until shortly before its TTL expires, when it is
+    recreated on the next call. Prefixes below the backend's minimum size are
+    not cached; callers then send the full prompt.
+    """
+
+    def __init__(self,
+                 backend: Any = None,
+                 ttl_seconds: float = 3600,
+                 refresh_margin: float = 60,
+                 min_tokens: int = None,
+                 logger: logging.Logger = None):
+        """
+        Initialize the PrefixCache.
+
+        Args:
+            backend (optional): Object with ``create``/``delete``; defaults to Vertex AI context caching.
+            ttl_seconds (float): Lifetime requested for each cached prefix.
+            refresh_margin (float): Recreate a handle this many seconds before it expires.
+            min_tokens (int, optional): Smallest prefix worth caching. Defaults to the backend minimum.
+            logger (logging.Logger, optional): Custom logger instance.
+        """
+        self.backend = backend or VertexCachedContentBackend()
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.min_tokens = self.backend.min_tokens if min_tokens is None else min_tokens
+        self.logger = logger or logging.getLogger(__name__)
+
+        # (project, region, model, prefix hash) -> (handle, model, expires_at)
+        self._entries: Dict[Tuple[str, str, str, str], Tuple[Any, Any, float]] = {}
+        self._lock = threading.Lock()
+        # Creations are network round trips; only callers of the same key wait for one
+        self._creations = SingleFlight()
+        self.hits = 0
+        self.creations = 0
+
+    def cacheable(self, prefix: str) -> bool:
+        """Whether the prefix is large enough for the backend to cache."""
+        return estimate_tokens(prefix) >= self.min_tokens
+
+    def get_model(self, project_id: str, region: str, model_name: str, prefix: str) -> Any:
+        """Return a model bound to the cached prefix, or None if the prefix is not cacheable."""
+        if not self.cacheable(prefix):
+            return None
+
+        key = (project_id, region, model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        model = self._fresh_model(key)
+        if model is not None:
+            return model
+        model, _ = self._creations.do("/".join(key), lambda: self._create(key, prefix))
+        return model
+
+    def _fresh_model(self, key: Tuple[str, str, str, str]) -> Any:
+        """The cached model for key if its handle is not about to expire (counted as a hit)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() < entry[2] - self.refresh_margin:
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def _create(self, key: Tuple[str, str, str, str], prefix: str) -> Any:
+        # A caller that just finished creating this key may have published it already
+        model = self._fresh_model(key)
+        if model is not None:
+            return model
+        project_id, region, model_name, _ = key
+        handle, model = self.backend.create(project_id, region, model_name, prefix, self.ttl_seconds)
+        with self._lock:
+            stale = self._entries.get(key)
+            self._entries[key] = (handle, model, time.time() + self.ttl_seconds)
+            self.creations += 1
+        if stale is not None:
+            self.backend.delete(stale[0])
+        self.logger.info(f"Cached prompt prefix in {region} ({key[3][:12]})")
+        return model
+
+    def invalidate(self, project_id: str, region: str, model_name: str, prefix: str) -> None:
+        """Forget a handle, e.g. after the service reported it missing."""
+        key = (project_id, region, model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.backend.delete(entry[0])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "creations": self.creations}
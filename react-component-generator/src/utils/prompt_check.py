@@ -0,0 +1,77 @@
+"""
+Compare full and compact prompts on a fixed spec set.
+
+Usage (from the ``src`` directory):
+
+    python -m utils.prompt_check manifest.yaml            # token accounting only
+    python -m utils.prompt_check manifest.yaml --generate # also generate and validate both modes
+"""
+import json
+import logging
+import argparse
+from typing import Dict, List, Any
+
+from .gemini_client import GeminiRegionClient
+from .component_generator import ComponentGenerator
+from .batch import load_manifest
+
+
+def compare_prompt_modes(full: ComponentGenerator,
+                         compact: ComponentGenerator,
+                         specs: List[Dict[str, Any]],
+                         generate: bool = False) -> List[Dict[str, Any]]:
+    """
+    Report prompt tokens for both generators and, optionally, whether each still
+    produces files that pass validation.
+    """
+    results = []
+    for spec in specs:
+        row = {
+            "component": spec["component_name"],
+            "full_tokens": full.prompt_report(**spec)["total"],
+            "compact_tokens": compact.prompt_report(**spec)["total"],
+        }
+        if generate:
+            for mode, generator in (("full", full), ("compact", compact)):
+                try:
+                    files = generator.generate_component(bypass_cache=True, **spec)
+                    row[f"{mode}_valid"] = True
+                    row[f"{mode}_output_chars"] = sum(len(content) for content in files.values())
+                except Exception as e:
+                    row[f"{mode}_valid"] = False
+                    row[f"{mode}_error"] = str(e)
+        results.append(row)
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare full and compact prompts on a fixed spec set")
+    parser.add_argument("manifest", help="Path to a JSON or YAML manifest (see utils.batch)")
+    parser.add_argument("--generate", action="store_true", help="Generate with both modes and validate the results")
+    parser.add_argument("--budget", type=int, default=None, help="Token budget applied to compact prompts")
+    parser.add_argument("--project-id", default=None, help="Google Cloud project (defaults to GCP_PROJECT)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    gemini_client = GeminiRegionClient(project_id=args.project_id)
+    full = ComponentGenerator(gemini_client)
+    compact = ComponentGenerator(gemini_client, template_registry=full.template_registry,
+                                 compact_prompts=True, prompt_budget=args.budget)
+
+    results = compare_prompt_modes(full, compact, load_manifest(args.manifest), generate=args.generate)
+    print(json.dumps(results, indent=2))
+
+    full_total = sum(row["full_tokens"] for row in results)
+    compact_total = sum(row["compact_tokens"] for row in results)
+    if full_total:
+        print(f"Prompt tokens: {full_total} full, {compact_total} compact ({100 * (1 - compact_total / full_total):.0f}% saved)")
+    if args.generate:
+        for mode in ("full", "compact"):
+            passed = sum(1 for row in results if row.get(f"{mode}_valid"))
+            print(f"{mode}: {passed}/{len(results)} passed validation")
+        return 0 if all(row.get("compact_valid") for row in results) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
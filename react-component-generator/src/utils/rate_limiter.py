@@ -0,0 +1,269 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .retry_policy import FAILOVER, RETRYABLE
+
+
+class Quota(NamedTuple):
+    """Requests and prompt tokens allowed per minute; None means unlimited."""
+    rpm: Optional[float] = None
+    tpm: Optional[float] = None
+
+
+class RateLimited(Exception):
+    """
+    Raised when a call would have to wait longer than allowed for local quota.
+
+    A full region is a reason to fail over; a full project is not, since every
+    region draws from it: the request is retried once the project has capacity
+    again (``retry_after``), if that is still before its deadline.
+    """
+
+    def __init__(self, message: str, scope: str, wait: float):
+        super().__init__(message)
+        self.scope = scope
+        self.wait = wait
+        self.retry_class = FAILOVER if scope == "region" else RETRYABLE
+        self.retry_after = wait if scope == "project" else None
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations.
+
+    The level may go negative: a caller takes its amount immediately and is
+    told how long to wait until the bucket would have held it. Later callers
+    see the debt and wait longer, so callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.rate = per_minute / 60.0
+        # Ten seconds' worth by default, so a burst cannot use a whole minute's quota at once
+        self.capacity = burst if burst is not None else max(1.0, per_minute / 6)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        # A caller's clock reading may predate this bucket's creation or last update
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` is available (amounts above capacity wait for a full bucket)."""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        return max(0.0, deficit / self.rate)
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def give(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, seconds: float, now: float) -> None:
+        """Empty the bucket so nothing is granted for ``seconds``."""
+        self._refill(now)
+        self.level = min(self.level, -seconds * self.rate)
+
+
+class Reservation(NamedTuple):
+    """Capacity taken for one call; ``delay`` is how long to wait before sending it."""
+    request_buckets: Tuple[TokenBucket, ...]
+    token_buckets: Tuple[TokenBucket, ...]
+    tokens: int
+    delay: float
+
+
+class RateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute limits per region and
+    per project.
+
+    Each call reserves one request and its estimated prompt tokens from its
+    region's buckets and from the project's, then waits until the reservation
+    is due; callers are therefore queued in arrival order instead of all
+    firing at once. After a 429 the region's buckets (or the project's, when
+    the region has no limit of its own) are drained for a cooldown, so queued
+    callers wait (or move to another region) rather than repeating the burst.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self,
+                 region_quota: Quota = Quota(),
+                 project_quota: Quota = Quota(),
+                 region_quotas: Dict[str, Quota] = None,
+                 max_wait: float = 30.0,
+                 throttle_cooldown: float = 10.0):
+        """
+        Initialize the RateLimiter.
+
+        Args:
+            region_quota (Quota): Default per-region quota.
+            project_quota (Quota): Quota shared by all regions of a project.
+            region_quotas (dict, optional): Region -> Quota overriding the default.
+            max_wait (float): Longest a call may be queued before RateLimited is raised.
+            throttle_cooldown (float): Seconds a region is held back after a 429.
+        """
+        self.region_quota = region_quota
+        self.project_quota = project_quota
+        self.region_quotas = dict(region_quotas or {})
+        self.max_wait = max_wait
+        self.throttle_cooldown = throttle_cooldown
+        self._buckets: Dict[Tuple[str, ...], Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._stats = {"reservations": 0, "delayed": 0, "rejected": 0, "throttled": 0, "waited": 0.0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Build a limiter from ``GEMINI_REGION_RPM``, ``GEMINI_REGION_TPM``,
+        ``GEMINI_PROJECT_RPM``, ``GEMINI_PROJECT_TPM`` and ``GEMINI_MAX_QUEUE_WAIT``.
+        Unset limits are unlimited.
+        """
+        def number(name: str) -> Optional[float]:
+            value = os.environ.get(name)
+            return float(value) if value else None
+
+        return cls(
+            region_quota=Quota(number("GEMINI_REGION_RPM"), number("GEMINI_REGION_TPM")),
+            project_quota=Quota(number("GEMINI_PROJECT_RPM"), number("GEMINI_PROJECT_TPM")),
+            max_wait=number("GEMINI_MAX_QUEUE_WAIT") or 30.0,
+        )
+
+    @classmethod
+    def shared(cls) -> "RateLimiter":
+        """Process-wide limiter, configured from the environment on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls.from_env()
+            return cls._shared
+
+    @property
+    def enabled(self) -> bool:
+        quotas = [self.region_quota, self.project_quota, *self.region_quotas.values()]
+        return any(quota.rpm or quota.tpm for quota in quotas)
+
+    def _get(self, key: Tuple[str, ...], quota: Quota) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            buckets = self._buckets[key] = (
+                TokenBucket(quota.rpm) if quota.rpm else None,
+                TokenBucket(quota.tpm) if quota.tpm else None,
+            )
+        return buckets
+
+    def reserve(self, project: str, region: str, tokens: int, max_wait: float = None) -> Reservation:
+        """
+        Reserve one request and ``tokens`` prompt tokens without waiting.
+
+        Raises:
+            RateLimited: If the reservation would be due later than ``max_wait``
+                (default: the limiter's ``max_wait``) from now.
+        """
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        with self._lock:
+            now = time.monotonic()
+            scopes = (
+                ("region", self._get(("region", project, region), self.region_quotas.get(region, self.region_quota))),
+                ("project", self._get(("project", project), self.project_quota)),
+            )
+            request_buckets: List[TokenBucket] = []
+            token_buckets: List[TokenBucket] = []
+            waits = {}
+            for scope, (requests, token_bucket) in scopes:
+                for bucket, amount, taken in ((requests, 1, request_buckets), (token_bucket, tokens, token_buckets)):
+                    if bucket is not None:
+                        taken.append(bucket)
+                        waits[scope] = max(waits.get(scope, 0.0), bucket.delay(amount, now))
+            delay = max(waits.values(), default=0.0)
+            if delay > max_wait:
+                self._stats["rejected"] += 1
+                scope = "project" if waits.get("project", 0.0) > max_wait else "region"
+                label = "Project" if scope == "project" else f"Region {region}"
+                raise RateLimited(f"{label} is over its local quota (next slot in {delay:.1f}s)", scope, delay)
+            for bucket in request_buckets:
+                bucket.take(1, now)
+            for bucket in token_buckets:
+                bucket.take(tokens, now)
+            self._stats["reservations"] += 1
+            if delay:
+                self._stats["delayed"] += 1
+                self._stats["waited"] += delay
+            return Reservation(tuple(request_buckets), tuple(token_buckets), tokens, delay)
+
+    def acquire(self, project: str, region: str, tokens: int, max_wait: float = None) -> Optional[Reservation]:
+        """Reserve and sleep until the reservation is due; None when no limit is configured."""
+        if not self.enabled:
+            return None
+        reservation = self.reserve(project, region, tokens, max_wait)
+        if reservation.delay:
+            time.sleep(reservation.delay)
+        return reservation
+
+    async def aacquire(self, project: str, region: str, tokens: int, max_wait: float = None) -> Optional[Reservation]:
+        """Asynchronous acquire; a cancelled wait returns its capacity."""
+        if not self.enabled:
+            return None
+        reservation = self.reserve(project, region, tokens, max_wait)
+        if reservation.delay:
+            try:
+                await asyncio.sleep(reservation.delay)
+            except asyncio.CancelledError:
+                self.release(reservation)
+                raise
+        return reservation
+
+    def release(self, reservation: Optional[Reservation]) -> None:
+        """Give back the capacity of a reservation that was never used."""
+        if reservation is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            for bucket in reservation.request_buckets:
+                bucket.give(1, now)
+            for bucket in reservation.token_buckets:
+                bucket.give(reservation.tokens, now)
+
+    def settle(self, reservation: Optional[Reservation], actual_tokens: Optional[int]) -> None:
+        """Correct the token buckets once the real prompt token count is known."""
+        if reservation is None or actual_tokens is None or actual_tokens == reservation.tokens:
+            return
+        difference = actual_tokens - reservation.tokens
+        with self._lock:
+            now = time.monotonic()
+            for bucket in reservation.token_buckets:
+                if difference > 0:
+                    bucket.take(difference, now)
+                else:
+                    bucket.give(-difference, now)
+
+    def throttled(self, project: str, region: str) -> None:
+        """
+        Hold a region back for the cooldown after the service returned 429.
+
+        Without a region limit the project's buckets are drained instead, so a
+        429 always slows down the narrowest configured scope.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._stats["throttled"] += 1
+            buckets = [bucket for bucket in self._get(("region", project, region), self.region_quotas.get(region, self.region_quota))
+                       if bucket is not None]
+            if not buckets:
+                buckets = [bucket for bucket in self._get(("project", project), self.project_quota) if bucket is not None]
+            for bucket in buckets:
+                bucket.drain(self.throttle_cooldown, now)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {**self._stats, "waited": round(self._stats["waited"], 3)}
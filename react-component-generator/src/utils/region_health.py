@@ -0,0 +1,193 @@
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Any
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _RegionStats:
+    """Mutable health statistics for a single region."""
+
+    def __init__(self):
+        self.ewma_latency = None
+        self.error_rate = 0.0
+        self.throttle_rate = 0.0
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+        self.last_error = None
+        self.last_failure_at = None
+        self.latencies = deque(maxlen=50)
+
+
+class RegionHealthTracker:
+    """
+    Thread-safe health scoreboard for Vertex AI regions.
+
+    Each region keeps an EWMA of successful-call latency, EWMA error and
+    throttling (429) rates, and a closed/open/half-open circuit breaker. Regions
+    are ranked by a score derived from those numbers so traffic moves away from
+    slow or exhausted regions and returns once a half-open probe succeeds.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self,
+                 alpha: float = 0.3,
+                 failure_threshold: int = 3,
+                 open_seconds: float = 30.0,
+                 default_latency: float = 30.0,
+                 error_half_life: float = 60.0):
+        """
+        Initialize the RegionHealthTracker.
+
+        Args:
+            alpha (float): Smoothing factor for the EWMAs (higher reacts faster).
+            failure_threshold (int): Consecutive failures that open a region's circuit.
+            open_seconds (float): How long a circuit stays open before a half-open probe.
+            default_latency (float): Latency assumed for regions without samples when no
+                other region has samples either.
+            error_half_life (float): Seconds after which idle error/429 rates have halved, so
+                a region that stopped receiving traffic is eventually retried.
+        """
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.default_latency = default_latency
+        self.error_half_life = error_half_life
+        self._stats: Dict[str, _RegionStats] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "RegionHealthTracker":
+        """Process-wide tracker shared by every client that does not bring its own."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _get(self, region: str) -> _RegionStats:
+        stats = self._stats.get(region)
+        if stats is None:
+            stats = self._stats[region] = _RegionStats()
+        return stats
+
+    def _ewma(self, current: float, sample: float) -> float:
+        return sample if current is None else self.alpha * sample + (1 - self.alpha) * current
+
+    def _refresh_state(self, stats: _RegionStats, now: float) -> None:
+        if stats.state == OPEN and now - stats.opened_at >= self.open_seconds:
+            stats.state = HALF_OPEN
+
+    def record_success(self, region: str, latency: float) -> None:
+        """Record a successful call and close the region's circuit."""
+        with self._lock:
+            stats = self._get(region)
+            stats.ewma_latency = self._ewma(stats.ewma_latency, latency)
+            stats.error_rate = self._ewma(stats.error_rate, 0.0)
+            stats.throttle_rate = self._ewma(stats.throttle_rate, 0.0)
+            stats.latencies.append(latency)
+            stats.consecutive_failures = 0
+            stats.successes += 1
+            stats.state = CLOSED
+            stats.opened_at = None
+
+    def record_failure(self, region: str, error: Exception = None, throttled: bool = False) -> None:
+        """Record a failed call; opens the circuit after repeated failures or a failed probe."""
+        with self._lock:
+            now = time.time()
+            stats = self._get(region)
+            self._refresh_state(stats, now)
+            stats.error_rate = self._ewma(stats.error_rate, 1.0)
+            stats.throttle_rate = self._ewma(stats.throttle_rate, 1.0 if throttled else 0.0)
+            stats.consecutive_failures += 1
+            stats.failures += 1
+            stats.last_error = type(error).__name__ if error is not None else None
+            stats.last_failure_at = now
+            if stats.state == HALF_OPEN or stats.consecutive_failures >= self.failure_threshold:
+                stats.state = OPEN
+                stats.opened_at = now
+
+    def score(self, region: str) -> float:
+        """Expected cost of sending to ``region`` (lower is better)."""
+        with self._lock:
+            return self._score(self._get(region), self._baseline_latency(), time.time())
+
+    def _baseline_latency(self) -> float:
+        """Latency assumed for untried regions: the mean of the known ones."""
+        known = [stats.ewma_latency for stats in self._stats.values() if stats.ewma_latency is not None]
+        return sum(known) / len(known) if known else self.default_latency
+
+    def _decay(self, stats: _RegionStats, now: float) -> float:
+        """Time-based decay factor applied to error rates since the last failure."""
+        if stats.last_failure_at is None:
+            return 1.0
+        return 0.5 ** ((now - stats.last_failure_at) / self.error_half_life)
+
+    def _score(self, stats: _RegionStats, baseline: float, now: float) -> float:
+        latency = stats.ewma_latency if stats.ewma_latency is not None else baseline
+        decay = self._decay(stats, now)
+        return latency * (1 + 4 * stats.error_rate * decay + 8 * stats.throttle_rate * decay)
+
+    def order_regions(self, regions: List[str]) -> List[str]:
+        """
+        Order regions from healthiest to least healthy.
+
+        Regions with an open circuit are left out while any other region is
+        available; if every circuit is open, all regions are returned ordered by
+        how soon they become eligible for a probe. Ties keep the given order.
+        """
+        with self._lock:
+            now = time.time()
+            baseline = self._baseline_latency()
+            available = []
+            blocked = []
+            for index, region in enumerate(regions):
+                stats = self._get(region)
+                self._refresh_state(stats, now)
+                if stats.state == OPEN:
+                    blocked.append((stats.opened_at, index, region))
+                else:
+                    # Half-open regions only get probed after healthy ones
+                    available.append((stats.state == HALF_OPEN, self._score(stats, baseline, now), index, region))
+
+        if available:
+            return [region for *_, region in sorted(available)]
+        return [region for *_, region in sorted(blocked)]
+
+    def latency_quantile(self, region: str, quantile: float, min_samples: int = 5) -> float:
+        """Return the given latency quantile for a region, or None without enough samples."""
+        with self._lock:
+            samples = sorted(self._get(region).latencies)
+        if len(samples) < min_samples:
+            return None
+        return samples[int(quantile * (len(samples) - 1))]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Dump the current scoreboard, e.g. to explain why traffic moved between regions."""
+        with self._lock:
+            now = time.time()
+            baseline = self._baseline_latency()
+            result = {}
+            for region, stats in self._stats.items():
+                self._refresh_state(stats, now)
+                result[region] = {
+                    "state": stats.state,
+                    "score": round(self._score(stats, baseline, now), 4),
+                    "ewma_latency": None if stats.ewma_latency is None else round(stats.ewma_latency, 4),
+                    "error_rate": round(stats.error_rate * self._decay(stats, now), 4),
+                    "throttle_rate": round(stats.throttle_rate * self._decay(stats, now), 4),
+                    "consecutive_failures": stats.consecutive_failures,
+                    "successes": stats.successes,
+                    "failures": stats.failures,
+                    "last_error": stats.last_error,
+                    "open_for": None if stats.opened_at is None else round(now - stats.opened_at, 1),
+                }
+            return result
@@ -0,0 +1,199 @@
+import time
+import random
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+RETRYABLE = "retryable"
+FAILOVER = "failover"
+FATAL = "fatal"
+
+# HTTP status of google.api_core exceptions -> error class
+_STATUS_CLASSES = {
+    400: FATAL,       # InvalidArgument: the same prompt fails everywhere
+    401: FATAL,       # Unauthenticated
+    403: FATAL,       # PermissionDenied
+    404: FAILOVER,    # Model not served in this region
+    408: RETRYABLE,
+    409: RETRYABLE,   # Aborted
+    429: FAILOVER,    # Region quota exhausted: move on, do not hammer it
+    499: FATAL,       # Cancelled by the client
+    500: RETRYABLE,
+    502: RETRYABLE,
+    503: RETRYABLE,
+    504: RETRYABLE,
+}
+
+
+class RetryExhausted(Exception):
+    """Raised when every allowed attempt failed or the deadline passed first."""
+
+    def __init__(self, message: str, last_error: Exception = None, attempts: int = 0):
+        super().__init__(message)
+        self.last_error = last_error
+        self.attempts = attempts
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify a failed model call.
+
+    Returns:
+        str: ``RETRYABLE`` (transient; the region may be tried again after a
+        backoff), ``FAILOVER`` (this region cannot serve the request now; try
+        the others) or ``FATAL`` (retrying cannot help; raise immediately).
+    """
+    # Errors raised by this package may declare their own class
+    declared = getattr(error, "retry_class", None)
+    if declared in (RETRYABLE, FAILOVER, FATAL):
+        return declared
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in _STATUS_CLASSES:
+        return _STATUS_CLASSES[code]
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return RETRYABLE
+    if isinstance(error, ValueError):
+        # response.text raises ValueError for blocked or empty candidates (safety filters)
+        return FATAL
+    if isinstance(error, (TypeError, AttributeError, NotImplementedError)):
+        return FATAL
+    return RETRYABLE
+
+
+class RetryPolicy:
+    """
+    How hard a single model request tries before giving up.
+
+    Attempts are spread over the regions in health order. Failover-only errors
+    drop the region for the rest of the request; retryable errors keep it, and
+    going back to a region that already failed waits a jittered exponential
+    backoff. Nothing is retried once ``max_attempts`` calls were made or the
+    overall ``deadline`` would pass.
+    """
+
+    def __init__(self,
+                 deadline: float = 180.0,
+                 max_attempts: int = 6,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 10.0,
+                 jitter: float = 1.0,
+                 classify: Callable[[BaseException], str] = classify_error):
+        """
+        Initialize the RetryPolicy.
+
+        Args:
+            deadline (float): Seconds from the start of the request after which no
+                new attempt is made (and async attempts are cancelled).
+            max_attempts (int): Model calls allowed per request, failovers included.
+            backoff_base (float): Backoff before the first retry of an already tried region.
+            backoff_max (float): Upper bound of a single backoff.
+            jitter (float): Fraction of the backoff that is randomized (1.0 is "full jitter").
+            classify (callable): Maps an exception to RETRYABLE, FAILOVER or FATAL.
+        """
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.classify = classify
+
+    def start(self, regions: List[str]) -> "RetryState":
+        return RetryState(self, regions)
+
+    def backoff(self, retry: int) -> float:
+        """Jittered delay before the ``retry``-th revisit of a region (1-based)."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (retry - 1))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+    def __repr__(self) -> str:
+        return f"RetryPolicy(deadline={self.deadline}, max_attempts={self.max_attempts})"
+
+
+# Full generations may take minutes; previews are optional and should give up fast
+GENERATION_POLICY = RetryPolicy(deadline=240.0, max_attempts=6)
+PREVIEW_POLICY = RetryPolicy(deadline=45.0, max_attempts=3, backoff_base=0.5, backoff_max=2.0)
+
+
+class RetryState:
+    """Attempt accounting for one request under a ``RetryPolicy``."""
+
+    def __init__(self, policy: RetryPolicy, regions: List[str]):
+        self.policy = policy
+        self.started = time.monotonic()
+        self.deadline_at = self.started + policy.deadline
+        self.attempts = 0
+        self.retries = 0
+        self.errors: Dict[str, str] = {}
+        self.last_error: Optional[Exception] = None
+        self._eligible = list(regions)
+        self._position = 0
+        self._not_before = 0.0
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline."""
+        return max(0.0, self.deadline_at - time.monotonic())
+
+    def next_attempt(self) -> Optional[Tuple[str, float]]:
+        """
+        The region for the next attempt and the delay to wait before it.
+
+        Returns:
+            tuple: (region, delay), or None when the budget, the deadline or the
+            eligible regions are used up.
+        """
+        if self.attempts >= self.policy.max_attempts or not self._eligible:
+            return None
+        delay = 0.0
+        if self._position >= len(self._eligible):
+            # Every eligible region failed once more: back off before going round again
+            self._position = 0
+            self.retries += 1
+            delay = self.policy.backoff(self.retries)
+        # An error may say when it is worth trying again (e.g. the project quota refills)
+        delay = max(delay, self._not_before - time.monotonic())
+        if delay >= self.remaining():
+            return None
+        region = self._eligible[self._position]
+        self._position += 1
+        self.attempts += 1
+        return region, delay
+
+    def record_failure(self, region: str, error: Exception) -> str:
+        """
+        Classify a failed attempt; FAILOVER errors take the region out of rotation.
+        An error's ``retry_after`` (seconds) delays the next attempt at least that long.
+        """
+        kind = self.policy.classify(error)
+        self.errors[region] = kind
+        self.last_error = error
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            self._not_before = max(self._not_before, time.monotonic() + retry_after)
+        if kind == FAILOVER and region in self._eligible:
+            index = self._eligible.index(region)
+            self._eligible.pop(index)
+            if index < self._position:
+                self._position -= 1
+        return kind
+
+    def can_take(self) -> bool:
+        """Whether an untried region can be launched right away (used for hedges)."""
+        return (self.attempts < self.policy.max_attempts and self._position < len(self._eligible)
+                and self.remaining() > 0)
+
+    def take_region(self) -> Optional[str]:
+        """Next untried region without backoff; None if ``can_take`` is false."""
+        if not self.can_take():
+            return None
+        region = self._eligible[self._position]
+        self._position += 1
+        self.attempts += 1
+        return region
+
+    def exhausted(self) -> RetryExhausted:
+        """The error to raise after the last attempt failed."""
+        last = (str(self.last_error) or type(self.last_error).__name__) if self.last_error is not None else "none"
+        if self.remaining() <= 0:
+            message = f"Deadline of {self.policy.deadline:g}s exceeded after {self.attempts} attempts. Last error: {last}"
+        else:
+            message = f"All regions failed after {self.attempts} attempts. Last error: {last}"
+        return RetryExhausted(message, self.last_error, self.attempts)
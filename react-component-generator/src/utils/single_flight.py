@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicate identical in-flight work across threads and event loops.
+
+    The first caller for a key becomes the leader and does the work; callers
+    arriving while it runs wait on the leader's future and receive its result
+    (or its exception). If the leader is cancelled or abandons the work, one
+    waiting caller takes over as the new leader. ``stats`` counts how many
+    calls were saved.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self._stats["leaders"] += 1
+            return future, True
+
+    def _retract(self, key: str, future: Future) -> None:
+        """Forget the in-flight call so new callers start fresh."""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def _uncoalesce(self) -> None:
+        """A waiting caller is taking over from an abandoned leader."""
+        with self._lock:
+            self._stats["coalesced"] -= 1
+
+    def acquire(self, key: str) -> Tuple[Optional[Future], Any]:
+        """
+        Join the in-flight call for ``key`` or become its leader.
+
+        Returns:
+            tuple: (future, None) for the leader, who must call ``resolve``,
+            ``fail`` or ``abandon``; (None, result) for a caller that waited
+            on the leader.
+
+        Raises:
+            Exception: The leader's exception, for waiting callers.
+        """
+        while True:
+            future, leader = self._claim(key)
+            if leader:
+                return future, None
+            try:
+                return None, future.result()
+            except CancelledError:
+                self._uncoalesce()
+
+    async def aacquire(self, key: str) -> Tuple[Optional[Future], Any]:
+        """Asynchronous ``acquire``; cancelling a waiting caller does not affect the leader."""
+        while True:
+            future, leader = self._claim(key)
+            if leader:
+                return future, None
+            try:
+                return None, await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                self._uncoalesce()
+
+    def resolve(self, key: str, future: Future, result: Any) -> None:
+        self._retract(key, future)
+        future.set_result(result)
+
+    def fail(self, key: str, future: Future, error: BaseException) -> None:
+        self._retract(key, future)
+        future.set_exception(error)
+
+    def abandon(self, key: str, future: Future) -> None:
+        """Give up leadership without a result; a waiting caller takes over."""
+        self._retract(key, future)
+        future.cancel()
+
+    def do(self, key: str, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run ``function`` unless an identical call is in flight.
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result came from
+            another caller's run.
+        """
+        future, result = self.acquire(key)
+        if future is None:
+            return result, True
+        try:
+            result = function()
+        except Exception as e:
+            self.fail(key, future, e)
+            raise
+        except BaseException:
+            self.abandon(key, future)
+            raise
+        self.resolve(key, future, result)
+        return result, False
+
+    async def ado(self, key: str, function: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Asynchronous ``do``; a cancelled leader hands the call over to a waiting caller."""
+        future, result = await self.aacquire(key)
+        if future is None:
+            return result, True
+        try:
+            result = await function()
+        except Exception as e:
+            self.fail(key, future, e)
+            raise
+        except BaseException:
+            self.abandon(key, future)
+            raise
+        self.resolve(key, future, result)
+        return result, False
+
+    def stats(self) -> Dict[str, int]:
+        """Leader runs, calls served from another caller's run, and calls currently in flight."""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
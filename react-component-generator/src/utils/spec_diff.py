@@ -0,0 +1,58 @@
+from typing import Any, Dict, List, Optional
+
+# Spec field -> kinds of file whose content depends on it. package.json depends
+# only on the component name, which triggers a full regeneration anyway.
+FIELD_FILES = {
+    "variants": ("css", "props", "example"),
+    "sizes": ("css", "props"),
+    "features": ("tsx", "css", "props", "example"),
+    "custom_requirements": ("tsx", "css", "props", "example"),
+}
+
+# Changing any of these invalidates every file
+FULL_REGENERATION_FIELDS = ("component_name", "component_type")
+
+_LIST_FIELDS = ("variants", "sizes", "features")
+
+
+def component_filenames(component_name: str) -> Dict[str, str]:
+    """File kind -> file name for a component, in generation order."""
+    return {
+        "tsx": f"{component_name}.tsx",
+        "css": f"{component_name}.css",
+        "props": f"{component_name}Props.ts",
+        "example": f"{component_name}Example.tsx",
+        "package": "package.json",
+    }
+
+
+def normalize_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Order-insensitive, whitespace-trimmed copy of a spec for comparison."""
+    normalized = dict(spec)
+    for field in _LIST_FIELDS:
+        normalized[field] = sorted(spec.get(field) or [])
+    normalized["custom_requirements"] = (spec.get("custom_requirements") or "").strip()
+    return normalized
+
+
+def changed_fields(old_spec: Dict[str, Any], new_spec: Dict[str, Any]) -> List[str]:
+    """Spec fields whose normalized values differ."""
+    old, new = normalize_spec(old_spec), normalize_spec(new_spec)
+    return [field for field in (*FULL_REGENERATION_FIELDS, *FIELD_FILES) if old.get(field) != new.get(field)]
+
+
+def affected_files(old_spec: Dict[str, Any], new_spec: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Files that must be regenerated when a component's spec changes.
+
+    Returns:
+        list: File names to regenerate (empty if nothing changed), or None if
+        the whole component has to be regenerated.
+    """
+    fields = changed_fields(old_spec, new_spec)
+    if any(field in FULL_REGENERATION_FIELDS for field in fields):
+        return None
+
+    kinds = {kind for field in fields for kind in FIELD_FILES[field]}
+    filenames = component_filenames(new_spec["component_name"])
+    return [filename for kind, filename in filenames.items() if kind in kinds]
@@ -0,0 +1,190 @@
+import re
+import json
+from typing import Dict, List, Tuple
+
+
+_FILES_OPEN = re.compile(r'"files"\s*:\s*\{')
+
+
+class IncrementalFilesParser:
+    """
+    Incremental parser for ``{"files": {"<name>": "<content>", ...}}`` payloads.
+
+    Chunks of a streamed JSON response are fed in as they arrive and every
+    entry of the ``files`` object is returned as soon as its value is complete,
+    so callers can process ``X.tsx`` while ``X.css`` is still being generated.
+    String values are decoded with the JSON rules; object or array values
+    (models sometimes emit ``package.json`` as an object) are re-serialized.
+
+    Malformed input does not raise: parsing stops, ``error`` describes the
+    problem and the entries completed so far stay in ``files``.
+    """
+
+    _SEEK, _KEY, _COLON, _VALUE, _STRING, _NESTED, _SEPARATOR, _DONE = range(8)
+
+    def __init__(self):
+        self.files: Dict[str, str] = {}
+        self._buffer = ""
+        self._pos = 0
+        self._state = self._SEEK
+        self._token_start = None
+        self._key = None
+        self._last_key = None
+        self.error = None
+        self._escaped = False
+        self._in_string = False
+        self._depth = 0
+
+    @property
+    def done(self) -> bool:
+        """True once the closing brace of the files object has been seen."""
+        return self._state == self._DONE
+
+    @property
+    def failed(self) -> bool:
+        """True once malformed input stopped the parser."""
+        return self.error is not None
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consume a chunk and return the (filename, content) entries it completed."""
+        if self.failed:
+            return []
+        self._buffer += chunk
+        completed = []
+        try:
+            while self._pos < len(self._buffer) and self._state != self._DONE:
+                if not self._step(completed):
+                    break
+        except ValueError as e:
+            self.error = str(e)
+        return completed
+
+    def _skip_whitespace(self) -> bool:
+        while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+            self._pos += 1
+        return self._pos < len(self._buffer)
+
+    def _step(self, completed: List[Tuple[str, str]]) -> bool:
+        """Advance the state machine; returns False when more input is needed."""
+        buffer = self._buffer
+
+        if self._state == self._SEEK:
+            match = _FILES_OPEN.search(buffer, self._pos)
+            if match is None:
+                # Keep a tail in case the marker is split across chunks
+                self._pos = max(self._pos, len(buffer) - 32)
+                return False
+            self._pos = match.end()
+            self._state = self._KEY
+            return True
+
+        if not self._skip_whitespace():
+            return False
+        char = buffer[self._pos]
+
+        if self._state == self._KEY:
+            if char == "}":
+                self._pos += 1
+                self._state = self._DONE
+                return True
+            if char != '"':
+                raise ValueError(f"Unexpected character {char!r} in files object")
+            self._token_start = self._pos
+            self._pos += 1
+            self._escaped = False
+            self._state = self._STRING
+            self._key = None
+            return True
+
+        if self._state == self._COLON:
+            if char != ":":
+                raise ValueError(f"Expected ':' after file name {self._key!r}")
+            self._pos += 1
+            self._state = self._VALUE
+            return True
+
+        if self._state == self._VALUE:
+            self._token_start = self._pos
+            self._pos += 1
+            if char == '"':
+                self._escaped = False
+                self._state = self._STRING
+            elif char in "{[":
+                self._depth = 1
+                self._in_string = False
+                self._escaped = False
+                self._state = self._NESTED
+            else:
+                raise ValueError(f"Unsupported value for file {self._key!r}")
+            return True
+
+        if self._state == self._STRING:
+            return self._scan_string(completed)
+
+        if self._state == self._NESTED:
+            return self._scan_nested(completed)
+
+        if self._state == self._SEPARATOR:
+            self._pos += 1
+            if char == ",":
+                self._state = self._KEY
+            elif char == "}":
+                self._state = self._DONE
+            else:
+                raise ValueError(f"Unexpected character {char!r} after file {self._last_key!r}")
+            return True
+
+        return False
+
+    def _scan_string(self, completed: List[Tuple[str, str]]) -> bool:
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            self._pos += 1
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                value = json.loads(buffer[self._token_start:self._pos])
+                if self._key is None:
+                    self._key = value
+                    self._state = self._COLON
+                else:
+                    self._emit(self._key, value, completed)
+                return True
+        return False
+
+    def _scan_nested(self, completed: List[Tuple[str, str]]) -> bool:
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    value = json.loads(buffer[self._token_start:self._pos])
+                    self._emit(self._key, json.dumps(value, indent=2), completed)
+                    return True
+        return False
+
+    def _emit(self, key: str, value: str, completed: List[Tuple[str, str]]) -> None:
+        self.files[key] = value
+        completed.append((key, value))
+        self._last_key = key
+        self._key = None
+        self._state = self._SEPARATOR
+        # Completed entries are no longer needed in the buffer
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
@@ -0,0 +1,226 @@
+import re
+from typing import Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+SIZE_NAMES = {"xs", "sm", "md", "lg", "xl", "xxl", "small", "medium", "large", "xlarge", "custom", "compact", "dense"}
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_VAR = re.compile(r"var\(\s*(--[\w-]+)\s*(?:,\s*([^()]*(?:\([^()]*\))?[^()]*))?\)")
+_COLOR = re.compile(r"#[0-9a-fA-F]{3,8}\b|rgba?\([^)]*\)|hsla?\([^)]*\)")
+_LENGTH = re.compile(r"(-?\d*\.?\d+)(px|rem|em)?")
+
+# Layout constants for the swatch grid
+_HEADER_WIDTH = 90
+_HEADER_HEIGHT = 28
+_CELL_GAP = 16
+_MARGIN = 16
+
+
+def _attr(value: str) -> str:
+    """Escape a CSS-derived value for a double-quoted SVG attribute."""
+    return escape(value, {'"': "&quot;"})
+
+
+def parse_css_rules(css: str) -> Dict[str, Dict[str, str]]:
+    """
+    Parse top-level CSS rules into ``{selector: {property: value}}``.
+
+    Comma-separated selectors are split, later declarations override earlier
+    ones and at-rule blocks (``@media``, ``@keyframes``) are skipped.
+    """
+    css = _COMMENT.sub("", css)
+    rules: Dict[str, Dict[str, str]] = {}
+    position = 0
+    while True:
+        open_brace = css.find("{", position)
+        if open_brace < 0:
+            break
+        selector_text = css[position:open_brace].strip()
+
+        # Find the matching closing brace (at-rules contain nested blocks)
+        depth = 1
+        index = open_brace + 1
+        while index < len(css) and depth:
+            if css[index] == "{":
+                depth += 1
+            elif css[index] == "}":
+                depth -= 1
+            index += 1
+        body = css[open_brace + 1:index - 1]
+        position = index
+
+        if selector_text.startswith("@"):
+            continue
+        declarations = {}
+        for declaration in body.split(";"):
+            name, _, value = declaration.partition(":")
+            if value.strip():
+                declarations[name.strip().lower()] = value.replace("!important", "").strip()
+        for selector in selector_text.split(","):
+            rules.setdefault(selector.strip(), {}).update(declarations)
+    return rules
+
+
+def _resolve_vars(value: str, variables: Dict[str, str]) -> str:
+    for _ in range(5):
+        resolved = _VAR.sub(lambda m: variables.get(m.group(1), m.group(2) or ""), value)
+        if resolved == value:
+            break
+        value = resolved
+    return value.strip()
+
+
+def _color(value: str) -> str:
+    """First usable color in a CSS value (gradients and shorthands included)."""
+    if not value:
+        return None
+    match = _COLOR.search(value)
+    if match:
+        return match.group(0)
+    words = [word for word in value.split() if word.isalpha() and word not in ("solid", "dashed", "dotted", "none", "inherit", "initial")]
+    return words[0] if words else None
+
+
+def _length(value: str, default: float = 0.0) -> float:
+    match = _LENGTH.search(value or "")
+    if not match:
+        return default
+    number = float(match.group(1))
+    return number * 16 if match.group(2) in ("rem", "em") else number
+
+
+def _box(value: str) -> Tuple[float, float]:
+    """(vertical, horizontal) lengths from a padding shorthand."""
+    parts = [_length(part) for part in (value or "").split()]
+    if not parts:
+        return 0.0, 0.0
+    if len(parts) == 1:
+        return parts[0], parts[0]
+    return parts[0], parts[1]
+
+
+def _modifier_rules(rules: Dict[str, Dict[str, str]], block: str) -> Dict[str, Dict[str, str]]:
+    """Declarations of plain ``.block--modifier`` selectors, keyed by modifier."""
+    pattern = re.compile(rf"^\.{re.escape(block)}--([\w-]+)$")
+    modifiers = {}
+    for selector, declarations in rules.items():
+        match = pattern.match(selector)
+        if match:
+            modifiers.setdefault(match.group(1), {}).update(declarations)
+    return modifiers
+
+
+def _find_block(rules: Dict[str, Dict[str, str]], component_name: str) -> str:
+    """The BEM block class: the component name in kebab or lower case, else the first class."""
+    kebab = re.sub(r"(?<!^)(?=[A-Z])", "-", component_name).lower()
+    for candidate in (kebab, component_name.lower(), component_name):
+        if f".{candidate}" in rules or any(s.startswith(f".{candidate}--") for s in rules):
+            return candidate
+    for selector in rules:
+        match = re.match(r"^\.([\w-]+?)(?:--[\w-]+)?$", selector)
+        if match:
+            return match.group(1)
+    return kebab
+
+
+def render_component_svg(component_name: str,
+                         files: Dict[str, str],
+                         variants: List[str] = None,
+                         sizes: List[str] = None) -> str:
+    """
+    Render a deterministic variant x size swatch grid for a generated component.
+
+    The component's CSS is parsed for its BEM block (``.button``), variant and
+    size modifiers (``.button--primary``, ``.button--small``) and their colors,
+    padding, font size, border and border radius. Variants and sizes default
+    to the modifiers found in the CSS.
+    """
+    rules = parse_css_rules(files.get(f"{component_name}.css", ""))
+    variables = {}
+    for selector in (":root", "html", "body"):
+        variables.update({k: v for k, v in rules.get(selector, {}).items() if k.startswith("--")})
+
+    block = _find_block(rules, component_name)
+    base = rules.get(f".{block}", {})
+    modifiers = _modifier_rules(rules, block)
+
+    if variants is None:
+        variants = [m for m in modifiers if m not in SIZE_NAMES]
+    if sizes is None:
+        sizes = [m for m in modifiers if m in SIZE_NAMES]
+    variants = list(variants) or ["default"]
+    sizes = list(sizes) or ["default"]
+
+    def style_for(variant: str, size: str) -> Dict[str, str]:
+        style = dict(base)
+        style.update(modifiers.get(variant, {}))
+        style.update(modifiers.get(size, {}))
+        return {k: _resolve_vars(v, variables) for k, v in style.items()}
+
+    # Measure every cell first so columns and rows line up
+    cells = {}
+    for variant in variants:
+        for size in sizes:
+            style = style_for(variant, size)
+            font_size = _length(style.get("font-size"), 14.0)
+            pad_y, pad_x = _box(style.get("padding"))
+            pad_y = pad_y or font_size * 0.5
+            pad_x = pad_x or font_size
+            label = f"{component_name}"
+            width = max(_length(style.get("min-width")), len(label) * font_size * 0.6 + 2 * pad_x)
+            height = max(_length(style.get("min-height")), _length(style.get("height")), font_size * 1.2 + 2 * pad_y)
+            cells[(variant, size)] = (style, font_size, width, height, label)
+
+    column_widths = [max(cells[(v, s)][2] for v in variants) for s in sizes]
+    row_heights = [max(cells[(v, s)][3] for s in sizes) for v in variants]
+    total_width = _MARGIN * 2 + _HEADER_WIDTH + sum(column_widths) + _CELL_GAP * (len(sizes) - 1)
+    total_height = _MARGIN * 2 + _HEADER_HEIGHT + sum(row_heights) + _CELL_GAP * (len(variants) - 1)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{total_width:.0f}" height="{total_height:.0f}" '
+        f'viewBox="0 0 {total_width:.0f} {total_height:.0f}" font-family="sans-serif">',
+        f'<rect width="100%" height="100%" fill="#FAFAFA"/>',
+    ]
+
+    x = _MARGIN + _HEADER_WIDTH
+    for size, column_width in zip(sizes, column_widths):
+        parts.append(
+            f'<text x="{x + column_width / 2:.1f}" y="{_MARGIN + 14}" font-size="12" fill="#616161" '
+            f'text-anchor="middle">{escape(size)}</text>'
+        )
+        x += column_width + _CELL_GAP
+
+    y = _MARGIN + _HEADER_HEIGHT
+    for variant, row_height in zip(variants, row_heights):
+        parts.append(
+            f'<text x="{_MARGIN}" y="{y + row_height / 2 + 4:.1f}" font-size="12" fill="#616161">{escape(variant)}</text>'
+        )
+        x = _MARGIN + _HEADER_WIDTH
+        for size, column_width in zip(sizes, column_widths):
+            style, font_size, width, height, label = cells[(variant, size)]
+            fill = _color(style.get("background-color") or style.get("background")) or "#FFFFFF"
+            text_color = _color(style.get("color")) or "#212121"
+            border = style.get("border", "")
+            stroke = _color(style.get("border-color") or border) if border != "none" else None
+            stroke_width = _length(style.get("border-width") or border, 1.0) if stroke else 0
+            radius = _length(style.get("border-radius"))
+            cell_x = x + (column_width - width) / 2
+            cell_y = y + (row_height - height) / 2
+            parts.append(
+                f'<rect x="{cell_x:.1f}" y="{cell_y:.1f}" width="{width:.1f}" height="{height:.1f}" '
+                f'rx="{min(radius, height / 2):.1f}" fill="{_attr(fill)}"'
+                + (f' stroke="{_attr(stroke)}" stroke-width="{stroke_width:.1f}"' if stroke else "")
+                + "/>"
+            )
+            weight = style.get("font-weight")
+            parts.append(
+                f'<text x="{cell_x + width / 2:.1f}" y="{cell_y + height / 2 + font_size * 0.35:.1f}" '
+                f'font-size="{font_size:.1f}" fill="{_attr(text_color)}" text-anchor="middle"'
+                + (f' font-weight="{_attr(weight)}"' if weight else "")
+                + f">{escape(label)}</text>"
+            )
+            x += column_width + _CELL_GAP
+        y += row_height + _CELL_GAP
+
+    parts.append("</svg>")
+    return "".join(parts)
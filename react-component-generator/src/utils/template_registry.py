@@ -0,0 +1,214 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+DEFAULT_TEMPLATE_DIR = os.environ.get(
+    "COMPONENT_TEMPLATE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "templates")
+)
+
+# File name suffix -> template key; the remainder of the name is the component type
+_SUFFIXES = [
+    ("Props.ts", "props"),
+    ("Example.tsx", "example"),
+    (".tsx", "tsx"),
+    (".css", "css"),
+]
+_SHARED_FILES = {"package.json": "package"}
+
+
+def _classify(filename: str) -> Tuple[str, str]:
+    """Return (component type, template key) for a template file, or (None, None)."""
+    if filename in _SHARED_FILES:
+        return None, _SHARED_FILES[filename]
+    for suffix, key in _SUFFIXES:
+        if filename.endswith(suffix) and len(filename) > len(suffix):
+            return filename[:-len(suffix)], key
+    return None, None
+
+
+class TemplateRegistry:
+    """
+    In-memory index of the component template directory.
+
+    The directory is scanned once; every ``<Type>.tsx`` (with optional
+    ``<Type>.css``, ``<Type>Props.ts`` and ``<Type>Example.tsx``) becomes a
+    template type, and ``package.json`` is read once and shared by all types.
+    ``refresh`` re-reads only files whose mtime or size changed, and each
+    type exposes a content hash that can be used in cache keys.
+    """
+
+    def __init__(self,
+                 template_dir: str = None,
+                 fallback_type: str = "Button",
+                 refresh_interval: float = 2.0,
+                 logger: logging.Logger = None):
+        """
+        Initialize the TemplateRegistry.
+
+        Args:
+            template_dir (str, optional): Directory holding the templates. Defaults to the
+                COMPONENT_TEMPLATE_DIR environment variable or the project's ``templates`` directory.
+            fallback_type (str): Template used as a style reference for types without their own.
+            refresh_interval (float): Minimum seconds between automatic mtime checks.
+            logger (logging.Logger, optional): Custom logger instance.
+        """
+        self.template_dir = os.path.abspath(template_dir or DEFAULT_TEMPLATE_DIR)
+        self.fallback_type = fallback_type
+        self.refresh_interval = refresh_interval
+        self.logger = logger or logging.getLogger(__name__)
+
+        # filename -> (mtime_ns, size, content, sha256)
+        self._files: Dict[str, Tuple[int, int, str, str]] = {}
+        self._templates: Dict[str, Dict[str, str]] = {}
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._observer = None
+
+        os.makedirs(self.template_dir, exist_ok=True)
+        self.refresh(force=True)
+
+    @property
+    def templates(self) -> Dict[str, Dict[str, str]]:
+        """Mapping of component type -> {"tsx", "css", "props", "example", "package"} contents."""
+        self.refresh()
+        return self._templates
+
+    def types(self) -> List[str]:
+        """Component types that have a template."""
+        return sorted(self.templates)
+
+    def get(self, component_type: str, fallback: bool = True) -> Dict[str, str]:
+        """Return the template files for a type, falling back to ``fallback_type`` if it has none."""
+        templates = self.templates
+        template = templates.get(component_type)
+        if template is None and fallback:
+            template = templates.get(self.fallback_type)
+            if template is not None:
+                self.logger.debug(f"No template for {component_type}; using {self.fallback_type} as reference")
+        return template or {}
+
+    def content_hash(self, component_type: str, fallback: bool = True) -> str:
+        """Combined hash of every file contributing to a type's template."""
+        self.refresh()
+        digest = self._hashes.get(component_type)
+        if digest is None and fallback:
+            digest = self._hashes.get(self.fallback_type)
+        return digest or ""
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Re-scan the directory and re-read only new or changed files.
+
+        Returns:
+            bool: True if the index changed.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.refresh_interval:
+            return False
+
+        with self._lock:
+            self._last_check = now
+            try:
+                entries = {
+                    entry.name: entry.stat()
+                    for entry in os.scandir(self.template_dir)
+                    if entry.is_file() and _classify(entry.name)[1] is not None
+                }
+            except FileNotFoundError:
+                entries = {}
+
+            changed = False
+            files = dict(self._files)
+            for name in list(files):
+                if name not in entries:
+                    del files[name]
+                    changed = True
+                    self.logger.info(f"Template removed: {name}")
+            for name, stat in entries.items():
+                cached = files.get(name)
+                if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                    continue
+                try:
+                    with open(os.path.join(self.template_dir, name), "r", encoding="utf-8") as f:
+                        content = f.read()
+                except OSError as e:
+                    self.logger.error(f"Error reading template file {name}: {str(e)}")
+                    continue
+                files[name] = (stat.st_mtime_ns, stat.st_size, content, hashlib.sha256(content.encode("utf-8")).hexdigest())
+                changed = True
+                self.logger.debug(f"Template loaded: {name}")
+
+            if changed:
+                self._files = files
+                self._rebuild_index()
+            return changed
+
+    def _rebuild_index(self) -> None:
+        templates: Dict[str, Dict[str, str]] = {}
+        file_hashes: Dict[str, List[str]] = {}
+        shared = {}
+        shared_hashes = []
+        for name in sorted(self._files):
+            _, _, content, digest = self._files[name]
+            component_type, key = _classify(name)
+            if component_type is None:
+                shared[key] = content
+                shared_hashes.append(f"{name}:{digest}")
+            else:
+                templates.setdefault(component_type, {})[key] = content
+                file_hashes.setdefault(component_type, []).append(f"{name}:{digest}")
+
+        index = {}
+        hashes = {}
+        for component_type, template in templates.items():
+            # Only add template if we have the main component file
+            if not template.get("tsx"):
+                self.logger.warning(f"Skipping {component_type} template - missing main component file")
+                continue
+            index[component_type] = {**template, **shared}
+            joined = "\n".join(file_hashes[component_type] + shared_hashes)
+            hashes[component_type] = hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+        self._templates = index
+        self._hashes = hashes
+        self.logger.info(f"Template index: {', '.join(sorted(index)) or 'empty'}")
+
+    def watch(self) -> bool:
+        """
+        Refresh immediately on file system events using watchdog (inotify on Linux).
+
+        Returns:
+            bool: False if watchdog is not installed; mtime polling still applies.
+        """
+        if self._observer is not None:
+            return True
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            self.logger.info("watchdog not installed; templates are refreshed by mtime polling")
+            return False
+
+        registry = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                registry.refresh(force=True)
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), self.template_dir, recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def stop_watching(self) -> None:
+        """Stop the watchdog observer started by ``watch`` and wait for its thread to exit."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
@@ -0,0 +1,468 @@
+"""
+Record and replay of model traffic.
+
+``TrafficRecorder`` appends every model call made by a ``GeminiRegionClient``
+(prompt, response text, time to first byte, latency, chunk timings, token
+usage, finish reason and error) and every generation request made through a
+``ComponentGenerator`` to a JSON-lines file. Prompts are stored once per
+content hash and referenced by calls, which keeps recordings of repeated
+template-heavy prompts small. The file is only ever appended to, so several
+sessions (or processes) can share one recording.
+
+``ReplayBackend`` serves a recording back as a model backend: calls with a
+recorded prompt get the recorded response or error after the recorded delay,
+multiplied by ``time_scale`` to compress time. Running the recorded requests
+against a generator backed by it reproduces production load without calling
+the service:
+
+    python -m utils.traffic recording.jsonl --time-scale 0.1 --users 8 --json
+
+Record from the app with ``GEMINI_RECORD_FILE=recording.jsonl``; serve the app
+from a recording with ``GEMINI_REPLAY_FILE``.
+"""
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from google.api_core import exceptions as api_exceptions
+
+from .call_metrics import current_generation, response_finish_reason, response_usage
+from .fake_backend import FakeResponse
+from .retry_policy import FATAL
+
+FORMAT_VERSION = 1
+
+# Errors other than google.api_core ones that are rebuilt as themselves on replay
+_BUILTIN_ERRORS = {error.__name__: error for error in (
+    ValueError, TypeError, TimeoutError, ConnectionError, ConnectionResetError, OSError, RuntimeError,
+)}
+
+
+def _prompt_text(contents, prefix: str = None) -> str:
+    """The full prompt as sent, with a cached prefix put back in front of it."""
+    if isinstance(contents, str):
+        text = contents
+    else:
+        text = "\n".join(part if isinstance(part, str) else f"<{type(part).__name__}>" for part in contents)
+    return f"{prefix}\n\n{text}" if prefix else text
+
+
+def prompt_key(contents, prefix: str = None) -> str:
+    """Content hash identifying a prompt in a recording."""
+    return hashlib.sha256(_prompt_text(contents, prefix).encode("utf-8")).hexdigest()[:24]
+
+
+def _chunk_text(response) -> str:
+    try:
+        return response.text
+    except ValueError:
+        return ""
+
+
+class _Capture:
+    """Timing and output of one recorded model call."""
+
+    def __init__(self, recorder: "TrafficRecorder", region: str, contents, prefix: Optional[str], stream: bool):
+        self.recorder = recorder
+        self.region = region
+        self.contents = contents
+        self.prefix = prefix
+        self.stream = stream
+        self.at = time.time()
+        self.started = time.monotonic()
+        self.ttfb: Optional[float] = None
+        self.chunks: List[List[float]] = []
+        self.parts: List[str] = []
+        self.last_response = None
+
+    def _elapsed(self) -> float:
+        return round(time.monotonic() - self.started, 4)
+
+    def chunk(self, response) -> None:
+        if response_usage(response)[0] is not None or response_finish_reason(response):
+            self.last_response = response
+        text = _chunk_text(response)
+        if text:
+            offset = self._elapsed()
+            if self.ttfb is None:
+                self.ttfb = offset
+            self.chunks.append([offset, len(text)])
+            self.parts.append(text)
+
+    def success(self, response=None) -> None:
+        if response is not None:
+            self.last_response = response
+            try:
+                self.parts = [response.text]
+            except ValueError:
+                self.parts = None
+        self.recorder.record_call(self, error=None)
+
+    def failure(self, error: BaseException) -> None:
+        self.recorder.record_call(self, error=error)
+
+
+class RecordingModel:
+    """Wraps a model so its calls are written to a ``TrafficRecorder``."""
+
+    def __init__(self, model, recorder: "TrafficRecorder", region: str, prefix: str = None):
+        self.model = model
+        self.recorder = recorder
+        self.region = region
+        self.prefix = prefix
+
+    def generate_content(self, contents, **kwargs):
+        capture = _Capture(self.recorder, self.region, contents, self.prefix, bool(kwargs.get("stream")))
+        try:
+            response = self.model.generate_content(contents, **kwargs)
+        except Exception as e:
+            capture.failure(e)
+            raise
+        if capture.stream:
+            return self._stream(response, capture)
+        capture.success(response)
+        return response
+
+    def _stream(self, responses, capture: _Capture) -> Iterator[Any]:
+        try:
+            for response in responses:
+                capture.chunk(response)
+                yield response
+        except Exception as e:
+            capture.failure(e)
+            raise
+        capture.success()
+
+    async def generate_content_async(self, contents, **kwargs):
+        capture = _Capture(self.recorder, self.region, contents, self.prefix, False)
+        try:
+            response = await self.model.generate_content_async(contents, **kwargs)
+        except Exception as e:
+            capture.failure(e)
+            raise
+        capture.success(response)
+        return response
+
+
+class TrafficRecorder:
+    """
+    Append-only JSON-lines recording of model calls and generation requests.
+
+    Entries (one JSON object per line, distinguished by ``t``):
+    ``prompt`` (hash and text, written once per hash and recorder),
+    ``call`` (one attempt against one region) and ``request`` (a generation
+    or SVG request with its spec, used to drive replays).
+    """
+
+    def __init__(self, path: str, logger: logging.Logger = None):
+        """
+        Initialize the TrafficRecorder.
+
+        Args:
+            path (str): File to append to; created on the first entry.
+            logger (logging.Logger, optional): Logger for write failures.
+        """
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self._prompts = set()
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    def wrap(self, model, region: str, prefix: str = None) -> RecordingModel:
+        """Record the calls made through ``model``; ``prefix`` is a context-cached prompt prefix it holds."""
+        return RecordingModel(model, self, region, prefix)
+
+    def _append(self, entries: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n" for entry in entries)
+        try:
+            # One write per call, so lines from concurrent writers do not interleave
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            self.logger.warning(f"Could not write traffic recording {self.path}: {str(e)}")
+
+    def record_call(self, capture: _Capture, error: Optional[BaseException]) -> None:
+        key = prompt_key(capture.contents, capture.prefix)
+        input_tokens, output_tokens, cached_tokens = response_usage(capture.last_response)
+        entry = {
+            "t": "call",
+            "v": FORMAT_VERSION,
+            "at": round(capture.at, 4),
+            "region": capture.region,
+            "prompt": key,
+            "generation": current_generation(),
+            "stream": capture.stream,
+            "ttfb": capture.ttfb,
+            "latency": capture._elapsed(),
+            "text": "".join(capture.parts) if capture.parts is not None else None,
+            "usage": [input_tokens, output_tokens, cached_tokens],
+            "finish": response_finish_reason(capture.last_response),
+        }
+        if capture.stream:
+            entry["chunks"] = capture.chunks
+        if error is not None:
+            code = getattr(error, "code", None)
+            entry["error"] = {
+                "class": type(error).__name__,
+                "code": code if isinstance(code, int) else None,
+                "message": str(error)[:1000],
+            }
+        with self._lock:
+            entries = []
+            if key not in self._prompts:
+                self._prompts.add(key)
+                entries.append({"t": "prompt", "id": key, "text": _prompt_text(capture.contents, capture.prefix)})
+            entries.append(entry)
+            self._stats["errors" if error is not None else "calls"] += 1
+            self._append(entries)
+
+    def record_request(self, operation: str, **fields) -> None:
+        """Note a request (e.g. ``generate`` with its spec) so load tests can replay it."""
+        entry = {"t": "request", "v": FORMAT_VERSION, "at": round(time.time(), 4), "operation": operation,
+                 "generation": current_generation(), **fields}
+        with self._lock:
+            self._stats["requests"] += 1
+            self._append([entry])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self._stats["calls"], "errors": self._stats["errors"], "requests": self._stats["requests"]}
+
+
+class ReplayMiss(LookupError):
+    """Raised when a prompt is not in the recording; retrying another region cannot help."""
+    retry_class = FATAL
+
+
+def load_recording(path: str) -> List[Dict[str, Any]]:
+    """Entries of a recording in file order; a truncated last line is skipped."""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def replay_error(error: Dict[str, Any]) -> Exception:
+    """Rebuild a recorded error with its original type where possible."""
+    message = f"{error.get('message', '')} (replayed)"
+    cls = getattr(api_exceptions, error.get("class", ""), None)
+    if isinstance(cls, type) and issubclass(cls, api_exceptions.GoogleAPICallError):
+        return cls(message)
+    if isinstance(error.get("code"), int):
+        return api_exceptions.from_http_status(error["code"], message)
+    return _BUILTIN_ERRORS.get(error.get("class"), RuntimeError)(message)
+
+
+class ReplayBackend:
+    """
+    Model backend serving a traffic recording.
+
+    Calls are matched by prompt hash. The recorded attempts of a prompt are
+    served in their recorded order, regardless of region, so a 429 followed by
+    a success in another region is replayed as a failover again; once they are
+    used up, they start over. Unknown prompts go to ``fallback`` (any backend
+    with ``get``, e.g. a ``FakeBackend``) or raise ``ReplayMiss``.
+    """
+
+    def __init__(self, path: str, time_scale: float = 1.0, fallback=None):
+        """
+        Initialize the ReplayBackend.
+
+        Args:
+            path (str): Recording written by a TrafficRecorder.
+            time_scale (float): Factor applied to recorded delays (0.1 replays ten times faster).
+            fallback (optional): Backend for prompts missing from the recording.
+        """
+        self.path = path
+        self.time_scale = time_scale
+        self.fallback = fallback
+        self.calls: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.requests: List[Dict[str, Any]] = []
+        for entry in load_recording(path):
+            if entry.get("t") == "call":
+                self.calls[entry["prompt"]].append(entry)
+            elif entry.get("t") == "request":
+                self.requests.append(entry)
+        self._cursors: Counter = Counter()
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, project_id: str, region: str, model_name: str) -> "ReplayModel":
+        """Model for ``region`` (same signature as ``RegionModelPool.get``)."""
+        fallback = self.fallback.get(project_id, region, model_name) if self.fallback is not None else None
+        return ReplayModel(self, region, fallback)
+
+    def invalidate(self, region: str = None) -> None:
+        if self.fallback is not None:
+            self.fallback.invalidate(region)
+
+    def next_call(self, contents) -> Optional[Dict[str, Any]]:
+        """The next recorded attempt for this prompt, or None if it was never recorded."""
+        key = prompt_key(contents)
+        with self._lock:
+            recorded = self.calls.get(key)
+            if not recorded:
+                self._stats["missed"] += 1
+                return None
+            entry = recorded[self._cursors[key] % len(recorded)]
+            self._cursors[key] += 1
+            self._stats["served"] += 1
+            return entry
+
+    def response(self, entry: Dict[str, Any], text: str = None) -> FakeResponse:
+        input_tokens, output_tokens, cached_tokens = entry.get("usage") or [None, None, None]
+        return FakeResponse(entry.get("text") if text is None else text, input_tokens, entry.get("finish"),
+                            output_tokens, cached_tokens)
+
+    def stats(self) -> Dict[str, int]:
+        """Recorded prompts, calls served from the recording and calls that missed it."""
+        with self._lock:
+            return {"prompts": len(self.calls), "served": self._stats["served"], "missed": self._stats["missed"]}
+
+
+class ReplayModel:
+    """A model answering from a ``ReplayBackend``."""
+
+    def __init__(self, backend: ReplayBackend, region: str, fallback=None):
+        self.backend = backend
+        self.region = region
+        self.fallback = fallback
+
+    def _miss(self, contents) -> ReplayMiss:
+        return ReplayMiss(f"Prompt {prompt_key(contents)} is not in the recording {self.backend.path}")
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        entry = self.backend.next_call(contents)
+        if entry is None:
+            if self.fallback is None:
+                raise self._miss(contents)
+            return self.fallback.generate_content(contents, stream=stream, **kwargs)
+        if stream:
+            return self._stream(entry)
+        time.sleep(entry["latency"] * self.backend.time_scale)
+        if entry.get("error"):
+            raise replay_error(entry["error"])
+        return self.backend.response(entry)
+
+    def _stream(self, entry: Dict[str, Any]) -> Iterator[FakeResponse]:
+        scale = self.backend.time_scale
+        text = entry.get("text") or ""
+        # Non-streamed recordings are replayed as one chunk at the end of the call
+        chunks = entry.get("chunks") or ([[entry["latency"], len(text)]] if text else [])
+        elapsed = position = 0.0
+        for index, (offset, length) in enumerate(chunks):
+            time.sleep(max(0.0, offset - elapsed) * scale)
+            elapsed = offset
+            piece = text[int(position):int(position) + length]
+            position += length
+            last = index == len(chunks) - 1 and not entry.get("error")
+            yield self.backend.response(entry, piece) if last else FakeResponse(piece)
+        time.sleep(max(0.0, entry["latency"] - elapsed) * scale)
+        if entry.get("error"):
+            raise replay_error(entry["error"])
+        if not chunks:
+            yield self.backend.response(entry, "")
+
+    async def generate_content_async(self, contents, **kwargs):
+        entry = self.backend.next_call(contents)
+        if entry is None:
+            if self.fallback is None:
+                raise self._miss(contents)
+            return await self.fallback.generate_content_async(contents, **kwargs)
+        await asyncio.sleep(entry["latency"] * self.backend.time_scale)
+        if entry.get("error"):
+            raise replay_error(entry["error"])
+        return self.backend.response(entry)
+
+
+def _replay_request(generator, request: Dict[str, Any], svgs: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Issue one recorded generation request (and its SVG requests) the way it was made."""
+    spec = request["spec"]
+    options = {"incremental": request.get("incremental", False), "session": request.get("session")}
+    if request.get("mode") == "stream":
+        files = dict(generator.generate_component_stream(**spec, **options))
+    elif request.get("mode") == "async":
+        files = asyncio.run(generator.agenerate_component(**spec, **options))
+    else:
+        files = generator.generate_component(**spec, **options)
+    for svg in svgs:
+        generator.generate_component_svg(spec["component_name"], files, fancy=svg.get("fancy", False))
+    return files
+
+
+def run_load(backend: ReplayBackend, users: int = 4, paced: bool = True, time_scale: float = None) -> Dict[str, Any]:
+    """
+    Replay the recorded generation requests against a fresh ``ComponentGenerator``.
+
+    With ``paced``, requests start at their recorded offsets (scaled like the
+    model delays); otherwise they are all submitted at once. ``users`` bounds
+    how many run concurrently.
+    """
+    from .benchmark import make_generator, summarize
+
+    time_scale = backend.time_scale if time_scale is None else time_scale
+    generator = make_generator(backend, time_scale)
+    requests = [request for request in backend.requests if request["operation"] == "generate"]
+    svgs = defaultdict(list)
+    for request in backend.requests:
+        if request["operation"] == "svg" and request.get("generation"):
+            svgs[request["generation"]].append(request)
+    first_at = requests[0]["at"] if requests else 0.0
+    started = time.perf_counter()
+
+    def run(request: Dict[str, Any]) -> Optional[float]:
+        if paced:
+            time.sleep(max(0.0, (request["at"] - first_at) * time_scale - (time.perf_counter() - started)))
+        call_started = time.perf_counter()
+        try:
+            _replay_request(generator, request, svgs.get(request.get("generation"), []))
+        except Exception:
+            return None
+        return time.perf_counter() - call_started
+
+    with ThreadPoolExecutor(max_workers=max(1, users)) as pool:
+        results = list(pool.map(run, requests))
+    latencies = [result for result in results if result is not None]
+    return summarize("replay", latencies, time.perf_counter() - started, errors=len(results) - len(latencies),
+                     users=users, paced=paced, time_scale=time_scale, replay=backend.stats())
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded generation traffic as load")
+    parser.add_argument("recording", help="File written with GEMINI_RECORD_FILE / TrafficRecorder")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Factor applied to recorded delays")
+    parser.add_argument("--users", type=int, default=4, help="Requests allowed to run concurrently")
+    parser.add_argument("--burst", action="store_true", help="Submit every request at once instead of at its recorded time")
+    parser.add_argument("--fake-misses", action="store_true", help="Answer prompts missing from the recording with the fake backend")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.CRITICAL)
+    fallback = None
+    if args.fake_misses:
+        from .fake_backend import FakeBackend
+        fallback = FakeBackend(time_scale=args.time_scale)
+    backend = ReplayBackend(args.recording, time_scale=args.time_scale, fallback=fallback)
+    result = run_load(backend, users=args.users, paced=not args.burst)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"{result['count']} requests, {result['errors']} failed, {result['throughput_per_s']:.2f}/s")
+    print(f"latency p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+    print(f"model calls: {result['replay']['served']} replayed, {result['replay']['missed']} not in the recording")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
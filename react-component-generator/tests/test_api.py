@@ -0,0 +1,145 @@
+import json
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("vertexai")
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import api
+from utils.artifacts import ArtifactStore
+from utils.prompt_budget import PromptBudgetExceeded
+from utils.rate_limiter import RateLimited
+from utils.retry_policy import RetryExhausted
+
+SPEC = {"component_name": "Chip", "component_type": "Button"}
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return api.build_generator(fake=True, time_scale=0.001, cache=False)
+
+
+@pytest.fixture
+def request_api(generator, tmp_path):
+    """Run ``scenario(client, app)`` against an app served by the fake generator."""
+    def run(scenario, max_streams=16):
+        app = api.create_app(generator, ArtifactStore(str(tmp_path / "artifacts")), max_streams=max_streams)
+
+        async def main():
+            async with TestClient(TestServer(app)) as client:
+                return await scenario(client, app)
+        return asyncio.run(main())
+    return run
+
+
+def _failing(error):
+    async def agenerate_component(**kwargs):
+        raise error
+    return agenerate_component
+
+
+def test_generate_returns_files_and_report(request_api):
+    async def scenario(client, app):
+        response = await client.post("/v1/components", json=SPEC)
+        return response.status, await response.json()
+
+    status, body = request_api(scenario)
+    assert status == 200
+    assert body["component_name"] == "Chip"
+    assert {"Chip.tsx", "Chip.css", "package.json"} <= set(body["files"])
+    assert "report" in body
+
+
+def test_generate_streams_ndjson_events(request_api):
+    async def scenario(client, app):
+        response = await client.post("/v1/components?stream=1", json=SPEC)
+        return response.status, response.headers["Content-Type"], await response.text()
+
+    status, content_type, text = request_api(scenario)
+    events = [json.loads(line) for line in text.splitlines()]
+    assert status == 200
+    assert content_type == "application/x-ndjson"
+    assert events[-1]["event"] == "done"
+    streamed = [event["file"] for event in events if event["event"] == "file"]
+    assert sorted(set(streamed)) == events[-1]["files"]
+    assert "Chip.tsx" in streamed
+
+
+@pytest.mark.parametrize("body", ["not json", {"component_name": "bad name"}, {"component_name": "Chip", "variants": "primary"}])
+def test_invalid_requests_are_400(request_api, body):
+    async def scenario(client, app):
+        if isinstance(body, str):
+            response = await client.post("/v1/components", data=body)
+        else:
+            response = await client.post("/v1/components", json=body)
+        return response.status, await response.json()
+
+    status, payload = request_api(scenario)
+    assert status == 400
+    assert payload["error"]
+
+
+@pytest.mark.parametrize("error, status", [
+    (PromptBudgetExceeded("too large"), 422),
+    (RateLimited("Project is over its local quota", "project", 2.5), 429),
+    (RetryExhausted("All regions failed"), 503),
+    (RetryExhausted("Deadline exceeded", RateLimited("Project is over its local quota", "project", 2.5)), 429),
+    (ValueError("Invalid JSON"), 502),
+])
+def test_generator_errors_map_to_statuses(request_api, generator, error, status):
+    generator.agenerate_component = _failing(error)
+
+    async def scenario(client, app):
+        response = await client.post("/v1/components", json=SPEC)
+        return response.status, response.headers, await response.json()
+
+    actual, headers, payload = request_api(scenario)
+    assert actual == status
+    assert payload["error"]
+    if status == 429:
+        assert headers["Retry-After"] == "3"
+
+
+def test_stream_is_refused_when_all_stream_workers_are_busy(request_api):
+    release = threading.Event()
+
+    async def scenario(client, app):
+        assert app[api.STREAMS].submit(release.wait)
+        try:
+            response = await client.post("/v1/components?stream=1", json=SPEC)
+            return response.status, await response.json()
+        finally:
+            release.set()
+
+    status, payload = request_api(scenario, max_streams=1)
+    assert status == 503
+    assert "streaming" in payload["error"]
+
+
+def test_archive_is_cacheable_by_etag(request_api):
+    files = {"Chip.tsx": "export const Chip = () => null;\n", "Chip.css": ".chip {}\n"}
+
+    async def scenario(client, app):
+        created = await (await client.post("/v1/archives", json={"component_name": "Chip", "files": files})).json()
+        full = await client.get(created["url"])
+        etag = full.headers["ETag"]
+        body = await full.read()
+        statuses = {}
+        for if_none_match in (etag, f'"{"0" * 32}", {etag}', f"W/{etag}", "*", '"other"'):
+            response = await client.get(created["url"], headers={"If-None-Match": if_none_match})
+            statuses[if_none_match] = (response.status, len(await response.read()))
+        return full.status, len(body), created["size"], etag, statuses
+
+    status, length, size, etag, statuses = request_api(scenario)
+    assert status == 200
+    assert length == size
+    assert statuses[etag] == (304, 0)
+    assert statuses[f'"{"0" * 32}", {etag}'] == (304, 0)
+    assert statuses[f"W/{etag}"] == (304, 0)
+    assert statuses["*"] == (304, 0)
+    assert statuses['"other"'] == (200, size)
@@ -0,0 +1,123 @@
+import time
+import threading
+
+import pytest
+
+from utils.jobs import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, QueueFull
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def _blocking(release):
+    def work(job):
+        job.update(0.5, "Blocked", step="waiting")
+        job.log("waiting")
+        while not release.wait(0.01):
+            job.check_cancelled()
+        return "released"
+    return work
+
+
+def test_job_result_and_progress():
+    queue = JobQueue(workers=1)
+
+    def work(job, value):
+        job.update(0.5, "Halfway", value=value)
+        job.log("working")
+        return value * 2
+
+    job = queue.submit("double", work, 21)
+
+    assert job.wait(5)
+    state = job.snapshot()
+    assert state["status"] == SUCCEEDED
+    assert state["result"] == 42
+    assert state["progress"] == 1.0
+    assert state["partial"] == {"value": 21}
+    assert state["logs"][0].endswith("working")
+    assert queue.get(job.id) is job
+
+
+def test_failed_job_keeps_the_error():
+    queue = JobQueue(workers=1)
+
+    def work(job):
+        raise RuntimeError("boom")
+
+    job = queue.submit("fail", work)
+
+    assert job.wait(5)
+    assert job.status == FAILED
+    assert job.error == "boom"
+
+
+def test_cancelled_queued_job_never_runs():
+    queue = JobQueue(workers=1)
+    release = threading.Event()
+    blocker = queue.submit("block", _blocking(release))
+    _wait_for(lambda: blocker.status == RUNNING)
+    ran = []
+    waiting = queue.submit("later", lambda job: ran.append(job.id))
+
+    assert queue.position(waiting.id) == 0
+    assert queue.cancel(waiting.id)
+    assert waiting.status == CANCELLED
+    release.set()
+    assert blocker.wait(5)
+    # The worker skips the cancelled job and takes the next one
+    follower = queue.submit("next", lambda job: "ok")
+    assert follower.wait(5)
+    assert ran == []
+    assert waiting.status == CANCELLED
+
+
+def test_running_job_stops_at_check_cancelled():
+    queue = JobQueue(workers=1)
+    job = queue.submit("block", _blocking(threading.Event()))
+    _wait_for(lambda: job.status == RUNNING)
+
+    assert queue.cancel(job.id)
+    assert job.wait(5)
+    assert job.status == CANCELLED
+    assert not queue.cancel(job.id)
+
+
+def test_cancel_of_unknown_or_finished_job():
+    queue = JobQueue(workers=1)
+    job = queue.submit("quick", lambda job: 1)
+    job.wait(5)
+
+    assert not queue.cancel(job.id)
+    assert not queue.cancel("unknown")
+    assert job.status == SUCCEEDED
+
+
+def test_queue_full():
+    queue = JobQueue(workers=1, max_pending=2)
+    release = threading.Event()
+    blocker = queue.submit("block", _blocking(release))
+    _wait_for(lambda: blocker.status == RUNNING)
+    waiting = [queue.submit("wait", lambda job: None) for _ in range(2)]
+
+    with pytest.raises(QueueFull):
+        queue.submit("one too many", lambda job: None)
+
+    assert [queue.position(job.id) for job in waiting] == [0, 1]
+    assert queue.stats()[QUEUED] == 2
+    release.set()
+    for job in waiting:
+        assert job.wait(5)
+
+
+def test_finished_jobs_expire():
+    queue = JobQueue(workers=1, result_ttl=0.05)
+    job = queue.submit("quick", lambda job: 1)
+    job.wait(5)
+    time.sleep(0.1)
+
+    assert queue.get(job.id) is None
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from utils.rate_limiter import Quota, RateLimited, RateLimiter
+from utils.retry_policy import FAILOVER, RETRYABLE
+
+
+def _fill(limiter, region="r1", count=10):
+    """Use up the burst of a 60 RPM bucket (ten requests)."""
+    for _ in range(count):
+        assert limiter.reserve("p", region, 0).delay == 0
+
+
+def test_unlimited_limiter_does_not_reserve():
+    limiter = RateLimiter()
+
+    assert not limiter.enabled
+    assert limiter.acquire("p", "r1", 1000) is None
+
+
+def test_callers_beyond_the_burst_are_queued_in_order():
+    limiter = RateLimiter(region_quota=Quota(rpm=60))
+    _fill(limiter)
+
+    first = limiter.reserve("p", "r1", 0)
+    second = limiter.reserve("p", "r1", 0)
+
+    assert 0.9 < first.delay <= 1.0
+    assert 1.9 < second.delay <= 2.0
+    assert limiter.stats()["delayed"] == 2
+
+
+def test_full_region_fails_over():
+    limiter = RateLimiter(region_quota=Quota(rpm=60), max_wait=0.5)
+    _fill(limiter)
+
+    with pytest.raises(RateLimited) as raised:
+        limiter.reserve("p", "r1", 0)
+
+    assert raised.value.scope == "region"
+    assert raised.value.retry_class == FAILOVER
+    assert raised.value.retry_after is None
+    # Other regions have their own buckets
+    assert limiter.reserve("p", "r2", 0).delay == 0
+
+
+def test_full_project_is_retried_later():
+    limiter = RateLimiter(project_quota=Quota(rpm=60), max_wait=0.5)
+    _fill(limiter)
+
+    with pytest.raises(RateLimited) as raised:
+        limiter.reserve("p", "r2", 0)
+
+    assert raised.value.scope == "project"
+    assert raised.value.retry_class == RETRYABLE
+    assert raised.value.retry_after == raised.value.wait > 0.5
+
+
+def test_token_quota_and_settle():
+    limiter = RateLimiter(region_quota=Quota(tpm=6000))
+    reservation = limiter.reserve("p", "r1", 1000)
+
+    assert reservation.delay == 0
+    # The prompt was smaller than estimated: the difference is given back
+    limiter.settle(reservation, 0)
+    assert limiter.reserve("p", "r1", 1000).delay == 0
+    assert limiter.reserve("p", "r1", 1000).delay > 0
+
+
+def test_release_returns_capacity():
+    limiter = RateLimiter(region_quota=Quota(rpm=60))
+    _fill(limiter, count=9)
+    reservation = limiter.reserve("p", "r1", 0)
+
+    limiter.release(reservation)
+
+    assert limiter.reserve("p", "r1", 0).delay == 0
+
+
+def test_throttled_region_cools_down():
+    limiter = RateLimiter(region_quota=Quota(rpm=60), project_quota=Quota(rpm=600), throttle_cooldown=5)
+
+    limiter.throttled("p", "r1")
+
+    assert limiter.reserve("p", "r1", 0).delay > 5
+    assert limiter.reserve("p", "r2", 0).delay == 0
+
+
+def test_throttled_without_region_limit_cools_down_the_project():
+    limiter = RateLimiter(project_quota=Quota(rpm=60), throttle_cooldown=5)
+
+    limiter.throttled("p", "r1")
+
+    assert limiter.reserve("p", "r2", 0).delay > 5
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_cancelled_async_wait_returns_capacity():
+    limiter = RateLimiter(region_quota=Quota(rpm=60))
+    _fill(limiter)
+
+    async def main():
+        task = asyncio.ensure_future(limiter.aacquire("p", "r1", 0))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert limiter.reserve("p", "r1", 0).delay <= 1.0
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from utils.rate_limiter import RateLimited
+from utils.retry_policy import FAILOVER, FATAL, RETRYABLE, RetryPolicy, classify_error
+
+
+class StatusError(Exception):
+    """Stands in for a google.api_core exception, which carries the HTTP status as ``code``."""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+@pytest.mark.parametrize("error, kind", [
+    (StatusError(400), FATAL),
+    (StatusError(403), FATAL),
+    (StatusError(404), FAILOVER),
+    (StatusError(429), FAILOVER),
+    (StatusError(500), RETRYABLE),
+    (StatusError(503), RETRYABLE),
+    (TimeoutError(), RETRYABLE),
+    (asyncio.TimeoutError(), RETRYABLE),
+    (ConnectionResetError(), RETRYABLE),
+    (ValueError("response was blocked"), FATAL),
+    (TypeError("bad argument"), FATAL),
+    (RuntimeError("unknown"), RETRYABLE),
+    (RateLimited("Region us-east1 is over its local quota", "region", 5.0), FAILOVER),
+    (RateLimited("Project is over its local quota", "project", 5.0), RETRYABLE),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_failover_takes_the_region_out_of_rotation():
+    state = RetryPolicy(deadline=10, max_attempts=6, backoff_base=0.01).start(["a", "b"])
+
+    assert state.next_attempt() == ("a", 0.0)
+    assert state.record_failure("a", StatusError(429)) == FAILOVER
+    assert state.next_attempt() == ("b", 0.0)
+    assert state.record_failure("b", StatusError(503)) == RETRYABLE
+    region, delay = state.next_attempt()
+    assert region == "b"
+    assert 0 <= delay <= 0.01
+
+
+def test_attempts_are_bounded():
+    state = RetryPolicy(deadline=10, max_attempts=2, backoff_base=0).start(["a"])
+
+    for _ in range(2):
+        region, _ = state.next_attempt()
+        state.record_failure(region, StatusError(503))
+
+    assert state.next_attempt() is None
+    assert "after 2 attempts" in str(state.exhausted())
+
+
+def test_retry_after_delays_the_next_attempt():
+    state = RetryPolicy(deadline=10).start(["a", "b"])
+    state.next_attempt()
+    state.record_failure("a", RateLimited("Project is over its local quota", "project", 2.0))
+
+    region, delay = state.next_attempt()
+
+    assert region == "b"
+    assert 1.5 < delay <= 2.0
+
+
+def test_retry_after_past_the_deadline_gives_up():
+    state = RetryPolicy(deadline=1).start(["a", "b"])
+    state.next_attempt()
+    state.record_failure("a", RateLimited("Project is over its local quota", "project", 5.0))
+
+    assert state.next_attempt() is None
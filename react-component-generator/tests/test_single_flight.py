@@ -0,0 +1,115 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+class Abandoned(BaseException):
+    """Leaves the leader's function without a result, like a closed generator."""
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, "key", work) for _ in range(4)]
+        _wait_for(lambda: flight.stats()["coalesced"] == 3)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert {result for result, _ in results} == {"result"}
+    assert flight.stats() == {"leaders": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_waiting_callers_receive_the_leaders_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(flight.do, "key", work) for _ in range(2)]
+        _wait_for(lambda: flight.stats()["coalesced"] == 1)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="boom"):
+                future.result()
+
+    # A failed call is not remembered
+    assert flight.do("key", lambda: "again") == ("again", False)
+
+
+def test_abandoned_leader_hands_over_to_a_waiting_caller():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def leader():
+        runs.append("leader")
+        release.wait(5)
+        raise Abandoned()
+
+    def follower():
+        runs.append("follower")
+        return "follower result"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(flight.do, "key", leader)
+        _wait_for(lambda: runs == ["leader"])
+        second = executor.submit(flight.do, "key", follower)
+        _wait_for(lambda: flight.stats()["coalesced"] == 1)
+        release.set()
+        with pytest.raises(Abandoned):
+            first.result()
+        assert second.result() == ("follower result", False)
+
+    assert runs == ["leader", "follower"]
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_async_calls_share_one_run_and_survive_a_cancelled_waiter():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("key", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.ado("key", work))
+        cancelled = asyncio.ensure_future(flight.ado("key", work))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        return await leader, await waiter, cancelled
+
+    leader, waiter, cancelled = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert leader == ("result", False)
+    assert waiter == ("result", True)
+    assert cancelled.cancelled()
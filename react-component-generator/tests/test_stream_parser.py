@@ -0,0 +1,67 @@
+import json
+
+from utils.stream_parser import IncrementalFilesParser
+
+FILES = {
+    "Card.tsx": "import './Card.css';\nexport const Card = () => <div className=\"card\">{'}'}</div>;\n",
+    "Card.css": ".card {\n  color: red;\n}\n",
+}
+
+
+def _feed_all(parser, text, chunk_size):
+    completed = []
+    for start in range(0, len(text), chunk_size):
+        completed.extend(parser.feed(text[start:start + chunk_size]))
+    return completed
+
+
+def test_entries_are_emitted_as_soon_as_complete():
+    parser = IncrementalFilesParser()
+    payload = json.dumps({"files": FILES})
+    split = payload.index('"Card.css"')
+
+    assert parser.feed(payload[:split]) == [("Card.tsx", FILES["Card.tsx"])]
+    assert parser.feed(payload[split:]) == [("Card.css", FILES["Card.css"])]
+    assert parser.done
+    assert not parser.failed
+    assert parser.files == FILES
+
+
+def test_any_chunking_gives_the_same_files():
+    payload = "Here you go:\n```json\n" + json.dumps({"files": FILES}, indent=2) + "\n```"
+    for chunk_size in (1, 2, 7, 64, len(payload)):
+        parser = IncrementalFilesParser()
+        completed = _feed_all(parser, payload, chunk_size)
+        assert completed == list(FILES.items())
+        assert parser.done
+
+
+def test_object_values_are_reserialized():
+    package = {"name": "card", "dependencies": {"react": "^18.0.0"}, "files": ["dist"]}
+    parser = IncrementalFilesParser()
+    completed = _feed_all(parser, json.dumps({"files": {"package.json": package, "Card.css": ".card {}"}}), 5)
+
+    assert [name for name, _ in completed] == ["package.json", "Card.css"]
+    assert json.loads(parser.files["package.json"]) == package
+
+
+def test_malformed_input_keeps_completed_entries():
+    parser = IncrementalFilesParser()
+    payload = '{"files": {"Card.tsx": "a", "Card.css": "b" "CardProps.ts": "c"}}'
+
+    completed = parser.feed(payload)
+
+    assert completed == [("Card.tsx", "a"), ("Card.css", "b")]
+    assert parser.failed
+    assert not parser.done
+    assert "Card.css" in parser.error
+    assert parser.feed(', "Late.tsx": "d"}}') == []
+    assert parser.files == {"Card.tsx": "a", "Card.css": "b"}
+
+
+def test_unsupported_value_is_reported():
+    parser = IncrementalFilesParser()
+
+    assert parser.feed('{"files": {"Card.tsx": 42}}') == []
+    assert parser.failed
+    assert "Card.tsx" in parser.error